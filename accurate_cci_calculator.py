@@ -9,6 +9,29 @@ import sys
 import os
 import argparse
 
+from cci_checkpoint import ShardCheckpoint, content_fingerprint
+from cci_distribution import band_distribution, expected_survival, score_distribution, write_distribution_csv
+from cci_arrow import CodeListBuilder, code_evidence, format_code_column, is_arrow_compatible, score_arrow
+from cci_engine import (
+    CodePrefilter,
+    ConditionMaskLookup,
+    blank_icd_rows,
+    canonical_icd10,
+    compact_scores,
+    condition_points,
+    hierarchy_from_mapping,
+    mapping_version,
+    missing_as_none,
+    rollup_patients,
+)
+from cci_partition import parse_partition, partial_prefix, partition_rows, read_partials, write_partial
+from cci_quality import print_quality_report, quarantine_rows, validate_icd_columns
+from cci_sparse import export_sparse
+from cci_store import write_store
+from cci_summary import ScoreSummary
+from cci_timeline import ClaimTimeline, in_window
+from cci_watch import watch_directory
+
 warnings.filterwarnings('ignore')
 
 
@@ -68,15 +91,20 @@ EXACT_ICD_CODES = {
 class AccurateCCICalculator:
     def __init__(self, icd_prefix='ICD_DGNS_CD', max_icd_cols=12):
         self.conditions = EXACT_ICD_CODES
+        self.condition_codes = {
+            key: {canonical_icd10(code) for code in info['codes']} for key, info in EXACT_ICD_CODES.items()
+        }
         self.icd_prefix = icd_prefix
         self.max_icd_cols = max_icd_cols
+        self.icd_cols = [f'{icd_prefix}{i}' for i in range(1, max_icd_cols + 1)]
+        self.prefilter = CodePrefilter(self.conditions, exact=True)
     
     def extract_codes(self, row):
         codes = []
-        for i in range(1, self.max_icd_cols + 1):
-            col = f'{self.icd_prefix}{i}'
-            if col in row.index and pd.notna(row[col]):
-                code = str(row[col]).strip().upper()
+        for col in self.icd_cols:
+            if col in row.index:
+                # Dotted (I50.22) and dotless (I5022) codes share one canonical form
+                code = canonical_icd10(row[col])
                 if code:
                     codes.append(code)
         return codes
@@ -95,11 +123,15 @@ class AccurateCCICalculator:
         if not has_codes:
             return 0, {}, codes, False
         
-        conditions = {}
+        conditions = dict.fromkeys(self.conditions, 0)
         score = 0
+        # Only codes whose chapter/category occurs in the mapping can match
+        relevant = self.prefilter.filter(codes)
+        if not relevant:
+            return score, conditions, codes, True
         
         for cond_key, cond_info in self.conditions.items():
-            if self.check_exact_match(codes, cond_info['codes']):
+            if self.check_exact_match(relevant, self.condition_codes[cond_key]):
                 conditions[cond_key] = 1
                 score += cond_info['points']
             else:
@@ -107,35 +139,96 @@ class AccurateCCICalculator:
         
         return score, conditions, codes, True
 
+    def process_table(self, data):
+        """Score a pyarrow Table, polars DataFrame or other Arrow-compatible frame.
+
+        Reads the ICD columns as Arrow arrays and returns a pyarrow Table
+        with the process_calculator columns; nothing goes through pandas.
+        """
+        return score_arrow(data, ConditionMaskLookup(self.conditions, exact=True), self.icd_cols)
+
 def process_calculator(df, total_records=None, icd_prefix='ICD_DGNS_CD', max_icd_cols=12):
+    if is_arrow_compatible(df):
+        return AccurateCCICalculator(icd_prefix=icd_prefix, max_icd_cols=max_icd_cols).process_table(df)
+
     if total_records is None:
         total_records = len(df)
     
     calc = AccurateCCICalculator(icd_prefix=icd_prefix, max_icd_cols=max_icd_cols)
-    results = []
-    
-    for idx, row in df.iterrows():
-        score, conditions, codes, has_codes = calc.calculate(row)
+    cond_keys = list(calc.conditions.keys())
+    
+    # Results go straight into preallocated arrays: 1 byte per flag
+    flags = np.zeros((len(df), len(cond_keys)), dtype=np.uint8)
+    scores = np.zeros(len(df), dtype=np.int64)
+    has_codes = np.zeros(len(df), dtype=bool)
+    code_lists = CodeListBuilder()
+    
+    # Rows whose ICD columns are all blank keep the "no codes" defaults and are never visited
+    positions = np.flatnonzero(~blank_icd_rows(df, calc.icd_cols))
+    for n, (pos, (idx, row)) in enumerate(zip(positions, df.iloc[positions].iterrows()), 1):
+        score, conditions, codes, has = calc.calculate(row)
+        code_lists.pad(pos)
+        code_lists.append(codes)
         
-        result = {
-            'DSYSRTKY': row['DSYSRTKY'],
-            'CLAIMNO': row['CLAIMNO'],
-            'CCI_Score': score if has_codes else np.nan,
-            'Has_ICD_Codes': 'Yes' if has_codes else 'No',
-            'ICD_Codes': '|'.join(codes) if codes else 'None',
-        }
-        result.update(conditions)
-        results.append(result)
+        if has:
+            has_codes[pos] = True
+            scores[pos] = score
+            flags[pos] = [conditions[k] for k in cond_keys]
         
-        if (idx + 1) % 200 == 0:
-            print(f"  Processed {idx + 1}/{total_records} patients...")
+        if n % 200 == 0:
+            print(f"  Processed {pos + 1}/{total_records} patients...")
+    code_lists.pad(len(df))
+    
+    results = pd.DataFrame({
+        'DSYSRTKY': df['DSYSRTKY'].to_numpy(),
+        'CLAIMNO': df['CLAIMNO'].to_numpy(),
+        'CCI_Score': compact_scores(scores, has_codes),
+        'Has_ICD_Codes': np.where(has_codes, 'Yes', 'No'),
+        'ICD_Codes': code_lists.to_pandas(),
+    })
+    for j, key in enumerate(cond_keys):
+        results[key] = flags[:, j]
     
-    return pd.DataFrame(results)
+    return results
+
+def rollup_to_patients(results):
+    cond_keys = list(EXACT_ICD_CODES.keys())
+    return rollup_patients(
+        results,
+        cond_keys,
+        condition_points(EXACT_ICD_CODES, cond_keys),
+        hierarchy_from_mapping(EXACT_ICD_CODES),
+    )
+
+def condition_evidence(results):
+    """(row, condition, code) index triples: which ICD code matched each condition."""
+    return code_evidence(results['ICD_Codes'], ConditionMaskLookup(EXACT_ICD_CODES, exact=True))
+
+def score_as_of(results, claim_dates, index_date, lookback_days=365):
+    cond_keys = list(EXACT_ICD_CODES.keys())
+    timeline = ClaimTimeline.from_results(
+        results,
+        claim_dates,
+        cond_keys,
+        condition_points(EXACT_ICD_CODES, cond_keys),
+        hierarchy_from_mapping(EXACT_ICD_CODES),
+    )
+    if timeline.undated_claims:
+        print(f"Warning: {timeline.undated_claims} claims with a missing or invalid date "
+              f"fall outside every lookback window")
+    return timeline.as_of(index_date, lookback_days)
+
+def key_columns(df):
+    """Identifier columns: claim-level frames have CLAIMNO, patient rollups N_Claims."""
+    return ['DSYSRTKY', 'CLAIMNO' if 'CLAIMNO' in df.columns else 'N_Claims']
+
+def result_id_columns(results):
+    return [col for col in ('DSYSRTKY', 'CLAIMNO') if col in results.columns]
 
 def update_calculator_icd_prefix(icd_prefix, max_icd_cols):
     pass
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(
         description="CCI (Charlson Comorbidity Index) Calculator ",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -144,14 +237,33 @@ Examples:
   python accurate_cci_calculator.py --input data.csv
   python accurate_cci_calculator.py --input data.csv --output results.xlsx
   python accurate_cci_calculator.py --input data.csv --id-col PATIENT_ID --claim-col CLAIM_ID
+  python accurate_cci_calculator.py --watch /data/landing --output-dir /data/scored
+  python accurate_cci_calculator.py --input data.csv --output run.xlsx --partition 2/8
+  python accurate_cci_calculator.py --reduce run.part*of8.cci --output run.xlsx
         """
     )
     
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    
+    source.add_argument(
         '--input', '-i',
         type=str,
-        required=True,
-        help='Input CSV file path (required)'
+        help='Input CSV file path'
+    )
+    
+    source.add_argument(
+        '--watch',
+        type=str,
+        metavar='DIR',
+        help='Keep running and score every new CSV file dropped into DIR'
+    )
+    
+    source.add_argument(
+        '--reduce',
+        type=str,
+        nargs='+',
+        metavar='PART',
+        help='Merge the partial .cci results of a --partition run into one final output'
     )
     
     parser.add_argument(
@@ -161,6 +273,26 @@ Examples:
         help='Output Excel file path (default: CCI_Analysis_<timestamp>.xlsx)'
     )
     
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help='Directory for per-file outputs in --watch mode (default: DIR/cci_output)'
+    )
+    
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=5.0,
+        help='Seconds between directory scans in --watch mode (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='With --watch, score the files currently present and exit'
+    )
+    
     parser.add_argument(
         '--id-col',
         type=str,
@@ -189,72 +321,307 @@ Examples:
         help='Maximum number of ICD code columns to check (default: 12)'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--patient-level',
+        action='store_true',
+        help='Roll claims up to one row per patient before scoring output'
+    )
     
-    if not os.path.exists(args.input):
-        print(f"Error: Input file '{args.input}' not found!")
-        sys.exit(1)
+    parser.add_argument(
+        '--index-date',
+        type=str,
+        default=None,
+        help='Score each patient as of this date (YYYY-MM-DD) using only claims in the lookback window'
+    )
     
-    print("\n" + "="*80)
-    print("CCI ANALYSIS - ICD-10 CODE MATCHING")
-    print("="*80 + "\n")
+    parser.add_argument(
+        '--lookback-days',
+        type=int,
+        default=365,
+        help='Lookback window length in days for --index-date (default: 365)'
+    )
     
-    print(f"Loading dataset from '{args.input}'...")
-    try:
-        df = pd.read_csv(args.input)
-        print(f"Loaded {len(df)} patient records\n")
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        sys.exit(1)
+    parser.add_argument(
+        '--date-col',
+        type=str,
+        default='CLM_THRU_DT',
+        help='Column name for the claim date used by --index-date (default: CLM_THRU_DT)'
+    )
     
-    if args.id_col not in df.columns:
-        print(f"Error: Column '{args.id_col}' not found in dataset!")
-        print(f"Available columns: {list(df.columns)}")
-        sys.exit(1)
+    parser.add_argument(
+        '--sparse',
+        action='store_true',
+        help='Also write the condition flags as a scipy CSR matrix (<output>_conditions.npz)'
+    )
     
-    if args.claim_col not in df.columns:
-        print(f"Error: Column '{args.claim_col}' not found in dataset!")
-        print(f"Available columns: {list(df.columns)}")
-        sys.exit(1)
+    parser.add_argument(
+        '--sparse-codes',
+        action='store_true',
+        help='With --sparse, also write the ICD code incidence matrix (<output>_codes.npz)'
+    )
+    
+    parser.add_argument(
+        '--distribution-csv',
+        action='store_true',
+        help='Also write patients per score and per risk band as CSV (<output>_score_distribution.csv, <output>_risk_bands.csv)'
+    )
     
-    df = df.rename(columns={
+    parser.add_argument(
+        '--store',
+        action='store_true',
+        help='Also write the results as a memory-mapped binary result store (<output>.cci)'
+    )
+    
+    parser.add_argument(
+        '--partition',
+        type=partition_arg,
+        default=None,
+        metavar='i/N',
+        help='Score only the patients whose ID hashes to partition i of N and write '
+             '<output>.part<i>of<N>.cci with a .summary.json sidecar instead of a workbook'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-dir',
+        type=str,
+        default=None,
+        metavar='DIR',
+        help='Persist scored shards to DIR as they finish so an interrupted run can be resumed'
+    )
+    
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=100000,
+        help='Rows per checkpointed shard with --checkpoint-dir (default: 100000)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='With --checkpoint-dir, skip shards finished by a previous run of the same input'
+    )
+    
+    parser.add_argument(
+        '--quarantine',
+        action='store_true',
+        help='Move rows with malformed ICD codes to <output>_quarantine.csv instead of scoring them'
+    )
+    
+    return parser
+
+def partition_arg(value):
+    try:
+        return parse_partition(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def load_dataset(input_path, args):
+    """Read a claims CSV and rename the ID columns; raises ValueError on missing columns.
+
+    ICD columns are read as text so codes such as 250 or I10 are never
+    turned into floats by type inference.
+    """
+    icd_cols = [f'{args.icd_prefix}{i}' for i in range(1, args.max_icd_cols + 1)]
+    df = pd.read_csv(input_path, dtype={col: str for col in icd_cols})
+    
+    required = [args.id_col, args.claim_col]
+    if args.index_date:
+        required.append(args.date_col)
+    for col in required:
+        if col not in df.columns:
+            raise ValueError(f"Column '{col}' not found in dataset!\n"
+                             f"Available columns: {list(df.columns)}")
+    
+    return df.rename(columns={
         args.id_col: 'DSYSRTKY',
         args.claim_col: 'CLAIMNO'
     })
-    
+
+def checkpoint_identity(input_path, args):
+    """Everything the checkpointed shards depend on: input content, mapping and row-selecting options."""
+    return {
+        'input': content_fingerprint(input_path),
+        'mapping_version': mapping_version(EXACT_ICD_CODES),
+        'options': {name: getattr(args, name) for name in
+                    ('id_col', 'claim_col', 'icd_prefix', 'max_icd_cols', 'partition', 'quarantine')},
+    }
+
+def score_dataset(df, args, checkpoint=None):
     update_calculator_icd_prefix(args.icd_prefix, args.max_icd_cols)
     
     print("Calculating CCI with EXACT ICD-10 codes...")
-    all_results = process_calculator(df, len(df))
+    if checkpoint is not None:
+        all_results = checkpoint.run(df, lambda shard: process_calculator(shard, len(shard)))
+    else:
+        all_results = process_calculator(df, len(df))
     print(f"Processed {len(all_results)} patients\n")
     
-    with_codes = (all_results['Has_ICD_Codes'] == 'Yes').sum()
+    if args.index_date:
+        all_results = score_as_of(all_results, df[args.date_col], args.index_date, args.lookback_days)
+        print(f"Scored {len(all_results)} patients as of {args.index_date} "
+              f"({args.lookback_days}-day lookback)\n")
+    elif args.patient_level:
+        all_results = rollup_to_patients(all_results)
+        print(f"Rolled up to {len(all_results)} unique patients\n")
+    
+    return all_results
+
+def summarize_results(all_results):
+    """One pass over the results; the console summary and every sheet read from it."""
+    return ScoreSummary.from_results(all_results, list(EXACT_ICD_CODES.keys()))
+
+def print_summary(summary):
     print("Analysis Summary:")
-    print(f"Total Patients: {len(all_results)}")
-    print(f"Patients with matching codes: {with_codes}")
-    print(f"Mean CCI Score: {all_results['CCI_Score'].mean():.2f}")
-    print(f"Median CCI Score: {all_results['CCI_Score'].median():.0f}")
-    print(f"Score Range: {int(all_results['CCI_Score'].min())}-{int(all_results['CCI_Score'].max())}\n")
+    print(f"Total Patients: {summary.rows}")
+    print(f"Patients with matching codes: {summary.with_codes}")
+    print(f"Mean CCI Score: {summary.mean:.2f}")
+    print(f"Median CCI Score: {summary.median:.0f}")
+    print(f"Score Range: {int(summary.min)}-{int(summary.max)}")
+    print(f"Expected 10-Year Survival: {expected_survival(summary.histogram):.1f}%\n")
+
+def analyze_file(input_path, output_path, args):
+    """Load, score and write the workbook for one input file.
+    
+    With --partition every output is named after <output>.part<i>of<N>
+    and the results go to a partial store instead of a workbook.
+    """
+    if args.partition:
+        output_path = f'{partial_prefix(output_path, args.partition)}{os.path.splitext(output_path)[1]}'
+    print(f"Loading dataset from '{input_path}'...")
+    df = load_dataset(input_path, args)
+    print(f"Loaded {len(df)} patient records")
+    if args.partition:
+        df = partition_rows(df, args.partition)
+        print(f"Partition {args.partition[0]}/{args.partition[1]}: {len(df)} records")
+    
+    icd_cols = [f'{args.icd_prefix}{i}' for i in range(1, args.max_icd_cols + 1)]
+    invalid_rows, quality = validate_icd_columns(df, icd_cols)
+    print_quality_report(quality, invalid_rows)
+    if args.quarantine and invalid_rows.any():
+        quarantine_path = f'{os.path.splitext(output_path)[0]}_quarantine.csv'
+        df = quarantine_rows(df, invalid_rows, quarantine_path)
+        print(f"Quarantined {int(invalid_rows.sum())} rows to '{quarantine_path}'")
+    print()
+    
+    checkpoint = None
+    if args.checkpoint_dir:
+        checkpoint = ShardCheckpoint(args.checkpoint_dir, checkpoint_identity(input_path, args),
+                                     list(EXACT_ICD_CODES.keys()), shard_size=args.shard_size,
+                                     resume=args.resume)
+    all_results = score_dataset(df, args, checkpoint)
+    summary = summarize_results(all_results)
+    print_summary(summary)
+    
+    if args.partition:
+        written = write_partial(os.path.splitext(output_path)[0], all_results, summary, args.partition,
+                                list(EXACT_ICD_CODES.keys()), result_id_columns(all_results), input_path)
+        print(f"Partial results written: {', '.join(written)}\n")
+    else:
+        print(f"Creating Excel workbook: '{output_path}'...")
+        create_excel(output_path, df, all_results, len(all_results), quality, summary)
+        print("Excel file created\n")
+    
+    if args.sparse:
+        icd_cols = [f'{args.icd_prefix}{i}' for i in range(1, args.max_icd_cols + 1)] if args.sparse_codes else None
+        claims = df
+        if args.index_date:
+            # Code incidence must cover the same lookback window as the condition flags
+            claims = df[in_window(df[args.date_col], args.index_date, args.lookback_days)]
+        written = export_sparse(os.path.splitext(output_path)[0], all_results, list(EXACT_ICD_CODES.keys()),
+                                claims, icd_cols, key_columns(all_results))
+        print(f"Sparse matrices written: {', '.join(written)}\n")
+    
+    if args.distribution_csv:
+        written = write_distribution_csv(os.path.splitext(output_path)[0], summary.histogram)
+        print(f"Score distribution written: {', '.join(written)}\n")
+    
+    if args.store and not args.partition:
+        store_path = write_store(f'{os.path.splitext(output_path)[0]}.cci', all_results,
+                                 list(EXACT_ICD_CODES.keys()), result_id_columns(all_results))
+        print(f"Result store written: {store_path}\n")
+    return all_results
+
+def reduce_partials(store_paths, output_path):
+    """Merge partial results into the final workbook plus <output>.cci and its summary sidecar."""
+    print(f"Merging {len(store_paths)} partial results...")
+    all_results, summary = read_partials(store_paths)
+    print(f"Merged {len(all_results)} rows\n")
+    print_summary(summary)
+    
+    print(f"Creating Excel workbook: '{output_path}'...")
+    create_excel(output_path, None, all_results, len(all_results), None, summary)
+    print("Excel file created\n")
+    
+    written = write_partial(os.path.splitext(output_path)[0], all_results, summary, (1, 1),
+                            list(EXACT_ICD_CODES.keys()), result_id_columns(all_results), list(store_paths))
+    print(f"Merged results written: {', '.join(written)}\n")
+    return all_results
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume requires --checkpoint-dir")
+    
+    if args.watch:
+        if not os.path.isdir(args.watch):
+            print(f"Error: Watch directory '{args.watch}' not found!")
+            sys.exit(1)
+        output_dir = args.output_dir or os.path.join(args.watch, 'cci_output')
+        watch_directory(
+            args.watch,
+            lambda input_path, output_path: analyze_file(input_path, output_path, args),
+            output_dir,
+            poll_interval=args.poll_interval,
+            once=args.once,
+        )
+        return
+    
+    if args.reduce:
+        if args.output is None:
+            args.output = f'CCI_Analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+        try:
+            reduce_partials(args.reduce, args.output)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    
+    if not os.path.exists(args.input):
+        print(f"Error: Input file '{args.input}' not found!")
+        sys.exit(1)
+    
+    print("\n" + "="*80)
+    print("CCI ANALYSIS - ICD-10 CODE MATCHING")
+    print("="*80 + "\n")
     
     if args.output is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         args.output = f'CCI_Analysis_{timestamp}.xlsx'
     
-    print(f"Creating Excel workbook: '{args.output}'...")
-    create_excel(args.output, df, all_results, len(all_results))
-    print("Excel file created\n")
+    try:
+        all_results = analyze_file(args.input, args.output, args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error processing file: {e}")
+        sys.exit(1)
     
     print("="*80)
     print("ANALYSIS COMPLETE WITH ICD-10 CODES")
     print("="*80)
-    print(f"\nOutput File: {args.output}")
+    print(f"\nOutput File: {partial_prefix(args.output, args.partition) + '.cci' if args.partition else args.output}")
     print(f"Total Patients: {len(all_results)}")
     print(f"Using: ICD-10 code matching (no prefix matching)")
     print(f"Conditions Tracked: 10 specific conditions")
     print(f"ICD Code Column Prefix: {args.icd_prefix}")
     print("\n")
 
-def create_excel(filename, raw_df, all_results, total_records):
+def create_excel(filename, raw_df, all_results, total_records, quality=None, summary=None):
+    if summary is None:
+        summary = summarize_results(all_results)
     wb = Workbook()
     wb.remove(wb.active)
     
@@ -262,14 +629,21 @@ def create_excel(filename, raw_df, all_results, total_records):
     add_cci_results_sheet(ws1, all_results, total_records)
     
     ws2 = wb.create_sheet("Condition Detection")
-    add_condition_sheet(ws2, all_results)
+    add_condition_sheet(ws2, summary)
     
     ws3 = wb.create_sheet("Summary Statistics")
-    add_summary_sheet(ws3, all_results)
+    add_summary_sheet(ws3, summary)
     
     ws4 = wb.create_sheet("Detailed Analysis")
     add_detailed_sheet(ws4, all_results, total_records)
     
+    ws5 = wb.create_sheet("Score Distribution")
+    add_distribution_sheet(ws5, summary)
+    
+    if quality is not None:
+        ws6 = wb.create_sheet("Data Quality")
+        add_quality_sheet(ws6, quality)
+    
     wb.save(filename)
 
 def add_cci_results_sheet(ws, df, total_records):
@@ -284,7 +658,10 @@ def add_cci_results_sheet(ws, df, total_records):
     ws['A3'] = f"Using EXACT ICD-10 code matching"
     ws['A3'].font = Font(size=10, italic=True, color="666666")
     
-    headers = ['DSYSRTKY', 'CLAIMNO', 'CCI_Score', 'Has_Codes', 'ICD_Codes']
+    data_cols = key_columns(df) + ['CCI_Score', 'Has_ICD_Codes']
+    if 'ICD_Codes' in df.columns:
+        data_cols.append('ICD_Codes')
+    headers = [c.replace('Has_ICD_Codes', 'Has_Codes') for c in data_cols]
     start_row = 5
     
     for col_idx, header in enumerate(headers, 1):
@@ -295,7 +672,7 @@ def add_cci_results_sheet(ws, df, total_records):
         cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
     ws.row_dimensions[start_row].height = 25
     
-    display_df = df[['DSYSRTKY', 'CLAIMNO', 'CCI_Score', 'Has_ICD_Codes', 'ICD_Codes']].copy()
+    display_df = missing_as_none(format_code_column(df[data_cols]))
     
     for row_idx, row_data in enumerate(dataframe_to_rows(display_df, index=False, header=False), start_row + 1):
         for col_idx, value in enumerate(row_data, 1):
@@ -319,27 +696,23 @@ def add_cci_results_sheet(ws, df, total_records):
     
     ws.freeze_panes = f'A{start_row + 1}'
 
-def add_condition_sheet(ws, df):
+def add_condition_sheet(ws, summary):
     ws['A1'] = "Condition Detection Results"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
     ws['A1'].fill = PatternFill(start_color="2E75B6", end_color="2E75B6", fill_type="solid")
     ws.merge_cells('A1:C1')
     ws.row_dimensions[1].height = 25
     
-    conditions = list(EXACT_ICD_CODES.keys())
     condition_names = {k: v['name'] for k, v in EXACT_ICD_CODES.items()}
     
     analysis = []
-    for cond in conditions:
-        if cond in df.columns:
-            count = df[cond].sum()
-            pct = (count / len(df) * 100) if len(df) > 0 else 0
-            analysis.append({
-                'Condition': condition_names[cond],
-                'Cases': int(count),
-                'Percentage': f"{pct:.1f}%",
-                'Code(s)': ', '.join(EXACT_ICD_CODES[cond]['codes'])
-            })
+    for cond, count, pct in summary.prevalence().itertuples(index=False):
+        analysis.append({
+            'Condition': condition_names[cond],
+            'Cases': int(count),
+            'Percentage': f"{pct:.1f}%",
+            'Code(s)': ', '.join(EXACT_ICD_CODES[cond]['codes'])
+        })
     
     df_cond = pd.DataFrame(analysis)
     
@@ -370,7 +743,7 @@ def add_condition_sheet(ws, df):
     ws.column_dimensions['C'].width = 15
     ws.column_dimensions['D'].width = 40
 
-def add_summary_sheet(ws, df):
+def add_summary_sheet(ws, summary):
     ws['A1'] = "Summary Statistics"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
     ws['A1'].fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
@@ -379,15 +752,15 @@ def add_summary_sheet(ws, df):
     
     row = 3
     metrics = [
-        ('Total Patients', len(df)),
-        ('Patients with ICD Codes', (df['Has_ICD_Codes'] == 'Yes').sum()),
+        ('Total Patients', summary.rows),
+        ('Patients with ICD Codes', summary.with_codes),
         ('', ''),
         ('CCI_SCORE_STATISTICS', ''),
-        ('Mean Score', f"{df['CCI_Score'].mean():.2f}"),
-        ('Median Score', f"{df['CCI_Score'].median():.0f}"),
-        ('Min Score', f"{int(df['CCI_Score'].min())}"),
-        ('Max Score', f"{int(df['CCI_Score'].max())}"),
-        ('Std Deviation', f"{df['CCI_Score'].std():.2f}"),
+        ('Mean Score', f"{summary.mean:.2f}"),
+        ('Median Score', f"{summary.median:.0f}"),
+        ('Min Score', f"{int(summary.min)}"),
+        ('Max Score', f"{int(summary.max)}"),
+        ('Std Deviation', f"{summary.std:.2f}"),
         ('', ''),
         ('CODE_MATCHING', ''),
         ('Method', 'EXACT ICD-10 codes'),
@@ -410,6 +783,70 @@ def add_summary_sheet(ws, df):
     ws.column_dimensions['A'].width = 30
     ws.column_dimensions['B'].width = 30
 
+def add_distribution_sheet(ws, summary):
+    ws['A1'] = "Score Distribution & Risk Bands"
+    ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
+    ws['A1'].fill = PatternFill(start_color="305496", end_color="305496", fill_type="solid")
+    ws.merge_cells('A1:F1')
+    ws.row_dimensions[1].height = 25
+    
+    ws['A2'] = f"Expected 10-year survival across all scored patients: {expected_survival(summary.histogram):.1f}%"
+    ws['A2'].font = Font(size=10, italic=True, color="666666")
+    
+    bands = band_distribution(summary.histogram).drop(columns=['Interpretation'])
+    scores = score_distribution(summary.histogram)
+    row = 4
+    for title, table in (("BY RISK BAND", bands), ("BY SCORE", scores)):
+        ws[f'A{row}'] = title
+        ws[f'A{row}'].font = Font(bold=True)
+        row += 1
+        for col_idx, header in enumerate(table.columns, 1):
+            cell = ws.cell(row=row, column=col_idx)
+            cell.value = header.replace('_', ' ')
+            cell.font = Font(bold=True, color="FFFFFF", size=10)
+            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        for values in table.round(2).itertuples(index=False):
+            row += 1
+            for col_idx, value in enumerate(values, 1):
+                cell = ws.cell(row=row, column=col_idx)
+                cell.value = None if pd.isna(value) else value
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+                cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), 
+                                   top=Side(style='thin'), bottom=Side(style='thin'))
+        row += 2
+    
+    for col in 'ABCDEF':
+        ws.column_dimensions[col].width = 16
+
+def add_quality_sheet(ws, report):
+    ws['A1'] = "ICD Code Validation"
+    ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
+    ws['A1'].fill = PatternFill(start_color="7F6000", end_color="7F6000", fill_type="solid")
+    ws.merge_cells('A1:E1')
+    ws.row_dimensions[1].height = 25
+    
+    headers = list(report.columns)
+    start_row = 3
+    for col_idx, header in enumerate(headers, 1):
+        cell = ws.cell(row=start_row, column=col_idx)
+        cell.value = header
+        cell.font = Font(bold=True, color="FFFFFF", size=11)
+        cell.fill = PatternFill(start_color="BF8F00", end_color="BF8F00", fill_type="solid")
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+    
+    for row_idx, row_data in enumerate(dataframe_to_rows(report, index=False, header=False), start_row + 1):
+        for col_idx, value in enumerate(row_data, 1):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            cell.value = value
+            if row_idx % 2 == 0:
+                cell.fill = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid")
+            cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), 
+                               top=Side(style='thin'), bottom=Side(style='thin'))
+    
+    for col, width in zip('ABCDE', (18, 10, 10, 12, 60)):
+        ws.column_dimensions[col].width = width
+
 def add_detailed_sheet(ws, df, total_records):
     ws['A1'] = "Detailed Patient Analysis"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
@@ -418,7 +855,7 @@ def add_detailed_sheet(ws, df, total_records):
     ws.row_dimensions[1].height = 25
     
     cond_cols = list(EXACT_ICD_CODES.keys())
-    display_df = df[['DSYSRTKY', 'CLAIMNO', 'CCI_Score'] + cond_cols].copy()
+    display_df = missing_as_none(df[key_columns(df) + ['CCI_Score'] + cond_cols])
     
     cond_names = {k: EXACT_ICD_CODES[k]['name'][:25] for k in cond_cols}
     display_df.rename(columns=cond_names, inplace=True)
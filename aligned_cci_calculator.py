@@ -13,7 +13,18 @@ if not hasattr(pd.errors, 'SettingWithCopyWarning'):
     pd.errors.SettingWithCopyWarning = SettingWithCopyWarning
     pd.core.common.SettingWithCopyWarning = SettingWithCopyWarning
 
-from comorbidipy import comorbidity
+from cci_arrow import code_evidence, encode_frame, is_arrow_compatible, score_arrow
+from cci_cache import ResultCache
+from cci_engine import (
+    ConditionMaskLookup,
+    apply_hierarchy_dict,
+    canonical_icd10,
+    compact_scores,
+    condition_points,
+    hierarchy_from_mapping,
+    rollup_patients,
+    score_flags,
+)
 
 
 
@@ -56,12 +67,14 @@ CHARLSON_ICD10_MAPPING = {
     'MLD': {
         'name': 'Mild Liver Disease',
         'codes': ['B18', 'C80', 'K70', 'K71', 'K73', 'K74', 'K76', 'Z94'],
-        'points': 1
+        'points': 1,
+        'superseded_by': 'MSLD'
     },
     'DIAB': {
         'name': 'Diabetes (without complications)',
         'codes': ['E10', 'E11', 'E12', 'E13', 'E14'],
-        'points': 1
+        'points': 1,
+        'superseded_by': 'DIABWC'
     },
     'DIABWC': {
         'name': 'Diabetes with Complications',
@@ -76,7 +89,8 @@ CHARLSON_ICD10_MAPPING = {
     'CANC': {
         'name': 'Cancer (non-metastatic)',
         'codes': ['C00', 'C01', 'C02', 'C03', 'C04', 'C05', 'C06', 'C07', 'C08', 'C09', 'C10', 'C11', 'C12', 'C13', 'C14', 'C15', 'C16', 'C17', 'C18', 'C19', 'C20', 'C21', 'C22', 'C23', 'C24', 'C25', 'C26', 'C30', 'C31', 'C32', 'C33', 'C34', 'C37', 'C38', 'C39', 'C40', 'C41', 'C43', 'C45', 'C47', 'C48', 'C49', 'C50', 'C51', 'C52', 'C53', 'C54', 'C55', 'C56', 'C57', 'C58', 'C60', 'C61', 'C62', 'C63', 'C64', 'C65', 'C66', 'C67', 'C68', 'C69', 'C70', 'C71', 'C72', 'C73', 'C74', 'C75', 'C76', 'C77', 'C78', 'C80', 'C81', 'C82', 'C83', 'C84', 'C85', 'C86', 'C87', 'C88', 'C89', 'C90', 'C91', 'C92', 'C93', 'C94', 'C95', 'C96', 'C97'],
-        'points': 2
+        'points': 2,
+        'superseded_by': 'METACANC'
     },
     'METACANC': {
         'name': 'Metastatic Cancer',
@@ -96,62 +110,94 @@ CHARLSON_ICD10_MAPPING = {
 }
 
 class AlignedCharlsonCalculator:
-    
-    def __init__(self):
-        self.mapping = CHARLSON_ICD10_MAPPING
-    
+
+    def __init__(self, mapping=None, use_hierarchy=True):
+        self.mapping = mapping if mapping is not None else CHARLSON_ICD10_MAPPING
+        self.condition_keys = list(self.mapping.keys())
+        self.points = condition_points(self.mapping, self.condition_keys)
+        # Hierarchy rules travel with the mapping variant via 'superseded_by'
+        self.hierarchy = hierarchy_from_mapping(self.mapping) if use_hierarchy else []
+        # Mapping prefixes in canonical form, so 'I099', 'I09.9' and 'I09.9.' all match I09.9
+        self.patterns = {
+            key: [canonical_icd10(code) for code in self.mapping[key]['codes']]
+            for key in self.condition_keys
+        }
+
     def extract_icd_codes(self, row):
         codes = []
         for i in range(1, 13):
             code_col = f'ICD_DGNS_CD{i}'
-            if code_col in row.index and pd.notna(row[code_col]) and row[code_col] != '':
-                codes.append(str(row[code_col]).strip().upper())
+            if code_col in row.index:
+                code = canonical_icd10(row[code_col])
+                if code:
+                    codes.append(code)
         return codes
     
-    def check_condition(self, icd_codes, condition_codes):
-
+    def check_condition(self, icd_codes, patterns):
+        """Whether any canonical code starts with one of the canonical `patterns`."""
         for icd in icd_codes:
-            for cond_code in condition_codes:
-                # Remove trailing dots for comparison
-                prefix = cond_code.rstrip('.')
+            for prefix in patterns:
                 if icd.startswith(prefix):
                     return True
         return False
     
+    def detect_conditions(self, icd_codes):
+        """Raw 0/1 flag per condition, before hierarchy rules are applied."""
+        return [
+            1 if self.check_condition(icd_codes, self.patterns[key]) else 0
+            for key in self.condition_keys
+        ]
+
     def calculate_cci(self, row):
         icd_codes = self.extract_icd_codes(row)
-        
-        conditions_present = {}
-        score = 0
-        
-        # Check each condition
-        for condition_key, condition_info in self.mapping.items():
-            if self.check_condition(icd_codes, condition_info['codes']):
-                conditions_present[condition_key] = 1
-                score += condition_info['points']
-            else:
-                conditions_present[condition_key] = 0
-        
+
+        conditions_present = dict(zip(self.condition_keys, self.detect_conditions(icd_codes)))
+        apply_hierarchy_dict(conditions_present, self.hierarchy)
+
+        score = sum(self.mapping[key]['points'] for key, flag in conditions_present.items() if flag)
+
         return score, conditions_present, icd_codes
-    
+
+    def process_table(self, data):
+        """Arrow counterpart of process_dataframe: Arrow-compatible frame in, pyarrow Table out."""
+        lookup = ConditionMaskLookup(self.mapping, exact=False, hierarchy=self.hierarchy)
+        icd_cols = [f'ICD_DGNS_CD{i}' for i in range(1, 13)]
+        return score_arrow(data, lookup, icd_cols, score_col='Aligned_CCI_Score', null_without_codes=False)
+
     def process_dataframe(self, df):
-        results = []
-        
-        for idx, row in df.iterrows():
-            score, conditions, codes = self.calculate_cci(row)
-            
-            result = {
-                'DSYSRTKY': row['DSYSRTKY'],
-                'CLAIMNO': row['CLAIMNO'],
-                'Aligned_CCI_Score': score,
-                'ICD_Codes': '|'.join(codes),
-            }
-            result.update(conditions)
-            results.append(result)
-        
-        return pd.DataFrame(results)
+        if is_arrow_compatible(df):
+            return self.process_table(df)
+
+        # Distinct codes per column are matched once; hierarchy is one pass over the masks
+        lookup = ConditionMaskLookup(self.mapping, exact=False, hierarchy=self.hierarchy)
+        icd_cols = [f'ICD_DGNS_CD{i}' for i in range(1, 13)]
+        masks, _, icd_codes = encode_frame(df, lookup, icd_cols)
+        flags = lookup.flag_matrix(masks)
+
+        results = pd.DataFrame({
+            'DSYSRTKY': df['DSYSRTKY'].to_numpy(),
+            'CLAIMNO': df['CLAIMNO'].to_numpy(),
+            'Aligned_CCI_Score': compact_scores(score_flags(flags, self.points)),
+            'ICD_Codes': icd_codes,
+        })
+        for j, key in enumerate(self.condition_keys):
+            results[key] = flags[:, j]
+
+        return results
+
+    def condition_evidence(self, results):
+        """(row, condition, code) index triples for the raw matches, before hierarchy rules."""
+        return code_evidence(results['ICD_Codes'], ConditionMaskLookup(self.mapping, exact=False))
+
+    def rollup_to_patients(self, results):
+        """Patient-level view of process_dataframe output (flags ORed over claims)."""
+        return rollup_patients(results, self.condition_keys, self.points, self.hierarchy,
+                               score_col='Aligned_CCI_Score')
 
 def calculate_comorbidipy_cci(df):
+    # Imported here so the mapping and calculator can be used without comorbidipy
+    from comorbidipy import comorbidity
+
     try:
         comorbidity_data = []
         
@@ -217,31 +263,51 @@ def main():
     
     # Load data
     print("1️⃣  Loading patient dataset...")
-    df = pd.read_csv('synthetic_dmerc_base 1.csv')
+    input_path = 'synthetic_dmerc_base 1.csv'
+    df = pd.read_csv(input_path)
     print(f"   ✅ Loaded {len(df)} patient records\n")
     
+    # Scores are cached by input content, mapping and options; reruns skip scoring
+    cache = ResultCache()
+    columns = ['DSYSRTKY', 'CLAIMNO'] + [f'ICD_DGNS_CD{i}' for i in range(1, 13)]
+    
     # Calculate with aligned custom calculator
     print("2️⃣  Calculating with ALIGNED Custom Calculator (17 conditions)...")
     calculator = AlignedCharlsonCalculator()
-    aligned_results = calculator.process_dataframe(df)
-    print(f"   ✅ Calculated for {len(aligned_results)} patients\n")
+    key = cache.key(input_path, columns, calculator.mapping, 'aligned', {'hierarchy': calculator.hierarchy})
+    aligned_results, hit = cache.load_or_score(
+        key, lambda: calculator.process_dataframe(df), calculator.condition_keys,
+        ('DSYSRTKY', 'CLAIMNO'), 'Aligned_CCI_Score', label='aligned')
+    print(f"   ✅ Calculated for {len(aligned_results)} patients{' (cached)' if hit else ''}\n")
     
     # Calculate with Comorbidipy
     print("3️⃣  Calculating with Comorbidipy...")
-    comorbidipy_results = calculate_comorbidipy_cci(df)
+    # Ages are taken as of today and the mapping lives in the package, so
+    # the date and the installed comorbidipy version are part of the key
+    key = cache.key(input_path, columns + ['DOB_DT'], {}, 'comorbidipy',
+                    {'variant': 'quan', 'weighting': 'quan', 'as_of': datetime.now().date()},
+                    packages=('comorbidipy',))
+    comorbidipy_results = cache.get(key)
+    hit = comorbidipy_results is not None
+    if not hit:
+        comorbidipy_results = calculate_comorbidipy_cci(df)
+        if comorbidipy_results is not None:
+            cache.put(key, comorbidipy_results, score_col='Comorbidipy_CCI_Score', label='comorbidipy')
     
     if comorbidipy_results is None:
         print("   ❌ Comorbidipy failed\n")
         return
-    print(f"   ✅ Calculated for {len(comorbidipy_results)} patients\n")
+    print(f"   ✅ Calculated for {len(comorbidipy_results)} patients{' (cached)' if hit else ''}\n")
     
-    # Merge results
+    # Merge results at patient level, matching comorbidipy's granularity
     print("4️⃣  Comparing results...")
-    comparison = aligned_results[['DSYSRTKY', 'CLAIMNO', 'Aligned_CCI_Score']].copy()
+    patient_results = calculator.rollup_to_patients(aligned_results)
+    comparison = patient_results[['DSYSRTKY', 'N_Claims', 'Aligned_CCI_Score']].copy()
     comparison = comparison.merge(
         comorbidipy_results,
         on='DSYSRTKY',
-        how='left'
+        how='left',
+        validate='one_to_one'
     )
     
     # Calculate agreement
@@ -276,7 +342,7 @@ def main():
             print(f"  Patient {row['DSYSRTKY']}: Aligned={row['Aligned_CCI_Score']:.0f}, Comorbidipy={row['Comorbidipy_CCI_Score']:.0f}, Diff={row['Difference']:.0f}")
     
     print("\nScore Ranges:")
-    print(f"  Aligned Custom: {aligned_results['Aligned_CCI_Score'].min():.0f} - {aligned_results['Aligned_CCI_Score'].max():.0f}")
+    print(f"  Aligned Custom: {patient_results['Aligned_CCI_Score'].min():.0f} - {patient_results['Aligned_CCI_Score'].max():.0f}")
     print(f"  Comorbidipy: {comorbidipy_results['Comorbidipy_CCI_Score'].min():.0f} - {comorbidipy_results['Comorbidipy_CCI_Score'].max():.0f}")
     
     print("\n" + "="*80 + "\n")
@@ -0,0 +1,307 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from cci_engine import canonical_icd10, smallest_uint_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.interchange
+except ImportError:  # optional dependency
+    pa = None
+
+
+def is_arrow_compatible(data):
+    """True for pyarrow Tables, polars DataFrames and other non-pandas frames
+    that export Arrow data (Arrow PyCapsule stream or `__dataframe__`)."""
+    if type(data).__module__.split('.')[0] == 'pandas':
+        return False
+    return hasattr(data, '__arrow_c_stream__') or hasattr(data, '__dataframe__')
+
+
+def to_arrow_table(data):
+    """pyarrow Table over the same buffers as `data`, without a pandas copy.
+
+    The Arrow PyCapsule stream is preferred; the dataframe interchange
+    protocol is the fallback for producers that only implement that.
+    """
+    if pa is None:
+        raise ImportError("Arrow input requires the 'pyarrow' package (pip install pyarrow)")
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if hasattr(data, '__arrow_c_stream__'):
+        return pa.table(data)
+    if hasattr(data, '__dataframe__'):
+        return pa.interchange.from_dataframe(data)
+    raise TypeError(f"Cannot read {type(data).__name__} as an Arrow table")
+
+
+def code_list_array(indices, present, dictionary):
+    """list<dictionary<int32, string>> array from a (rows x slots) index matrix.
+
+    Row i holds dictionary[indices[i, j]] for every slot j with present[i, j],
+    in slot order. All rows share one int32 index buffer and one dictionary.
+    """
+    values = pa.DictionaryArray.from_arrays(
+        pa.array(np.asarray(indices, dtype=np.int32)[present]), pa.array(dictionary, pa.string()))
+    offsets = np.zeros(len(present) + 1, dtype=np.int32)
+    np.cumsum(present.sum(axis=1), out=offsets[1:])
+    return pa.ListArray.from_arrays(pa.array(offsets), values)
+
+
+class CodeListBuilder:
+    """Collects each row's ICD codes into one shared list column.
+
+    Every distinct code is stored once in a dictionary; rows are runs of
+    int32 indices in a single buffer, delimited by offsets. Without
+    pyarrow the column falls back to plain Python lists.
+    """
+
+    def __init__(self):
+        self.dictionary = {}
+        self.indices = array('i')
+        self.offsets = array('i', [0])
+        self.rows = []
+
+    def append(self, codes):
+        if pa is None:
+            self.rows.append(list(codes))
+            return
+        for code in codes:
+            index = self.dictionary.get(code)
+            if index is None:
+                index = self.dictionary[code] = len(self.dictionary)
+            self.indices.append(index)
+        self.offsets.append(len(self.indices))
+
+    def pad(self, n_rows):
+        """Append empty rows until the column holds n_rows rows."""
+        if pa is None:
+            self.rows.extend([] for _ in range(n_rows - len(self.rows)))
+            return
+        self.offsets.extend([len(self.indices)] * (n_rows + 1 - len(self.offsets)))
+
+    def to_arrow(self):
+        values = pa.DictionaryArray.from_arrays(
+            pa.array(np.frombuffer(self.indices, dtype=np.int32)),
+            pa.array(list(self.dictionary), pa.string()))
+        return pa.ListArray.from_arrays(pa.array(np.frombuffer(self.offsets, dtype=np.int32)), values)
+
+    def to_pandas(self):
+        if pa is None:
+            return pd.Series(self.rows, dtype=object).array
+        return pd.arrays.ArrowExtensionArray(self.to_arrow())
+
+
+def _list_array(codes):
+    """Single contiguous pyarrow list array behind a list-typed column."""
+    lists = pa.array(codes.array) if isinstance(codes, pd.Series) else codes
+    return lists.combine_chunks() if isinstance(lists, pa.ChunkedArray) else lists
+
+
+def is_list_column(values):
+    """True for list-typed columns: Arrow lists, or Python lists without pyarrow."""
+    if isinstance(values.dtype, pd.ArrowDtype):
+        return pa.types.is_list(values.dtype.pyarrow_dtype)
+    if values.dtype != object:
+        return False
+    first = values.first_valid_index()
+    return first is not None and isinstance(values[first], list)
+
+
+def code_list_buffers(codes):
+    """(offsets, indices, dictionary) behind a list-typed code column.
+
+    Row i holds dictionary[indices[offsets[i]:offsets[i + 1]]]; offsets is
+    int64 (rows + 1) and indices int32. The inverse is code_list_column.
+    """
+    if isinstance(codes.dtype, pd.ArrowDtype):
+        lists = _list_array(codes)
+        flat = pc.list_flatten(lists)
+        if not pa.types.is_dictionary(flat.type):
+            flat = pc.dictionary_encode(flat)
+        offsets = lists.offsets.to_numpy().astype(np.int64)
+        indices = flat.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        return offsets - offsets[0], indices, flat.dictionary.cast(pa.string()).to_pylist()
+
+    dictionary, indices, offsets = {}, array('i'), [0]
+    for row in codes:
+        for code in row:
+            indices.append(dictionary.setdefault(code, len(dictionary)))
+        offsets.append(len(indices))
+    return np.array(offsets, dtype=np.int64), np.frombuffer(indices, dtype=np.int32), list(dictionary)
+
+
+def code_list_column(offsets, indices, dictionary):
+    """List-typed column (the CodeListBuilder layout) from code_list_buffers parts."""
+    if pa is None:
+        return pd.Series([
+            [dictionary[i] for i in indices[start:end]] for start, end in zip(offsets[:-1], offsets[1:])
+        ], dtype=object).array
+    values = pa.DictionaryArray.from_arrays(pa.array(np.asarray(indices, dtype=np.int32)),
+                                            pa.array(list(dictionary), pa.string()))
+    return pd.arrays.ArrowExtensionArray(
+        pa.ListArray.from_arrays(pa.array(np.asarray(offsets, dtype=np.int32)), values))
+
+
+def format_code_lists(codes, sep='|', empty='None'):
+    """Join list-typed ICD codes into display strings (e.g. for Excel/CSV).
+
+    Rows without codes become `empty`. String columns pass through.
+    """
+    if isinstance(codes, pd.Series) and isinstance(codes.dtype, pd.ArrowDtype):
+        if not pa.types.is_list(codes.dtype.pyarrow_dtype):
+            return codes
+        lists = _list_array(codes)
+        joined = pc.binary_join(pa.ListArray.from_arrays(
+            pc.subtract(lists.offsets, lists.offsets[0]), pc.list_flatten(lists).cast(pa.string())), sep)
+        joined = pc.if_else(pc.equal(pc.list_value_length(lists), 0), empty, joined)
+        return pd.Series(joined.to_pylist(), index=codes.index, name=codes.name, dtype=object)
+    if isinstance(codes, pd.Series) and len(codes) and isinstance(codes.iloc[0], list):
+        return codes.map(lambda row: sep.join(row) if len(row) else empty)
+    return codes
+
+
+def format_code_column(df, column='ICD_Codes', sep='|', empty='None'):
+    """Copy of `df` with its list-typed ICD code column joined for display."""
+    if column not in df.columns:
+        return df
+    formatted = df.copy()
+    formatted[column] = format_code_lists(df[column], sep, empty)
+    return formatted
+
+
+def code_evidence(codes, lookup):
+    """Which code put which condition on which row, as integer indices.
+
+    `codes` is a list-typed ICD code column. Returns (evidence, dictionary):
+    evidence has one row per (row, condition, code) hit with int32 `row`,
+    uint8 `condition` (index into lookup.condition_keys) and int32 `code`
+    (index into dictionary).
+    """
+    lists = _list_array(codes)
+    rows = pc.list_parent_indices(lists).to_numpy()
+    flat = pc.list_flatten(lists).cast(pa.string())
+    masks, _, indices, dictionary = encode_codes(pa.chunked_array([flat]), lookup)
+
+    hits = (masks[:, None] >> np.arange(len(lookup.condition_keys), dtype=np.uint64)) & np.uint64(1)
+    element, condition = np.nonzero(hits)
+    evidence = pd.DataFrame({
+        'row': rows[element].astype(np.int32),
+        'condition': condition.astype(np.uint8),
+        'code': indices[element],
+    })
+    return evidence, dictionary[:-1]
+
+
+def encode_codes(column, lookup):
+    """Condition masks and normalized codes for one ICD column.
+
+    The column is dictionary-encoded and only its distinct values are
+    normalized and looked up; rows refer to them by index, so the code
+    strings themselves are never copied. Returns (row_masks, row_present,
+    indices, codes) where codes[indices[i]] is row i's normalized code.
+    """
+    if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+            or pa.types.is_string_view(column.type)):
+        column = pc.cast(column, pa.string())
+    encoded = pc.dictionary_encode(column).unify_dictionaries()
+
+    dictionary = encoded.chunk(0).dictionary.to_pylist() if encoded.num_chunks else []
+    codes = [canonical_icd10(value) for value in dictionary] + ['']
+    masks = np.array([lookup.mask(code) if code else 0 for code in codes], dtype=np.uint64)
+    present = np.array([code != '' for code in codes])
+
+    null_slot = len(codes) - 1
+    indices = np.concatenate(
+        [pc.fill_null(chunk.indices, null_slot).to_numpy() for chunk in encoded.chunks]
+        or [np.empty(0, dtype=np.int32)]
+    ).astype(np.int32, copy=False)
+    return masks[indices], present[indices], indices, codes
+
+
+def encode_frame(df, lookup, icd_cols):
+    """pandas counterpart of encode_codes over all ICD columns of a frame.
+
+    Each column is factorized and only its distinct values are normalized
+    and looked up. Returns (masks, has_codes, icd_codes): the ORed condition
+    mask per row, whether the row has any code, and the row's canonical
+    codes in column order as a CodeListBuilder-layout list column.
+    """
+    n_rows = len(df)
+    masks = np.zeros(n_rows, dtype=np.uint64)
+    dictionary = {}
+    slot_indices = []
+    for col in icd_cols:
+        if col not in df.columns:
+            continue
+        positions, uniques = pd.factorize(df[col])
+        codes = [canonical_icd10(value) for value in uniques] + ['']
+        code_masks = np.array([lookup.mask(code) if code else 0 for code in codes], dtype=np.uint64)
+        remap = np.array([dictionary.setdefault(code, len(dictionary)) if code else -1 for code in codes],
+                         dtype=np.int32)
+        masks |= code_masks[positions]  # -1 (missing) picks the trailing ''
+        slot_indices.append(remap[positions])
+
+    indices = np.column_stack(slot_indices) if slot_indices else np.zeros((n_rows, 0), dtype=np.int32)
+    present = indices >= 0
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(present.sum(axis=1), out=offsets[1:])
+    return masks, present.any(axis=1), code_list_column(offsets, indices[present], list(dictionary))
+
+
+def score_arrow(data, lookup, icd_cols, score_col='CCI_Score', null_without_codes=True,
+                id_cols=('DSYSRTKY', 'CLAIMNO')):
+    """Score an Arrow-compatible claims table and return a pyarrow Table.
+
+    Columns follow the pandas batch paths: with null_without_codes=True
+    (process_calculator) claims without codes get a null score, 0 flags
+    and 'No' in Has_ICD_Codes; otherwise
+    (AlignedCharlsonCalculator.process_dataframe) they score 0. ICD_Codes
+    is a list<dictionary<int32, string>> column in both cases.
+    """
+    table = to_arrow_table(data)
+    n_rows = table.num_rows
+    for col in id_cols:
+        if col not in table.column_names:
+            raise ValueError(f"Column '{col}' not found in dataset! Available columns: {table.column_names}")
+
+    masks = np.zeros(n_rows, dtype=np.uint64)
+    dictionary = {}
+    slot_indices = []
+    slot_present = []
+    for col in icd_cols:
+        if col not in table.column_names:
+            continue
+        col_masks, present, indices, codes = encode_codes(table.column(col), lookup)
+        masks |= col_masks
+        # Re-number this column's distinct codes into the shared dictionary
+        remap = np.array([dictionary.setdefault(code, len(dictionary)) if code else -1 for code in codes],
+                         dtype=np.int32)
+        slot_indices.append(remap[indices])
+        slot_present.append(present)
+
+    if slot_indices:
+        present = np.column_stack(slot_present)
+        icd_codes = code_list_array(np.column_stack(slot_indices), present, list(dictionary))
+        has_codes = present.any(axis=1)
+    else:
+        icd_codes = code_list_array(np.zeros((n_rows, 0)), np.zeros((n_rows, 0), dtype=bool), [])
+        has_codes = np.zeros(n_rows, dtype=bool)
+
+    flags = np.ascontiguousarray(lookup.flag_matrix(masks).T)
+    scores = flags.T.astype(np.int64) @ lookup.points
+
+    missing = ~has_codes if null_without_codes else None
+    columns = {col: table.column(col) for col in id_cols}
+    columns[score_col] = pa.array(scores.astype(smallest_uint_dtype(scores.max() if n_rows else 0)), mask=missing)
+    if null_without_codes:
+        columns['Has_ICD_Codes'] = pa.array(np.where(has_codes, 'Yes', 'No'), pa.string())
+    columns['ICD_Codes'] = icd_codes
+    for j, key in enumerate(lookup.condition_keys):
+        columns[key] = pa.array(flags[j])
+    return pa.table(columns)
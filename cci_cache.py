@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from importlib.metadata import PackageNotFoundError, version
+
+from cci_checkpoint import content_fingerprint
+from cci_engine import mapping_version
+from cci_store import ResultStore, write_store
+
+DEFAULT_CACHE_DIR = '.cci_cache'
+DEFAULT_MAX_BYTES = 1 << 30
+INDEX = 'index.json'
+
+
+def package_version(name):
+    """Installed version of a distribution, or None when it is not installed."""
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of scored results.
+
+    An entry's key hashes everything the results depend on: the SHA-256 of
+    the input file, the columns read, the mapping version, the calculator,
+    its options and the installed versions of any scoring packages it
+    uses. A changed input, mapping or package therefore misses instead of
+    returning stale scores. Entries are result stores (<key>.cci), so a
+    hit is a memory-mapped read. index.json tracks each entry's size and
+    last use; put() evicts least recently used entries until the cache
+    fits in max_bytes.
+
+        cache = ResultCache()
+        key = cache.key('claims.csv', columns, mapping, 'aligned')
+        results, hit = cache.load_or_score(key, lambda: score(df), condition_keys)
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX)
+        os.makedirs(directory, exist_ok=True)
+        self.index = {'entries': {}, 'fingerprints': {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _save(self):
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.cci')
+
+    def input_hash(self, input_path):
+        """SHA-256 of the input; the file is only re-read when its size or mtime changed."""
+        stat = os.stat(input_path)
+        known = self.index['fingerprints'].get(os.path.abspath(input_path))
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['sha256']
+        fingerprint = content_fingerprint(input_path)
+        self.index['fingerprints'][os.path.abspath(input_path)] = {**fingerprint, 'mtime_ns': stat.st_mtime_ns}
+        self._save()
+        return fingerprint['sha256']
+
+    def key(self, input_path, columns, mapping, calculator, options=None, packages=()):
+        """Cache key; `packages` names distributions (e.g. 'comorbidipy') whose version the scores depend on."""
+        payload = json.dumps({
+            'input': self.input_hash(input_path),
+            'columns': list(columns),
+            'mapping_version': mapping_version(mapping),
+            'calculator': calculator,
+            'options': options or {},
+            'packages': {name: package_version(name) for name in packages},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        """Cached results for `key`, or None on a miss.
+
+        An entry whose store file is missing or unreadable is dropped from
+        the index and counts as a miss.
+        """
+        entry = self.index['entries'].get(key)
+        if entry is None:
+            return None
+        try:
+            results = ResultStore(self.path(key)).to_frame()
+        except (OSError, ValueError, KeyError, IndexError):
+            self._remove(key)
+            self._save()
+            return None
+        entry['last_used'] = time.time()
+        self._save()
+        return results
+
+    def put(self, key, results, condition_keys=(), id_cols=('DSYSRTKY',), score_col='CCI_Score', label=None):
+        tmp_path = f'{self.path(key)}.tmp'
+        write_store(tmp_path, results, condition_keys, id_cols, score_col)
+        os.replace(tmp_path, self.path(key))
+        now = time.time()
+        self.index['entries'][key] = {
+            'label': label,
+            'rows': len(results),
+            'size': os.path.getsize(self.path(key)),
+            'created': now,
+            'last_used': now,
+        }
+        self.evict()
+        self._save()
+
+    def load_or_score(self, key, score, condition_keys=(), id_cols=('DSYSRTKY',), score_col='CCI_Score', label=None):
+        """(results, hit): cached results, or score() stored under `key` on a miss."""
+        results = self.get(key)
+        if results is not None:
+            return results, True
+        results = score()
+        self.put(key, results, condition_keys, id_cols, score_col, label)
+        return results, False
+
+    def size(self):
+        return sum(entry['size'] for entry in self.index['entries'].values())
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries until the cache fits; returns the dropped keys."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.index['entries']
+        total = self.size()
+        dropped = []
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= max_bytes:
+                break
+            total -= entries[key]['size']
+            self._remove(key)
+            dropped.append(key)
+        if dropped:
+            self._save()
+        return dropped
+
+    def _remove(self, key):
+        self.index['entries'].pop(key, None)
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+    def invalidate(self, key):
+        """Remove one entry; returns whether it existed."""
+        existed = key in self.index['entries']
+        self._remove(key)
+        self._save()
+        return existed
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.cci') or name.endswith('.cci.tmp'):
+                os.remove(os.path.join(self.directory, name))
+        self.index = {'entries': {}, 'fingerprints': {}}
+        self._save()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect and manage the scored-results cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python cci_cache.py --list
+  python cci_cache.py --invalidate 3f9c2a...
+  python cci_cache.py --max-mb 200
+  python cci_cache.py --clear
+        """
+    )
+    parser.add_argument('--dir', default=DEFAULT_CACHE_DIR, help=f'Cache directory (default: {DEFAULT_CACHE_DIR})')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--list', action='store_true', help='List entries, most recently used first (default)')
+    action.add_argument('--invalidate', nargs='+', metavar='KEY', help='Remove these entries')
+    action.add_argument('--max-mb', type=float, help='Evict least recently used entries down to this size')
+    action.add_argument('--clear', action='store_true', help='Remove every entry')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.dir)
+    if args.invalidate:
+        for key in args.invalidate:
+            print(f"{key}: {'removed' if cache.invalidate(key) else 'not cached'}")
+    elif args.max_mb is not None:
+        dropped = cache.evict(int(args.max_mb * (1 << 20)))
+        print(f"Evicted {len(dropped)} entries; cache is {cache.size() / (1 << 20):.1f} MB")
+    elif args.clear:
+        cache.clear()
+        print(f"Cleared '{args.dir}'")
+    else:
+        entries = cache.index['entries']
+        for key in sorted(entries, key=lambda k: -entries[k]['last_used']):
+            entry = entries[key]
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+            print(f"{key}  {entry['size'] / (1 << 20):8.1f} MB  {entry['rows']:>9} rows  {used}  {entry['label'] or ''}")
+        print(f"{len(entries)} entries, {cache.size() / (1 << 20):.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
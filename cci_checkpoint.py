@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from cci_store import ResultStore, write_store
+
+MANIFEST = 'manifest.json'
+
+
+def content_fingerprint(path, block_size=1 << 20):
+    """Size and SHA-256 of a file's content, read in 1 MiB blocks.
+
+    Unlike cci_watch.file_fingerprint (size and mtime, a cheap change
+    probe), this identifies the content itself.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return {'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+class ShardCheckpoint:
+    """Completed shards of a long scoring run, persisted to a local directory.
+
+    The input rows are scored in shards of `shard_size` rows. Each finished
+    shard is written as a result store (shard_<start>.cci) and recorded in
+    manifest.json with its input offsets [start, end), next to the run's
+    identity: input fingerprint, mapping version and options. With
+    resume=True the identity is verified and recorded shards are skipped,
+    so a run that died only repeats unfinished shards and the final
+    assembly. Without it the directory starts over.
+    """
+
+    def __init__(self, directory, identity, condition_keys, id_cols=('DSYSRTKY', 'CLAIMNO'),
+                 shard_size=100_000, resume=False):
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1")
+        self.directory = directory
+        self.identity = json.loads(json.dumps(identity))  # compare in the form it is stored
+        self.condition_keys = list(condition_keys)
+        self.id_cols = list(id_cols)
+        self.shard_size = shard_size
+        self.shards = {}
+        self.manifest_path = os.path.join(directory, MANIFEST)
+
+        if resume and os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            changed = [key for key in self.identity if manifest['identity'].get(key) != self.identity[key]]
+            if changed:
+                raise ValueError(f"Cannot resume from '{directory}': {', '.join(changed)} changed since "
+                                 f"the checkpoint was written. Rerun without --resume to start over.")
+            self.shard_size = manifest['shard_size']
+            self.shards = {shard['start']: shard for shard in manifest['shards']
+                           if os.path.exists(os.path.join(directory, shard['file']))}
+        else:
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name == MANIFEST or (name.startswith('shard_') and name.endswith('.cci')):
+                    os.remove(os.path.join(directory, name))
+            self._save()
+
+    def _save(self):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'identity': self.identity,
+                'shard_size': self.shard_size,
+                'shards': [self.shards[start] for start in sorted(self.shards)],
+            }, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)  # never leave a half-written manifest
+
+    def ranges(self, n_rows):
+        return [(start, min(start + self.shard_size, n_rows)) for start in range(0, n_rows, self.shard_size)]
+
+    def pending(self, n_rows):
+        """Shard ranges not finished yet."""
+        return [(start, end) for start, end in self.ranges(n_rows)
+                if self.shards.get(start, {}).get('end') != end]
+
+    def run(self, df, score, progress=print):
+        """score(shard_df) for every unfinished shard, then assemble all shards.
+
+        `score` gets the shard's rows reindexed from 0 and returns their
+        results frame.
+        """
+        ranges = self.ranges(len(df))
+        pending = self.pending(len(df))
+        if len(pending) < len(ranges):
+            progress(f"Resuming: {len(ranges) - len(pending)} of {len(ranges)} shards already complete")
+        for start, end in pending:
+            results = score(df.iloc[start:end].reset_index(drop=True))
+            name = f'shard_{start:012d}.cci'
+            tmp_path = os.path.join(self.directory, f'{name}.tmp')
+            write_store(tmp_path, results, self.condition_keys, self.id_cols)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+            self.shards[start] = {'start': start, 'end': end, 'rows': len(results), 'file': name}
+            self._save()
+            progress(f"  Checkpointed rows {start}-{end} ({len(self.shards)}/{len(ranges)} shards)")
+        if not ranges:
+            return score(df)
+        return self.assemble(ranges)
+
+    def assemble(self, ranges):
+        frames = [ResultStore(os.path.join(self.directory, self.shards[start]['file'])).to_frame()
+                  for start, _ in ranges]
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from charlson_batch import survival_table
+from charlson_interactive import INTERPRETATION_BANDS
+
+BAND_UPPERS = np.array([upper for upper, _ in INTERPRETATION_BANDS if upper is not None])
+BAND_LABELS = [text.split(':')[0] for _, text in INTERPRETATION_BANDS]
+
+
+def score_histogram(scores):
+    """Patients per score (index = score) in one np.bincount; missing scores are skipped."""
+    scores = pd.Series(scores, copy=False)
+    return np.bincount(scores[scores.notna()].to_numpy(dtype=np.int64))
+
+
+def band_of_score(scores):
+    """Index into INTERPRETATION_BANDS for each score."""
+    return np.searchsorted(BAND_UPPERS, scores, side='left')
+
+
+def score_distribution(histogram):
+    """One row per score 0..max: patients, share and 10-year survival.
+
+    `histogram` is a patients-per-score array, e.g. score_histogram() or
+    ScoreSummary.histogram.
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    scores = np.arange(len(histogram))
+    total = histogram.sum()
+    return pd.DataFrame({
+        'Score': scores,
+        'Band': [BAND_LABELS[b] for b in band_of_score(scores)],
+        'Patients': histogram,
+        'Percentage': histogram / total * 100 if total else np.zeros(len(histogram)),
+        'Survival_10yr_Pct': survival_table(len(histogram) - 1)[:len(histogram)],
+    })
+
+
+def band_distribution(histogram):
+    """One row per interpretation band: patients, share and expected 10-year survival.
+
+    Scores are folded into bands with np.bincount weighted by the
+    histogram; survival is looked up once per score.
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    bands = band_of_score(np.arange(len(histogram)))
+    survival = survival_table(len(histogram) - 1)[:len(histogram)]
+    n_bands = len(INTERPRETATION_BANDS)
+
+    patients = np.bincount(bands, weights=histogram, minlength=n_bands).astype(np.int64)
+    survivors = np.bincount(bands, weights=histogram * survival / 100, minlength=n_bands)
+    total = patients.sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = np.where(patients > 0, survivors / patients * 100, np.nan)
+    return pd.DataFrame({
+        'Band': BAND_LABELS,
+        'Interpretation': [text for _, text in INTERPRETATION_BANDS],
+        'Patients': patients,
+        'Percentage': patients / total * 100 if total else np.zeros(n_bands),
+        'Expected_Survival_10yr_Pct': expected,
+        'Expected_Survivors_10yr': survivors,
+    })
+
+
+def expected_survival(histogram):
+    """Patient-weighted mean 10-year survival % over the whole distribution."""
+    histogram = np.asarray(histogram, dtype=np.int64)
+    total = histogram.sum()
+    if not total:
+        return np.nan
+    return float(histogram @ survival_table(len(histogram) - 1)[:len(histogram)] / total)
+
+
+def write_distribution_csv(prefix, histogram):
+    """Write <prefix>_score_distribution.csv and <prefix>_risk_bands.csv; returns the paths."""
+    written = [f'{prefix}_score_distribution.csv', f'{prefix}_risk_bands.csv']
+    score_distribution(histogram).to_csv(written[0], index=False)
+    band_distribution(histogram).to_csv(written[1], index=False)
+    return written
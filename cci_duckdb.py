@@ -0,0 +1,264 @@
+import argparse
+import os
+import sys
+
+try:
+    import duckdb
+except ImportError:  # optional engine
+    duckdb = None
+
+from accurate_cci_calculator import EXACT_ICD_CODES
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING
+from cci_engine import canonical_icd10, compact_scores, hierarchy_from_mapping
+
+MAPPINGS = {
+    'exact': (EXACT_ICD_CODES, True),
+    'charlson': (CHARLSON_ICD10_MAPPING, False),
+}
+
+
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def is_parquet(source):
+    return source.lower().endswith(('.parquet', '.pq'))
+
+
+def source_relation(source, varchar_cols=(), row_numbers=False):
+    """SQL table expression for a CSV/Parquet path or glob.
+
+    CSV columns in `varchar_cols` are read as text so ICD codes are never
+    mistyped by DuckDB's type sniffing. With `row_numbers`, Parquet rows
+    carry their file (cci_source_file) and position in it (file_row_number).
+    """
+    if is_parquet(source):
+        if row_numbers:
+            return f"read_parquet({quote_literal(source)}, filename = 'cci_source_file', file_row_number = true)"
+        return f"read_parquet({quote_literal(source)})"
+    if not varchar_cols:
+        return f"read_csv_auto({quote_literal(source)})"
+    types = ', '.join(f"{quote_literal(c)}: 'VARCHAR'" for c in varchar_cols)
+    return f"read_csv_auto({quote_literal(source)}, types={{{types}}})"
+
+
+class DuckDBCCIEngine:
+    """Out-of-core scoring of claim files in an embedded DuckDB database.
+
+    The condition mapping is compiled into a lookup table and joined
+    against an unpivoted (claim, position, code) view of the ICD columns,
+    read straight from CSV or Parquet. DuckDB runs the query on all cores
+    and spills to `temp_directory` once `memory_limit` is reached. The
+    result has the same columns and dtypes as process_calculator, in
+    source row order.
+    """
+
+    def __init__(self, mapping=None, exact=True, icd_prefix='ICD_DGNS_CD', max_icd_cols=12,
+                 id_col='DSYSRTKY', claim_col='CLAIMNO', database=':memory:',
+                 memory_limit=None, threads=None, temp_directory=None):
+        if duckdb is None:
+            raise ImportError("The DuckDB engine requires the 'duckdb' package (pip install duckdb)")
+
+        self.mapping = mapping if mapping is not None else (EXACT_ICD_CODES if exact else CHARLSON_ICD10_MAPPING)
+        self.exact = exact
+        self.condition_keys = list(self.mapping.keys())
+        self.hierarchy = hierarchy_from_mapping(self.mapping)
+        self.icd_cols = [f'{icd_prefix}{i}' for i in range(1, max_icd_cols + 1)]
+        self.id_col = id_col
+        self.claim_col = claim_col
+
+        self.con = duckdb.connect(database)
+        # CSV row order is recovered from a loaded table's rowid (see _claims_sql)
+        self.con.execute("SET preserve_insertion_order = true")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = {quote_literal(memory_limit)}")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if temp_directory:
+            self.con.execute(f"SET temp_directory = {quote_literal(temp_directory)}")
+        self._load_lookup()
+
+    def _load_lookup(self):
+        rows = []
+        for key, info in self.mapping.items():
+            for code in info['codes']:
+                pattern = canonical_icd10(code)
+                rows.append((pattern, len(pattern), key))
+        self.con.execute(
+            "CREATE OR REPLACE TEMP TABLE cci_lookup (pattern VARCHAR, pattern_len INTEGER, condition VARCHAR)"
+        )
+        self.con.executemany("INSERT INTO cci_lookup VALUES (?, ?, ?)", rows)
+        self._pattern_lengths = sorted({length for _, length, _ in rows})
+
+    def _available_icd_cols(self, source):
+        relation = source_relation(source)
+        columns = [row[0] for row in self.con.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()]
+        for col in (self.id_col, self.claim_col):
+            if col not in columns:
+                raise ValueError(f"Column '{col}' not found in dataset! Available columns: {columns}")
+        return [col for col in self.icd_cols if col in columns]
+
+    def _claims_sql(self, source, icd_cols):
+        """SELECT over the source rows with rid numbering them in file order.
+
+        Parquet rows are ordered by file name and file_row_number. CSV has
+        no row number, so the file is first loaded into a temp table (which
+        spills like any other once memory_limit is reached); with
+        preserve_insertion_order its rowid follows the file.
+        """
+        if is_parquet(source):
+            relation = source_relation(source, icd_cols, row_numbers=True)
+            return f"SELECT row_number() OVER (ORDER BY cci_source_file, file_row_number) AS rid, * FROM {relation}"
+        self.con.execute(f"CREATE OR REPLACE TEMP TABLE cci_claims AS SELECT * FROM {source_relation(source, icd_cols)}")
+        return "SELECT rowid AS rid, * FROM cci_claims"
+
+    def results_query(self, source, join_codes=False):
+        """Scoring SQL for `source`. ICD_Codes is a list column unless
+        join_codes=True, which formats it as a '|'-joined string for CSV.
+        A CSV source is loaded into a temp table as a side effect."""
+        icd_cols = self._available_icd_cols(source)
+        claims_sql = self._claims_sql(source, icd_cols)
+        keys = self.condition_keys
+
+        if icd_cols:
+            raw_list = ', '.join(f"CAST({quote_ident(c)} AS VARCHAR)" for c in icd_cols)
+            codes_cte = f"""
+            codes AS (
+                -- canonical_icd10: letters and digits only, dot after the category
+                SELECT rid, pos, CASE WHEN length(c) > 3 THEN left(c, 3) || '.' || substr(c, 4) ELSE c END AS code
+                FROM (
+                    SELECT rid, pos, regexp_replace(UPPER(raw), '[^0-9A-Z]', '', 'g') AS c
+                    FROM (
+                        SELECT rid, UNNEST([{raw_list}]) AS raw, UNNEST(range(1, {len(icd_cols) + 1})) AS pos
+                        FROM claims
+                    )
+                    WHERE raw IS NOT NULL
+                )
+                WHERE c <> ''
+            )"""
+        else:
+            codes_cte = "codes AS (SELECT NULL::BIGINT AS rid, NULL::BIGINT AS pos, NULL::VARCHAR AS code WHERE false)"
+
+        if self.exact:
+            match_sql = "SELECT c.rid, m.condition FROM codes c JOIN cci_lookup m ON c.code = m.pattern"
+        else:
+            # One equi-join per prefix length keeps the joins hash-based
+            match_sql = '\nUNION\n'.join(
+                f"SELECT c.rid, m.condition FROM codes c JOIN cci_lookup m "
+                f"ON m.pattern_len = {n} AND left(c.code, {n}) = m.pattern"
+                for n in self._pattern_lengths
+            )
+
+        raw_flags = ',\n'.join(
+            f"MAX(CASE WHEN condition = {quote_literal(k)} THEN 1 ELSE 0 END) AS {quote_ident(k)}"
+            for k in keys
+        )
+        severe_of = dict(self.hierarchy)
+        adjusted = []
+        for k in keys:
+            flag = f"COALESCE(f.{quote_ident(k)}, 0)"
+            if k in severe_of:
+                flag = f"CASE WHEN COALESCE(f.{quote_ident(severe_of[k])}, 0) = 1 THEN 0 ELSE {flag} END"
+            adjusted.append(f"{flag} AS {quote_ident(k)}")
+        score_expr = ' + '.join(f"{int(self.mapping[k]['points'])} * a.{quote_ident(k)}" for k in keys) or '0'
+        if join_codes:
+            codes_expr = "COALESCE(array_to_string(a.icd_codes, '|'), 'None')"
+        else:
+            codes_expr = "COALESCE(a.icd_codes, []::VARCHAR[])"
+
+        return f"""
+        WITH claims AS (
+            {claims_sql}
+        ),
+        {codes_cte},
+        code_lists AS (
+            SELECT rid, list(code ORDER BY pos) AS icd_codes FROM codes GROUP BY rid
+        ),
+        matches AS (
+            {match_sql}
+        ),
+        flags AS (
+            SELECT rid,
+            {raw_flags}
+            FROM matches GROUP BY rid
+        ),
+        adjusted AS (
+            SELECT cl.rid, cl.{quote_ident(self.id_col)} AS id, cl.{quote_ident(self.claim_col)} AS claim,
+                   l.icd_codes,
+                   {', '.join(adjusted)}
+            FROM claims cl
+            LEFT JOIN code_lists l ON l.rid = cl.rid
+            LEFT JOIN flags f ON f.rid = cl.rid
+        )
+        SELECT
+            a.id AS "DSYSRTKY",
+            a.claim AS "CLAIMNO",
+            CASE WHEN a.icd_codes IS NULL THEN NULL ELSE {score_expr} END AS "CCI_Score",
+            CASE WHEN a.icd_codes IS NULL THEN 'No' ELSE 'Yes' END AS "Has_ICD_Codes",
+            {codes_expr} AS "ICD_Codes",
+            {', '.join(f'a.{quote_ident(k)}' for k in keys)}
+        FROM adjusted a
+        ORDER BY a.rid
+        """
+
+    def score(self, source):
+        """Score a CSV/Parquet path (or glob) and return a pandas DataFrame."""
+        results = self.con.execute(self.results_query(source)).fetchdf()
+        # Nullable UInt8 score (missing without codes) and uint8 flags, as in process_calculator
+        scores = results['CCI_Score']
+        results['CCI_Score'] = compact_scores(scores.fillna(0).to_numpy(dtype='int64'), scores.notna().to_numpy())
+        for key in self.condition_keys:
+            results[key] = results[key].to_numpy(dtype='uint8')
+        return results
+
+    def score_to_file(self, source, output):
+        """Stream results straight to a .parquet or .csv file without collecting them."""
+        parquet = output.lower().endswith(('.parquet', '.pq'))
+        query = self.results_query(source, join_codes=not parquet)
+        self.con.execute(f"COPY ({query}) TO {quote_literal(output)} (FORMAT {'PARQUET' if parquet else 'CSV, HEADER'})")
+        return output
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Out-of-core CCI scoring with an embedded DuckDB database",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python cci_duckdb.py --input claims.csv --output results.parquet
+  python cci_duckdb.py --input 'extracts/*.parquet' --output results.parquet --mapping charlson
+  python cci_duckdb.py --input big.csv --output results.csv --memory-limit 4GB --temp-dir /scratch
+        """
+    )
+    parser.add_argument('--input', '-i', required=True, help='CSV or Parquet file path or glob')
+    parser.add_argument('--output', '-o', required=True, help='Output .parquet or .csv file')
+    parser.add_argument('--mapping', choices=sorted(MAPPINGS), default='exact',
+                        help='exact: EXACT_ICD_CODES, charlson: CHARLSON_ICD10_MAPPING (default: exact)')
+    parser.add_argument('--id-col', default='DSYSRTKY', help='Column name for patient ID (default: DSYSRTKY)')
+    parser.add_argument('--claim-col', default='CLAIMNO', help='Column name for claim number (default: CLAIMNO)')
+    parser.add_argument('--icd-prefix', default='ICD_DGNS_CD', help='Prefix for ICD code columns (default: ICD_DGNS_CD)')
+    parser.add_argument('--max-icd-cols', type=int, default=12, help='Maximum number of ICD code columns (default: 12)')
+    parser.add_argument('--memory-limit', default=None, help="DuckDB memory limit, e.g. '4GB'")
+    parser.add_argument('--threads', type=int, default=None, help='Worker threads (default: all cores)')
+    parser.add_argument('--temp-dir', default=None, help='Spill directory for larger-than-memory runs')
+    args = parser.parse_args()
+
+    mapping, exact = MAPPINGS[args.mapping]
+    try:
+        engine = DuckDBCCIEngine(
+            mapping, exact, args.icd_prefix, args.max_icd_cols, args.id_col, args.claim_col,
+            memory_limit=args.memory_limit, threads=args.threads, temp_directory=args.temp_dir,
+        )
+        engine.score_to_file(args.input, args.output)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+_NON_CODE_CHARS = re.compile(r'[^0-9A-Z]')
+# Memo bounds: ICD-10-CM has ~75k codes, and long-running processes (the
+# watcher, service and stream) must not keep every junk value seen forever
+CODE_CACHE_SIZE = 1 << 18
+
+
+def canonical_icd10(code):
+    """Canonical dotted form of an ICD-10 code: 'i5022 ', 'I50.22' and
+    'I5022-' all become 'I50.22'.
+
+    Case, whitespace, dots and other punctuation are normalized and the
+    dot is placed after the 3-character category. Results are memoized per
+    raw value in a bounded LRU cache, so each recently seen code is
+    normalized once. Null or blank values give ''.
+    """
+    if not isinstance(code, str):
+        if code is None or pd.isna(code):
+            return ''
+        code = str(code)
+    return _canonical_text(code)
+
+
+@lru_cache(maxsize=CODE_CACHE_SIZE)
+def _canonical_text(code):
+    compact = _NON_CODE_CHARS.sub('', code.upper())
+    return f'{compact[:3]}.{compact[3:]}' if len(compact) > 3 else compact
+
+
+def canonicalize_codes(values):
+    """canonical_icd10 over a Series, computed once per distinct value."""
+    codes, uniques = pd.factorize(values)
+    table = np.array([canonical_icd10(value) for value in uniques] + [''], dtype=object)
+    return pd.Series(table[codes], index=values.index)  # -1 (missing) picks the trailing ''
+
+
+def hierarchy_from_mapping(mapping):
+    """Return (mild, severe) pairs declared with 'superseded_by' in a mapping."""
+    pairs = []
+    for cond_key, cond_info in mapping.items():
+        severe = cond_info.get('superseded_by')
+        if severe and severe in mapping:
+            pairs.append((cond_key, severe))
+    return pairs
+
+
+def condition_points(mapping, condition_keys=None):
+    if condition_keys is None:
+        condition_keys = list(mapping.keys())
+    return np.array([mapping[k]['points'] for k in condition_keys], dtype=np.int64)
+
+
+def mapping_version(mapping):
+    """Short content hash of a condition mapping.
+
+    Changes whenever a code, point value, name or hierarchy rule does, so
+    persisted results can be tied to the mapping that produced them.
+    """
+    payload = json.dumps(mapping, sort_keys=True, default=sorted)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def apply_hierarchy(flags, condition_keys, hierarchy):
+    """Zero the mild column of every (mild, severe) pair where severe is set.
+
+    `flags` is a 2-D (rows x conditions) array and is modified in place.
+    """
+    index = {k: j for j, k in enumerate(condition_keys)}
+    for mild, severe in hierarchy:
+        if mild in index and severe in index:
+            flags[flags[:, index[severe]] != 0, index[mild]] = 0
+    return flags
+
+
+def apply_hierarchy_dict(conditions, hierarchy):
+    """Single-row version of apply_hierarchy for {key: 0/1} dicts."""
+    for mild, severe in hierarchy:
+        if conditions.get(severe) and conditions.get(mild):
+            conditions[mild] = 0
+    return conditions
+
+
+def score_flags(flags, points):
+    return flags @ points
+
+
+def smallest_uint_dtype(max_value):
+    """Smallest unsigned integer dtype holding 0..max_value (uint8 for any CCI)."""
+    return np.min_scalar_type(max(int(max_value), 0))
+
+
+def compact_scores(scores, has_codes=None):
+    """Scores in the smallest unsigned dtype that fits.
+
+    With `has_codes`, rows without codes are missing and the result is a
+    nullable pandas UInt* array rather than a float column holding NaN.
+    """
+    scores = np.asarray(scores)
+    values = scores.astype(smallest_uint_dtype(scores.max() if len(scores) else 0))
+    if has_codes is None:
+        return values
+    return pd.arrays.IntegerArray(values, ~np.asarray(has_codes, dtype=bool))
+
+
+def pack_flags(flags):
+    """Bit-pack a (rows x conditions) 0/1 matrix into one unsigned int per row.
+
+    Bit j holds column j, the same layout as ConditionMaskLookup masks.
+    """
+    flags = np.asarray(flags)
+    dtype = smallest_uint_dtype((1 << flags.shape[1]) - 1)
+    weights = (np.uint64(1) << np.arange(flags.shape[1], dtype=np.uint64)).astype(dtype)
+    return (flags != 0).astype(dtype) @ weights
+
+
+def unpack_flags(packed, n_conditions):
+    packed = np.asarray(packed)
+    shifts = np.arange(n_conditions, dtype=packed.dtype)
+    return ((packed[:, None] >> shifts) & 1).astype(np.uint8)
+
+
+def pack_condition_columns(results, condition_keys, column='Condition_Bits'):
+    """Replace the per-condition flag columns with one bit-packed column for storage."""
+    packed = results.drop(columns=condition_keys)
+    packed[column] = pack_flags(results[condition_keys].to_numpy())
+    return packed
+
+
+def unpack_condition_columns(results, condition_keys, column='Condition_Bits'):
+    """Inverse of pack_condition_columns: uint8 flag columns in condition_keys order."""
+    flags = unpack_flags(results[column].to_numpy(), len(condition_keys))
+    unpacked = results.drop(columns=[column])
+    for j, key in enumerate(condition_keys):
+        unpacked[key] = flags[:, j]
+    return unpacked
+
+
+def missing_as_none(df):
+    """Object copy of `df` with None for NaN/NA, for openpyxl cell values."""
+    return df.astype(object).where(df.notna(), None)
+
+
+def blank_icd_rows(df, icd_cols):
+    """Boolean array, True where every ICD column of a row is null or blank.
+
+    Vectorized over the whole frame so such rows can skip code extraction
+    and matching entirely.
+    """
+    present = [col for col in icd_cols if col in df.columns]
+    if not present:
+        return np.ones(len(df), dtype=bool)
+    text = df[present].astype('string')
+    filled = text.apply(lambda col: col.str.strip().str.len() > 0).fillna(False)
+    return ~filled.to_numpy(dtype=bool).any(axis=1)
+
+
+class CodePrefilter:
+    """Cheap reject test for ICD codes that can never match a mapping.
+
+    A code is relevant only if its first character and its 3-character
+    category both occur among the mapping's codes (prefixes shorter than a
+    category are checked with startswith). Most claim codes - the Z and R
+    chapters, for example - fail on the first character, so matching work
+    scales with the relevant codes only. With exact=True (equality
+    mappings such as EXACT_ICD_CODES) the test is plain set membership.
+    Codes must already be in canonical_icd10 form.
+    """
+
+    CATEGORY_LEN = 3
+
+    def __init__(self, mapping, exact=False):
+        patterns = {
+            canonical_icd10(code)
+            for cond_info in mapping.values()
+            for code in cond_info['codes']
+        }
+        patterns.discard('')
+        self.exact = exact
+        self.patterns = frozenset(patterns)
+        self.first_chars = {p[0] for p in patterns}
+        self.categories = {p[:self.CATEGORY_LEN] for p in patterns if len(p) >= self.CATEGORY_LEN}
+        self.short_prefixes = tuple(p for p in patterns if len(p) < self.CATEGORY_LEN)
+
+    def relevant(self, code):
+        if self.exact:
+            return code in self.patterns
+        if not code or code[0] not in self.first_chars:
+            return False
+        return code[:self.CATEGORY_LEN] in self.categories or code.startswith(self.short_prefixes)
+
+    def filter(self, codes):
+        return [code for code in codes if self.relevant(code)]
+
+
+def group_or(group_codes, flags, n_groups):
+    """OR the rows of `flags` that share a group code.
+
+    Hash-based: `group_codes` comes from pd.factorize, and each condition
+    column is reduced with one np.bincount, so the cost is linear in rows.
+    """
+    out = np.zeros((n_groups, flags.shape[1]), dtype=np.uint8)
+    for j in range(flags.shape[1]):
+        out[:, j] = np.bincount(group_codes[flags[:, j] != 0], minlength=n_groups) > 0
+    return out
+
+
+def rollup_patients(results, condition_keys, points, hierarchy=(),
+                    id_col='DSYSRTKY', score_col='CCI_Score'):
+    """Collapse a claim-level results frame to one row per patient.
+
+    Condition flags are ORed over all of a patient's claims, hierarchy
+    rules are re-applied on the patient-level matrix and the score is
+    computed once per patient.
+    """
+    group_codes, patient_ids = pd.factorize(results[id_col], use_na_sentinel=False)
+    n_patients = len(patient_ids)
+
+    claim_flags = results[condition_keys].fillna(0).to_numpy()
+    flags = group_or(group_codes, claim_flags, n_patients)
+    apply_hierarchy(flags, condition_keys, hierarchy)
+    scores = score_flags(flags, points)
+
+    rollup = pd.DataFrame({
+        id_col: patient_ids,
+        'N_Claims': np.bincount(group_codes, minlength=n_patients),
+    })
+    if 'Has_ICD_Codes' in results.columns:
+        with_codes = (results['Has_ICD_Codes'] == 'Yes').to_numpy()
+        has_codes = np.bincount(group_codes[with_codes], minlength=n_patients) > 0
+        rollup[score_col] = compact_scores(scores, has_codes)
+        rollup['Has_ICD_Codes'] = np.where(has_codes, 'Yes', 'No')
+    else:
+        rollup[score_col] = compact_scores(scores)
+    for j, key in enumerate(condition_keys):
+        rollup[key] = flags[:, j]
+
+    return rollup
+
+
+def hierarchy_bits(condition_keys, hierarchy):
+    """(mild_bit, severe_bit) pairs for bitmask-encoded condition sets."""
+    index = {k: j for j, k in enumerate(condition_keys)}
+    return [
+        (1 << index[mild], 1 << index[severe])
+        for mild, severe in hierarchy
+        if mild in index and severe in index
+    ]
+
+
+def mask_after_hierarchy(mask, bit_pairs):
+    for mild_bit, severe_bit in bit_pairs:
+        if mask & severe_bit:
+            mask &= ~mild_bit
+    return mask
+
+
+class ConditionMaskLookup:
+    """Map single ICD codes to a bitmask of the conditions they trigger.
+
+    Bit j is set when the code matches condition_keys[j]. Prefix mappings
+    (CHARLSON_ICD10_MAPPING) match on code.startswith(prefix); exact
+    mappings (EXACT_ICD_CODES) on equality. Codes and patterns are compared
+    in canonical_icd10 form, so dotted and dotless codes match alike.
+    Results are memoized per raw code in a bounded LRU cache, so repeated
+    codes cost one cache lookup. `hierarchy` overrides the
+    rules declared in the mapping (pass [] to disable them).
+    """
+
+    def __init__(self, mapping, exact=False, hierarchy=None):
+        self.condition_keys = list(mapping.keys())
+        self.points = condition_points(mapping, self.condition_keys)
+        self.hierarchy = hierarchy_from_mapping(mapping) if hierarchy is None else list(hierarchy)
+        self.bit_pairs = hierarchy_bits(self.condition_keys, self.hierarchy)
+        self.exact = exact
+
+        self._patterns = {}
+        for j, key in enumerate(self.condition_keys):
+            for code in mapping[key]['codes']:
+                pattern = canonical_icd10(code)
+                self._patterns[pattern] = self._patterns.get(pattern, 0) | (1 << j)
+        self._lengths = sorted({len(p) for p in self._patterns})
+        self.mask = lru_cache(maxsize=CODE_CACHE_SIZE)(self._mask)
+
+    def _mask(self, code):
+        normalized = canonical_icd10(code)
+        if self.exact:
+            mask = self._patterns.get(normalized, 0)
+        else:
+            mask = 0
+            for length in self._lengths:
+                if len(normalized) >= length:
+                    mask |= self._patterns.get(normalized[:length], 0)
+        return mask
+
+    def codes_mask(self, codes):
+        mask = 0
+        for code in codes:
+            mask |= self.mask(code)
+        return mask
+
+    def score(self, mask):
+        """Score of a raw condition mask, after hierarchy rules."""
+        mask = mask_after_hierarchy(mask, self.bit_pairs)
+        score = 0
+        j = 0
+        while mask:
+            if mask & 1:
+                score += int(self.points[j])
+            mask >>= 1
+            j += 1
+        return score
+
+    def flags(self, mask):
+        mask = mask_after_hierarchy(mask, self.bit_pairs)
+        return {key: (mask >> j) & 1 for j, key in enumerate(self.condition_keys)}
+
+    def flag_matrix(self, masks):
+        """Vectorized flags(): (n, n_conditions) uint8 matrix after hierarchy rules."""
+        masks = np.asarray(masks, dtype=np.uint64)
+        for mild_bit, severe_bit in self.bit_pairs:
+            masks = np.where(masks & np.uint64(severe_bit), masks & ~np.uint64(mild_bit), masks)
+        bits = (masks[:, None] >> np.arange(len(self.condition_keys), dtype=np.uint64)) & np.uint64(1)
+        return bits.astype(np.uint8)
+
+    def score_masks(self, masks):
+        """Vectorized score() over an array of raw condition masks."""
+        return self.flag_matrix(masks).astype(np.int64) @ self.points
@@ -0,0 +1,162 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING
+from cci_engine import ConditionMaskLookup, mask_after_hierarchy
+
+NEVER_SEEN = np.iinfo(np.int32).min
+
+
+@lru_cache(maxsize=4096)
+def to_day(date):
+    """Days since 1970-01-01 for a date string, datetime or datetime64."""
+    return int(np.datetime64(pd.Timestamp(date), 'D').astype(np.int64))
+
+
+class IncrementalCCIScorer:
+    """Keeps a running CCI per patient as claims stream in.
+
+    State per patient is one slot in preallocated NumPy arrays: the last
+    day each condition was seen (int32) plus the current condition bitmask
+    and score. Adding a claim costs O(codes); conditions not seen within
+    `window_days` of the newest claim age out (pass window_days=None to
+    keep them forever).
+    """
+
+    def __init__(self, mapping=None, window_days=365, exact=False, initial_capacity=1024):
+        self.lookup = ConditionMaskLookup(
+            mapping if mapping is not None else CHARLSON_ICD10_MAPPING, exact=exact)
+        self.condition_keys = self.lookup.condition_keys
+        self.window_days = window_days
+        self.clock = None
+
+        n_conditions = len(self.condition_keys)
+        if n_conditions > 32:
+            raise ValueError("IncrementalCCIScorer supports at most 32 conditions")
+        self._slots = {}
+        self._free = []
+        # Reverse of _slots, so eviction can find freed patients with array operations
+        self._slot_ids = np.empty(initial_capacity, dtype=object)
+        self._occupied = np.zeros(initial_capacity, dtype=bool)
+        self._last_seen = np.full((initial_capacity, n_conditions), NEVER_SEEN, dtype=np.int32)
+        self._masks = np.zeros(initial_capacity, dtype=np.uint32)
+        self._scores = np.zeros(initial_capacity, dtype=np.int16)
+        self._next_slot = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self):
+        capacity = len(self._masks) * 2
+        last_seen = np.full((capacity, len(self.condition_keys)), NEVER_SEEN, dtype=np.int32)
+        last_seen[:len(self._last_seen)] = self._last_seen
+        self._last_seen = last_seen
+        self._masks = np.resize(self._masks, capacity)
+        self._scores = np.resize(self._scores, capacity)
+        slot_ids = np.empty(capacity, dtype=object)
+        slot_ids[:len(self._slot_ids)] = self._slot_ids
+        self._slot_ids = slot_ids
+        occupied = np.zeros(capacity, dtype=bool)
+        occupied[:len(self._occupied)] = self._occupied
+        self._occupied = occupied
+
+    def _slot_for(self, patient_id):
+        slot = self._slots.get(patient_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._next_slot == len(self._masks):
+                    self._grow()
+                slot = self._next_slot
+                self._next_slot += 1
+            self._last_seen[slot] = NEVER_SEEN
+            self._masks[slot] = 0
+            self._scores[slot] = 0
+            self._slots[patient_id] = slot
+            self._slot_ids[slot] = patient_id
+            self._occupied[slot] = True
+        return slot
+
+    def add_claim(self, patient_id, codes, claim_date):
+        """Fold one claim into the patient's state and return the new score."""
+        day = to_day(claim_date)
+        if self.clock is None or day > self.clock:
+            self.clock = day
+
+        claim_mask = self.lookup.codes_mask(codes)
+        slot = self._slot_for(patient_id)
+        last_seen = self._last_seen[slot]
+
+        bits = claim_mask
+        j = 0
+        while bits:
+            if bits & 1 and day > last_seen[j]:
+                last_seen[j] = day
+            bits >>= 1
+            j += 1
+
+        mask = int(self._masks[slot]) | claim_mask
+        if self.window_days is not None:
+            mask = self._active_mask(last_seen, self.clock - self.window_days)
+        self._masks[slot] = mask
+        self._scores[slot] = self.lookup.score(mask)
+        return int(self._scores[slot])
+
+    def _active_mask(self, last_seen, cutoff):
+        mask = 0
+        for j in np.flatnonzero(last_seen >= cutoff):
+            mask |= 1 << int(j)
+        return mask
+
+    def evict_expired(self, as_of=None):
+        """Drop conditions older than the window for every patient at once.
+
+        Patients left with no active condition release their slot. Returns
+        the number of patients released.
+        """
+        if self.window_days is None or self.clock is None:
+            return 0
+        now = self.clock if as_of is None else to_day(as_of)
+        cutoff = now - self.window_days
+
+        used = self._next_slot
+        active = self._last_seen[:used] >= cutoff
+        weights = (np.uint32(1) << np.arange(len(self.condition_keys), dtype=np.uint32))
+        masks = (active * weights).sum(axis=1).astype(np.uint32)
+        changed = np.flatnonzero(masks != self._masks[:used])
+        self._last_seen[:used][~active] = NEVER_SEEN
+        self._masks[:used] = masks
+        for slot in changed:
+            self._scores[slot] = self.lookup.score(int(masks[slot]))
+
+        released = np.flatnonzero((masks == 0) & self._occupied[:used])
+        for patient_id in self._slot_ids[released]:
+            del self._slots[patient_id]
+        self._slot_ids[released] = None
+        self._occupied[released] = False
+        self._free.extend(released.tolist())
+        return len(released)
+
+    def score(self, patient_id):
+        slot = self._slots.get(patient_id)
+        return 0 if slot is None else int(self._scores[slot])
+
+    def conditions(self, patient_id):
+        slot = self._slots.get(patient_id)
+        return self.lookup.flags(0 if slot is None else int(self._masks[slot]))
+
+    def snapshot(self, id_col='DSYSRTKY', score_col='CCI_Score'):
+        """DataFrame of all tracked patients with flags and current score."""
+        patient_ids = list(self._slots.keys())
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(patient_ids))
+        masks = np.array([
+            mask_after_hierarchy(int(m), self.lookup.bit_pairs) for m in self._masks[slots]
+        ], dtype=np.uint32)
+
+        snapshot = pd.DataFrame({id_col: patient_ids, score_col: self._scores[slots]})
+        for j, key in enumerate(self.condition_keys):
+            snapshot[key] = ((masks >> j) & 1).astype(np.uint8)
+        return snapshot
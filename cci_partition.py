@@ -0,0 +1,109 @@
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cci_store import ResultStore, write_store
+from cci_summary import ScoreSummary
+
+
+def parse_partition(value):
+    """'i/N' -> (i, N) with 1 <= i <= N."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Partition must look like i/N (e.g. 2/8), got '{value}'")
+    if not 1 <= index <= count:
+        raise ValueError(f"Partition {value}: i must be between 1 and N")
+    return index, count
+
+
+def _id_text(value):
+    # 1042, 1042.0 (an ID column that picked up a NaN) and '1042' hash alike
+    if isinstance(value, (int, np.integer)) or (isinstance(value, (float, np.floating)) and float(value).is_integer()):
+        return str(int(value))
+    return str(value).strip()
+
+
+def id_partitions(ids, n_partitions):
+    """0-based partition of every ID: CRC-32 of the ID's text, modulo N.
+
+    CRC-32 is fixed by its specification (unlike Python's salted hash()),
+    so every machine assigns a patient to the same partition, and all
+    claims of a patient land in one partition. The hash runs once per
+    distinct ID. Missing IDs go to partition 0.
+    """
+    codes, uniques = pd.factorize(pd.Series(ids, copy=False))
+    buckets = np.fromiter(
+        (zlib.crc32(_id_text(value).encode('utf-8')) % n_partitions for value in uniques),
+        dtype=np.int64, count=len(uniques))
+    return np.append(buckets, 0)[codes]
+
+
+def partition_rows(df, partition, id_col='DSYSRTKY'):
+    """Rows of `df` whose ID hashes to partition (i, N), reindexed from 0."""
+    index, count = partition
+    return df[id_partitions(df[id_col], count) == index - 1].reset_index(drop=True)
+
+
+def partial_prefix(output_path, partition):
+    """'out.xlsx', (2, 8) -> 'out.part2of8'."""
+    return f'{os.path.splitext(output_path)[0]}.part{partition[0]}of{partition[1]}'
+
+
+def sidecar_path(store_path):
+    return f'{os.path.splitext(store_path)[0]}.summary.json'
+
+
+def write_partial(prefix, results, summary, partition, condition_keys, id_cols=('DSYSRTKY',), source=None):
+    """Write <prefix>.cci plus the <prefix>.summary.json sidecar; returns both paths."""
+    store_path = write_store(f'{prefix}.cci', results, condition_keys, id_cols)
+    summary_path = sidecar_path(store_path)
+    with open(summary_path, 'w') as f:
+        json.dump({
+            'partition': list(partition),
+            'source': source,
+            'rows': len(results),
+            'summary': summary.to_dict(),
+        }, f)
+    return [store_path, summary_path]
+
+
+def read_partials(store_paths):
+    """Merge partial stores and their sidecars into (results, summary).
+
+    Raises ValueError unless the inputs are exactly partitions 1..N of one
+    run. Results are concatenated in partition order; the summaries are
+    merged from their histograms, not recomputed.
+    """
+    if not store_paths:
+        raise ValueError("No partial results to reduce")
+    parts = []
+    for path in store_paths:
+        with open(sidecar_path(path)) as f:
+            parts.append((json.load(f), path))
+
+    counts = {sidecar['partition'][1] for sidecar, _ in parts}
+    if len(counts) != 1:
+        raise ValueError(f"Partials come from runs with different partition counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = [sidecar['partition'][0] for sidecar, _ in parts]
+    duplicates = sorted({i for i in indexes if indexes.count(i) > 1})
+    missing = sorted(set(range(1, count + 1)) - set(indexes))
+    problems = [f"{label} partitions {', '.join(f'{i}/{count}' for i in indexes)}"
+                for label, indexes in (('missing', missing), ('duplicated', duplicates)) if indexes]
+    if problems:
+        raise ValueError(f"Cannot reduce: {'; '.join(problems)}")
+
+    parts.sort(key=lambda part: part[0]['partition'][0])
+    frames, summary = [], None
+    for sidecar, path in parts:
+        frame = ResultStore(path).to_frame()
+        if len(frame) != sidecar['rows']:
+            raise ValueError(f"'{path}' holds {len(frame)} rows but its sidecar records {sidecar['rows']}")
+        frames.append(frame)
+        partial = ScoreSummary.from_dict(sidecar['summary'])
+        summary = partial if summary is None else summary.merge(partial)
+    return pd.concat(frames, ignore_index=True), summary
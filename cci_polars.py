@@ -0,0 +1,188 @@
+import argparse
+import os
+import sys
+
+import polars as pl
+
+from accurate_cci_calculator import EXACT_ICD_CODES
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING
+from cci_engine import canonical_icd10, hierarchy_from_mapping
+
+MAPPINGS = {
+    'exact': (EXACT_ICD_CODES, True),
+    'charlson': (CHARLSON_ICD10_MAPPING, False),
+}
+
+
+class PolarsCCIEngine:
+    """Lazy polars scoring of claim files or frames.
+
+    The ICD columns are unpivoted into (claim, position, code) rows, joined
+    to the compiled mapping and aggregated back to one row per claim, all
+    inside a single LazyFrame query. Polars runs it multi-threaded, pushes
+    the column selection down into `scan_csv`/`scan_parquet`, and can
+    stream the result to disk. The output has the process_calculator
+    columns.
+    """
+
+    def __init__(self, mapping=None, exact=True, icd_prefix='ICD_DGNS_CD', max_icd_cols=12,
+                 id_col='DSYSRTKY', claim_col='CLAIMNO'):
+        self.mapping = mapping if mapping is not None else (EXACT_ICD_CODES if exact else CHARLSON_ICD10_MAPPING)
+        self.exact = exact
+        self.condition_keys = list(self.mapping.keys())
+        self.hierarchy = hierarchy_from_mapping(self.mapping)
+        self.icd_prefix = icd_prefix
+        self.icd_cols = [f'{icd_prefix}{i}' for i in range(1, max_icd_cols + 1)]
+        self.id_col = id_col
+        self.claim_col = claim_col
+        self.lookup = self._compile_lookup()
+
+    def _compile_lookup(self):
+        patterns, lengths, conditions = [], [], []
+        for key, info in self.mapping.items():
+            for code in info['codes']:
+                pattern = canonical_icd10(code)
+                patterns.append(pattern)
+                lengths.append(len(pattern))
+                conditions.append(key)
+        return pl.DataFrame(
+            {'pattern': patterns, 'pattern_len': lengths, 'condition': conditions},
+            schema={'pattern': pl.String, 'pattern_len': pl.Int32, 'condition': pl.String},
+        ).unique()
+
+    def scan(self, source):
+        """LazyFrame for a CSV/Parquet path or glob, reading ICD columns as text."""
+        if source.lower().endswith(('.parquet', '.pq')):
+            return pl.scan_parquet(source)
+        return pl.scan_csv(source, schema_overrides={col: pl.String for col in self.icd_cols})
+
+    def results_lazy(self, source, join_codes=False):
+        """Build (but do not run) the scoring query for a path, DataFrame or LazyFrame.
+
+        ICD_Codes is a list column unless join_codes=True, which formats it
+        as a '|'-joined string for CSV output.
+        """
+        if isinstance(source, str):
+            lf = self.scan(source)
+        else:
+            lf = source.lazy()
+
+        columns = lf.collect_schema().names()
+        for col in (self.id_col, self.claim_col):
+            if col not in columns:
+                raise ValueError(f"Column '{col}' not found in dataset! Available columns: {columns}")
+        icd_cols = [col for col in self.icd_cols if col in columns]
+        keys = self.condition_keys
+
+        claims = lf.select([self.id_col, self.claim_col] + icd_cols).with_row_index('rid')
+        # canonical_icd10: letters and digits only, dot after the category
+        compact = pl.col('raw').str.to_uppercase().str.replace_all('[^0-9A-Z]', '')
+        canonical = (
+            pl.when(compact.str.len_chars() > 3)
+            .then(pl.concat_str([compact.str.slice(0, 3), pl.lit('.'), compact.str.slice(3)]))
+            .otherwise(compact)
+        )
+        codes = (
+            claims
+            .select(['rid'] + [pl.col(c).cast(pl.String) for c in icd_cols])
+            .unpivot(index='rid', on=icd_cols, variable_name='column', value_name='raw')
+            .with_columns(code=canonical)
+            .filter(pl.col('code').is_not_null() & (pl.col('code') != ''))
+            .with_columns(pos=pl.col('column').str.strip_prefix(self.icd_prefix).cast(pl.Int32))
+            .select('rid', 'pos', 'code')
+        )
+
+        lookup = self.lookup.lazy()
+        if self.exact:
+            matches = codes.join(lookup, left_on='code', right_on='pattern').select('rid', 'condition')
+        else:
+            # One equi-join per prefix length keeps the joins hash-based
+            matches = pl.concat([
+                codes
+                .with_columns(prefix=pl.col('code').str.slice(0, n))
+                .join(lookup.filter(pl.col('pattern_len') == n), left_on='prefix', right_on='pattern')
+                .select('rid', 'condition')
+                for n in sorted(set(self.lookup['pattern_len'].to_list()))
+            ])
+
+        code_lists = codes.group_by('rid').agg(ICD_Codes=pl.col('code').sort_by('pos'))
+        flags = matches.group_by('rid').agg([
+            (pl.col('condition') == key).any().cast(pl.Int32).alias(key) for key in keys
+        ])
+
+        results = (
+            claims.select('rid', self.id_col, self.claim_col)
+            .join(code_lists, on='rid', how='left')
+            .join(flags, on='rid', how='left')
+            .with_columns([pl.col(key).fill_null(0) for key in keys])
+        )
+        if self.hierarchy:
+            results = results.with_columns([
+                pl.when(pl.col(severe) == 1).then(0).otherwise(pl.col(mild)).alias(mild)
+                for mild, severe in self.hierarchy
+            ])
+
+        has_codes = pl.col('ICD_Codes').is_not_null()
+        if join_codes:
+            codes_out = pl.col('ICD_Codes').list.join('|').fill_null('None')
+        else:
+            codes_out = pl.col('ICD_Codes').fill_null(pl.lit([], dtype=pl.List(pl.String)))
+        score = pl.sum_horizontal([pl.col(key) * int(self.mapping[key]['points']) for key in keys])
+        return (
+            results
+            .sort('rid')
+            .select(
+                pl.col(self.id_col).alias('DSYSRTKY'),
+                pl.col(self.claim_col).alias('CLAIMNO'),
+                pl.when(has_codes).then(score).otherwise(None).alias('CCI_Score'),
+                pl.when(has_codes).then(pl.lit('Yes')).otherwise(pl.lit('No')).alias('Has_ICD_Codes'),
+                codes_out,
+                *keys,
+            )
+        )
+
+    def score(self, source):
+        """Score a path, DataFrame or LazyFrame and return a polars DataFrame."""
+        return self.results_lazy(source).collect(engine='streaming')
+
+    def score_to_file(self, source, output):
+        """Stream results to a .parquet or .csv file without collecting them."""
+        if output.lower().endswith(('.parquet', '.pq')):
+            self.results_lazy(source).sink_parquet(output)
+        else:
+            self.results_lazy(source, join_codes=True).sink_csv(output)
+        return output
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="CCI scoring with a lazy, multi-threaded polars query",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python cci_polars.py --input claims.csv --output results.parquet
+  python cci_polars.py --input 'extracts/*.parquet' --output results.csv --mapping charlson
+        """
+    )
+    parser.add_argument('--input', '-i', required=True, help='CSV or Parquet file path or glob')
+    parser.add_argument('--output', '-o', required=True, help='Output .parquet or .csv file')
+    parser.add_argument('--mapping', choices=sorted(MAPPINGS), default='exact',
+                        help='exact: EXACT_ICD_CODES, charlson: CHARLSON_ICD10_MAPPING (default: exact)')
+    parser.add_argument('--id-col', default='DSYSRTKY', help='Column name for patient ID (default: DSYSRTKY)')
+    parser.add_argument('--claim-col', default='CLAIMNO', help='Column name for claim number (default: CLAIMNO)')
+    parser.add_argument('--icd-prefix', default='ICD_DGNS_CD', help='Prefix for ICD code columns (default: ICD_DGNS_CD)')
+    parser.add_argument('--max-icd-cols', type=int, default=12, help='Maximum number of ICD code columns (default: 12)')
+    args = parser.parse_args()
+
+    mapping, exact = MAPPINGS[args.mapping]
+    engine = PolarsCCIEngine(mapping, exact, args.icd_prefix, args.max_icd_cols, args.id_col, args.claim_col)
+    try:
+        engine.score_to_file(args.input, args.output)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from cci_engine import canonical_icd10
+
+
+# canonical_icd10 form: letter, digit, alphanumeric category, then an
+# optional dotted subcategory of up to 4 characters: I10, I50.22, S72.001A
+ICD10_FORMAT = re.compile(r'[A-Z][0-9][0-9A-Z](?:\.[0-9A-Z]{1,4})?')
+
+
+def scan_icd_column(values):
+    """(invalid, uniques, counts, bad) for one ICD column.
+
+    The column is factorized once; canonical_icd10 and the format regex
+    run per distinct value and the results are mapped back to cells, so
+    the cost scales with unique codes rather than cells. Codes are judged
+    in canonical form, the form the matchers compare: case, whitespace
+    and punctuation (i5022, I50.22-) are accepted, while floats from CSV
+    type inference (250.0) and truncated codes fail. Null cells and cells
+    with no code characters are not invalid; the scorers skip them.
+    `invalid` is per cell, `counts` and `bad` per distinct value.
+    """
+    codes, uniques = pd.factorize(values)
+    canonical = [canonical_icd10(value) for value in uniques]
+    filled = np.array([code != '' for code in canonical], dtype=bool)
+    bad = np.array([code != '' and ICD10_FORMAT.fullmatch(code) is None for code in canonical], dtype=bool)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    invalid = np.append(bad, False)[codes]  # -1 (missing) is valid
+    return invalid, uniques, counts * filled, bad
+
+
+def invalid_icd_cells(df, icd_cols):
+    """Boolean frame (rows x present ICD columns), True for malformed codes."""
+    invalid = {col: scan_icd_column(df[col])[0] for col in icd_cols if col in df.columns}
+    return pd.DataFrame(invalid, index=df.index)
+
+
+def quality_row(col, uniques, counts, bad, max_examples=5):
+    """Report row for one scanned column, built from per-value counts."""
+    filled = int(counts.sum())
+    bad_counts = counts[bad]
+    order = np.argsort(-bad_counts, kind='stable')[:max_examples]
+    examples = [f'{uniques[bad][i]} ({bad_counts[i]})' for i in order]
+    return {
+        'Column': col,
+        'Codes': filled,
+        'Invalid': int(bad_counts.sum()),
+        'Invalid_Pct': round(100 * bad_counts.sum() / filled, 2) if filled else 0.0,
+        'Examples': ', '.join(examples),
+    }
+
+
+def validate_icd_columns(df, icd_cols, max_examples=5):
+    """(invalid_rows, report): rows holding any malformed code, and the per-column report.
+
+    One factorize per column serves both the row flags and the report.
+    This is a separate pass over the loaded frame, before scoring; the
+    scorers then find each distinct code already in canonical_icd10's
+    memo, so the normalization itself is not repeated.
+    """
+    invalid_rows = np.zeros(len(df), dtype=bool)
+    rows = []
+    for col in icd_cols:
+        if col not in df.columns:
+            continue
+        invalid, uniques, counts, bad = scan_icd_column(df[col])
+        invalid_rows |= invalid
+        rows.append(quality_row(col, uniques, counts, bad, max_examples))
+    report = pd.DataFrame(rows, columns=['Column', 'Codes', 'Invalid', 'Invalid_Pct', 'Examples'])
+    return invalid_rows, report
+
+
+def quarantine_rows(df, invalid_rows, path):
+    """Write the invalid rows to `path` (CSV) and return the remaining rows."""
+    df[invalid_rows].to_csv(path, index=False)
+    return df[~invalid_rows].reset_index(drop=True)
+
+
+def print_quality_report(report, invalid_rows):
+    total = report['Codes'].sum()
+    invalid = report['Invalid'].sum()
+    pct = 100 * invalid / total if total else 0.0
+    print(f"Code validation: {invalid} of {total} ICD codes malformed ({pct:.2f}%) "
+          f"in {int(np.sum(invalid_rows))} rows")
+    for _, row in report[report['Invalid'] > 0].iterrows():
+        print(f"  {row['Column']}: {row['Invalid']} invalid, e.g. {row['Examples']}")
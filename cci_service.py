@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from accurate_cci_calculator import EXACT_ICD_CODES
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING
+from cci_engine import ConditionMaskLookup
+from charlson_batch import score_patients
+
+CODE_MAPPINGS = {
+    'charlson': (CHARLSON_ICD10_MAPPING, False),
+    'exact': (EXACT_ICD_CODES, True),
+}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def score_patient_records(records):
+    """Batch scorer for {'id', 'age', 'conditions': [...]} records."""
+    results = score_patients(
+        [record['age'] for record in records],
+        [record.get('conditions', []) for record in records],
+    )
+    return [
+        {
+            'id': record.get('id'),
+            'cci_score': int(results['cci_score'][i]),
+            'age_score': int(results['age_score'][i]),
+            '10_year_survival_percentage': float(results['10_year_survival_percentage'][i]),
+        }
+        for i, record in enumerate(records)
+    ]
+
+
+def make_code_scorer(lookup):
+    """Batch scorer for {'id', 'codes': [...]} records against one mapping."""
+    def score_code_records(records):
+        for record in records:
+            # A bare string would otherwise be scored one character at a time
+            if not isinstance(record['codes'], list):
+                raise ValueError("'codes' must be a list of ICD codes")
+        masks = np.array([lookup.codes_mask(record['codes']) for record in records], dtype=np.uint64)
+        scores = lookup.score_masks(masks)
+        return [
+            {
+                'id': record.get('id'),
+                'cci_score': int(scores[i]),
+                'conditions': [k for k, flag in lookup.flags(int(masks[i])).items() if flag],
+            }
+            for i, record in enumerate(records)
+        ]
+    return score_code_records
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one call of a batch scoring function.
+
+    The first queued request opens a batch; it is flushed once it holds
+    `max_batch` records or `max_wait_ms` has passed. If the batch call
+    fails, each request is rescored on its own so one bad payload does
+    not fail its neighbours.
+    """
+
+    def __init__(self, score_batch, max_batch=512, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.records = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, records):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                size += len(item[0])
+            self._flush(batch)
+
+    def _flush(self, batch):
+        flat = [record for records, _ in batch for record in records]
+        self.batches += 1
+        self.records += len(flat)
+        try:
+            results = self.score_batch(flat)
+        except Exception:
+            for records, future in batch:
+                if future.done():
+                    continue
+                try:
+                    future.set_result(self.score_batch(records))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for records, future in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(records)])
+            offset += len(records)
+
+
+class LatencyStats:
+    def __init__(self, window=10000):
+        self.latencies_ms = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.records = 0
+
+    def record(self, elapsed_ms, n_records):
+        self.latencies_ms.append(elapsed_ms)
+        self.requests += 1
+        self.records += n_records
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        latencies = np.fromiter(self.latencies_ms, dtype=float)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            'requests': self.requests,
+            'records': self.records,
+            'uptime_seconds': round(uptime, 3),
+            'requests_per_second': round(self.requests / uptime, 2) if uptime else 0.0,
+            'records_per_second': round(self.records / uptime, 2) if uptime else 0.0,
+            'latency_ms_p50': round(float(p50), 3),
+            'latency_ms_p99': round(float(p99), 3),
+        }
+
+
+class CCIService:
+    """Local HTTP/1.1 scoring service.
+
+    POST /score/patients  {"patients": [{"id", "age", "conditions": [...]}]}
+    POST /score/codes     {"records": [{"id", "codes": [...]}], "mapping": "charlson"|"exact"}
+    GET  /stats           latency percentiles and throughput
+    GET  /health
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, max_batch=512, max_wait_ms=2.0,
+                 max_body_bytes=16 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.stats = LatencyStats()
+        self.batchers = {'patients': MicroBatcher(score_patient_records, max_batch, max_wait_ms)}
+        for name, (mapping, exact) in CODE_MAPPINGS.items():
+            lookup = ConditionMaskLookup(mapping, exact=exact)
+            self.batchers[name] = MicroBatcher(make_code_scorer(lookup), max_batch, max_wait_ms)
+        self.server = None
+
+    async def start(self):
+        for batcher in self.batchers.values():
+            batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"CCI scoring service listening on http://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self._dispatch(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            stats = self.stats.snapshot()
+            stats['batches'] = {name: b.batches for name, b in self.batchers.items()}
+            return 200, stats
+        if path not in ('/score/patients', '/score/codes'):
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+
+        started = time.perf_counter()
+        try:
+            payload = json.loads(body or b'{}')
+            if path == '/score/patients':
+                batcher = self.batchers['patients']
+                records = payload.get('patients', [payload]) if isinstance(payload, dict) else payload
+            else:
+                mapping = payload.get('mapping', 'charlson') if isinstance(payload, dict) else 'charlson'
+                if mapping not in CODE_MAPPINGS:
+                    return 400, {'error': f"unknown mapping '{mapping}'"}
+                batcher = self.batchers[mapping]
+                records = payload.get('records', [payload]) if isinstance(payload, dict) else payload
+            if not isinstance(records, list):
+                raise ValueError('expected a list of records')
+            results = await batcher.submit(records)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return 400, {'error': str(e) or type(e).__name__}
+
+        self.stats.record((time.perf_counter() - started) * 1000.0, len(records))
+        return 200, {'results': results}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode('latin-1')
+        writer.write(head + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CCI scoring service with request micro-batching")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--max-batch', type=int, default=512,
+                        help='Maximum records per scoring batch (default: 512)')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help='Longest a request waits for batch-mates, in ms (default: 2)')
+    parser.add_argument('--max-body-mb', type=float, default=16,
+                        help='Largest accepted request body, in MB (default: 16)')
+    args = parser.parse_args()
+
+    service = CCIService(args.host, args.port, args.max_batch, args.max_wait_ms,
+                         int(args.max_body_mb * 1024 * 1024))
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("\nService stopped.")
+
+
+if __name__ == '__main__':
+    main()
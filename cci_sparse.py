@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from cci_engine import canonicalize_codes
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # optional dependency
+    sp = None
+
+
+def _require_scipy():
+    if sp is None:
+        raise ImportError("Sparse export requires the 'scipy' package (pip install scipy)")
+
+
+def _binary_csr(rows, cols, shape):
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.uint8), (rows, cols)), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def condition_csr(results, condition_keys):
+    """Row x condition 0/1 CSR matrix; rows follow the results frame."""
+    _require_scipy()
+    flags = results[condition_keys].fillna(0).to_numpy() != 0
+    rows, cols = np.nonzero(flags)
+    return _binary_csr(rows, cols, (len(results), len(condition_keys)))
+
+
+def row_positions(results, df, id_col='DSYSRTKY'):
+    """Result row of each input claim: the claim itself for claim-level
+    results, the patient's row for patient-level ones (-1 if absent)."""
+    if 'CLAIMNO' in results.columns and len(results) == len(df):
+        return np.arange(len(df))
+    return pd.Index(results[id_col]).get_indexer(df[id_col])
+
+
+def code_incidence_csr(df, icd_cols, positions, n_rows):
+    """Row x ICD-code 0/1 CSR matrix from the raw ICD columns.
+
+    Claim i contributes its codes to result row positions[i]. Columns are
+    every distinct canonical code in the data, in sorted order. Returns
+    (matrix, codes).
+    """
+    _require_scipy()
+    present = [col for col in icd_cols if col in df.columns]
+    stacked = df[present].reset_index(drop=True).stack().dropna()
+    codes = canonicalize_codes(stacked)
+    keep = (codes != '').to_numpy()
+
+    claim_idx = stacked.index.get_level_values(0).to_numpy()[keep]
+    rows = np.asarray(positions)[claim_idx]
+    code_idx, code_index = pd.factorize(codes[keep], sort=True)
+    valid = rows >= 0
+    matrix = _binary_csr(rows[valid], code_idx[valid], (n_rows, len(code_index)))
+    return matrix, list(code_index)
+
+
+def save_sparse(path, matrix, columns):
+    """Write <path>.npz plus <path>_columns.csv naming each matrix column."""
+    sp.save_npz(f'{path}.npz', matrix, compressed=False)
+    pd.DataFrame({'column': columns}).to_csv(f'{path}_columns.csv', index_label='index')
+    return [f'{path}.npz', f'{path}_columns.csv']
+
+
+def load_sparse(path):
+    """Inverse of save_sparse: (matrix, column names)."""
+    _require_scipy()
+    matrix = sp.load_npz(f'{path}.npz')
+    columns = pd.read_csv(f'{path}_columns.csv')['column'].tolist()
+    return matrix, columns
+
+
+def export_sparse(prefix, results, condition_keys, df=None, icd_cols=None, id_cols=('DSYSRTKY',)):
+    """Write the result flags (and optionally ICD incidence) as CSR matrices.
+
+    Files:
+      <prefix>_rows.csv                        row index (id columns of `results`)
+      <prefix>_conditions.npz / _columns.csv   row x condition flags
+      <prefix>_codes.npz / _columns.csv        row x ICD code, when df and icd_cols are given
+    Returns the list of files written.
+    """
+    _require_scipy()
+    rows_path = f'{prefix}_rows.csv'
+    results[list(id_cols)].to_csv(rows_path, index_label='index')
+    written = [rows_path]
+    written += save_sparse(f'{prefix}_conditions', condition_csr(results, condition_keys), condition_keys)
+
+    if df is not None and icd_cols:
+        positions = row_positions(results, df, id_cols[0])
+        matrix, codes = code_incidence_csr(df, icd_cols, positions, len(results))
+        written += save_sparse(f'{prefix}_codes', matrix, codes)
+    return written
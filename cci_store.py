@@ -0,0 +1,233 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from cci_arrow import code_list_buffers, code_list_column, is_list_column
+from cci_engine import smallest_uint_dtype
+
+MAGIC = b'CCISTOR1'
+ALIGN = 64  # every array starts on a 64-byte boundary so memmaps are aligned
+MISSING_SCORE = -1
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _encode_ids(values):
+    """(codes, dictionary) for a non-integer ID column.
+
+    The dictionary holds each distinct ID once as fixed-width UTF-8 bytes,
+    so it can be memory-mapped like everything else. Missing IDs get
+    code -1.
+    """
+    codes, uniques = pd.factorize(values)
+    codes = codes.astype(np.int32 if len(uniques) < np.iinfo(np.int32).max else np.int64)
+    encoded = [str(value).encode('utf-8') for value in uniques]
+    return codes, np.array(encoded, dtype=f'S{max(map(len, encoded), default=1)}')
+
+
+def write_store(path, results, condition_keys, id_cols=('DSYSRTKY',), score_col='CCI_Score'):
+    """Write a results frame as a memory-mappable binary result store.
+
+    Layout: MAGIC, a uint32 header length, a JSON header, then one raw
+    64-byte-aligned array per column:
+      scores      int8/int16, -1 where the score is missing
+      masks       one uint per row, bit j = condition_keys[j] (pack_flags)
+      <id>        integer ID columns as is; other ID columns dictionary
+                  encoded as <id>.codes (int32) plus <id>.dictionary
+      <column>    any other numeric column (e.g. N_Claims) as is
+      <list>      list columns such as ICD_Codes as <list>.offsets (int64),
+                  <list>.indices (int32) and <list>.dictionary
+    Has_ICD_Codes is rebuilt from missing scores on load. Other text
+    columns are not stored. Returns the path.
+    """
+    condition_keys = list(condition_keys)
+    arrays, ids = {}, []
+
+    for col in id_cols:
+        if pd.api.types.is_integer_dtype(results[col]) and not results[col].hasnans:
+            # Already fixed width; hashing tens of millions of distinct IDs buys nothing
+            arrays[col] = results[col].to_numpy()
+            ids.append({'name': col, 'kind': 'int'})
+        else:
+            arrays[f'{col}.codes'], arrays[f'{col}.dictionary'] = _encode_ids(results[col])
+            ids.append({'name': col, 'kind': 'str'})
+
+    score_float = pd.api.types.is_float_dtype(results[score_col])
+    if score_float:
+        values = results[score_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        if (values[~np.isnan(values)] % 1 != 0).any():
+            raise ValueError(f"Result store needs integer scores; '{score_col}' has fractional values")
+    scores = results[score_col].to_numpy(dtype=np.int16, na_value=MISSING_SCORE)
+    if len(scores) and scores.max() <= np.iinfo(np.int8).max:
+        scores = scores.astype(np.int8)
+    arrays['scores'] = scores
+
+    # Same bit layout as pack_flags, built column by column to avoid a wide copy
+    mask_dtype = smallest_uint_dtype((1 << len(condition_keys)) - 1)
+    masks = np.zeros(len(results), dtype=mask_dtype)
+    for j, key in enumerate(condition_keys):
+        flags = results[key].to_numpy(dtype=np.float64, na_value=0) if results[key].hasnans else results[key].to_numpy()
+        masks |= (flags != 0).astype(mask_dtype) << mask_dtype.type(j)
+    arrays['masks'] = masks
+
+    skip = set(id_cols) | set(condition_keys) | {score_col}
+    extra = [col for col in results.columns
+             if col not in skip and pd.api.types.is_numeric_dtype(results[col])
+             and not pd.api.types.is_bool_dtype(results[col]) and not results[col].hasnans]
+    for col in extra:
+        arrays[col] = results[col].to_numpy()
+
+    lists = [col for col in results.columns if col not in skip and is_list_column(results[col])]
+    for col in lists:
+        offsets, indices, dictionary = code_list_buffers(results[col])
+        encoded = [code.encode('utf-8') for code in dictionary]
+        arrays[f'{col}.offsets'] = offsets
+        arrays[f'{col}.indices'] = indices
+        arrays[f'{col}.dictionary'] = np.array(encoded, dtype=f'S{max(map(len, encoded), default=1)}')
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'version': 1,
+        'rows': len(results),
+        'columns': [col for col in results.columns
+                    if col in skip or col in extra or col in lists or col == 'Has_ICD_Codes'],
+        'condition_keys': condition_keys,
+        'score_col': score_col,
+        'nullable_score': isinstance(results[score_col].dtype, pd.api.extensions.ExtensionDtype),
+        'float_score': score_float,
+        'ids': ids,
+        'extra': extra,
+        'lists': lists,
+        'arrays': layout,
+    }).encode('utf-8')
+
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            array.tofile(f)
+        f.truncate(data_start + offset)
+    return path
+
+
+class ResultStore:
+    """Read-only view of a write_store file.
+
+    Opening reads only the JSON header and maps every array with
+    np.memmap, so it is instant regardless of size; pages are read from
+    disk when a slice of rows or a column is actually touched.
+
+        store = ResultStore('results.cci')
+        chf = store.condition('CHF')               # bool array over all rows
+        frame = store.to_frame(rows=slice(0, 1000))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{path}' is not a CCI result store")
+            header_len = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            self.header = json.loads(f.read(header_len).decode('utf-8'))
+        data_start = _aligned(len(MAGIC) + 4 + header_len)
+
+        self.n_rows = self.header['rows']
+        self.condition_keys = self.header['condition_keys']
+        self.score_col = self.header['score_col']
+        self.id_cols = [entry['name'] for entry in self.header['ids']]
+        self._id_kinds = {entry['name']: entry['kind'] for entry in self.header['ids']}
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if np.prod(shape) == 0:  # np.memmap cannot map zero bytes
+                self.arrays[name] = np.empty(shape, dtype=spec['dtype'])
+            else:
+                self.arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r',
+                                              offset=data_start + spec['offset'], shape=shape)
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def scores(self):
+        """Raw score array; MISSING_SCORE (-1) where the score is missing."""
+        return self.arrays['scores']
+
+    @property
+    def masks(self):
+        return self.arrays['masks']
+
+    def condition(self, key, rows=slice(None)):
+        """Boolean array of rows with condition `key`."""
+        j = self.condition_keys.index(key)
+        return (self.masks[rows] >> j) & 1 == 1
+
+    def ids(self, col=None, rows=slice(None)):
+        """Decoded values of an ID column (the first one by default)."""
+        col = col or self.id_cols[0]
+        if self._id_kinds[col] == 'int':
+            return np.asarray(self.arrays[col][rows])
+        codes = self.arrays[f'{col}.codes'][rows]
+        dictionary = np.char.decode(np.asarray(self.arrays[f'{col}.dictionary']), 'utf-8').astype(object)
+        values = dictionary[codes]
+        values[codes < 0] = None
+        return values
+
+    def code_lists(self, col='ICD_Codes', rows=slice(None)):
+        """List column `col` for the selected rows, gathering only their runs of indices."""
+        offsets = self.arrays[f'{col}.offsets']
+        positions = np.arange(self.n_rows)[rows]
+        starts = np.asarray(offsets[positions])
+        lengths = np.asarray(offsets[positions + 1]) - starts
+        new_offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_offsets[1:])
+        gather = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+        indices = np.asarray(self.arrays[f'{col}.indices'])[gather] if len(gather) else np.empty(0, np.int32)
+        dictionary = np.char.decode(np.asarray(self.arrays[f'{col}.dictionary']), 'utf-8').tolist()
+        return code_list_column(new_offsets, indices, dictionary)
+
+    def to_frame(self, rows=slice(None), columns=None):
+        """Materialize rows (slice, index or boolean array) as a results frame.
+
+        Scores come back in the smallest unsigned dtype (nullable when they
+        were written from a nullable column, float64 with NaN when from a
+        float one) and flags as uint8 columns, like process_calculator
+        output.
+        """
+        columns = self.header['columns'] if columns is None else columns
+        scores = np.asarray(self.scores[rows])
+        masks = np.asarray(self.masks[rows])
+        data = {}
+        for col in columns:
+            if col in self.id_cols:
+                data[col] = self.ids(col, rows)
+            elif col == self.score_col:
+                values = np.maximum(scores, 0).astype(smallest_uint_dtype(scores.max() if len(scores) else 0))
+                if self.header.get('float_score'):
+                    values = np.where(scores == MISSING_SCORE, np.nan, scores)
+                elif self.header['nullable_score']:
+                    values = pd.arrays.IntegerArray(values, scores == MISSING_SCORE)
+                data[col] = values
+            elif col == 'Has_ICD_Codes':
+                data[col] = np.where(scores == MISSING_SCORE, 'No', 'Yes')
+            elif col in self.condition_keys:
+                data[col] = ((masks >> self.condition_keys.index(col)) & 1).astype(np.uint8)
+            elif col in self.header['extra']:
+                data[col] = np.asarray(self.arrays[col][rows])
+            elif col in self.header.get('lists', ()):
+                data[col] = self.code_lists(col, rows)
+            else:
+                raise KeyError(f"Column '{col}' is not in the result store")
+        return pd.DataFrame(data, columns=columns)
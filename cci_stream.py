@@ -0,0 +1,168 @@
+import argparse
+import json
+import sys
+from itertools import islice
+
+import numpy as np
+
+from accurate_cci_calculator import EXACT_ICD_CODES
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING
+from cci_engine import ConditionMaskLookup, canonical_icd10
+from charlson_batch import score_patients
+
+ID_FIELDS = ('DSYSRTKY', 'CLAIMNO', 'id')
+
+
+class ClaimStreamScorer:
+    """Scores batches of decoded claim records without building a DataFrame.
+
+    A record carries its codes either as a 'codes' list or as ICD columns
+    named <icd_prefix>1..<icd_prefix><max_icd_cols>, exactly like a CSV row.
+    exact=True reproduces AccurateCCICalculator (EXACT_ICD_CODES, equality);
+    exact=False reproduces AlignedCharlsonCalculator (prefix matching).
+    """
+
+    def __init__(self, exact=True, icd_prefix='ICD_DGNS_CD', max_icd_cols=12):
+        mapping = EXACT_ICD_CODES if exact else CHARLSON_ICD10_MAPPING
+        self.lookup = ConditionMaskLookup(mapping, exact=exact)
+        self.icd_cols = [f'{icd_prefix}{i}' for i in range(1, max_icd_cols + 1)]
+        self._described = {}
+
+    def extract_codes(self, record):
+        """Canonical codes of a record; punctuation-only values are not codes, as in process_calculator."""
+        codes = record.get('codes')
+        if codes is None:
+            codes = [record.get(col) for col in self.icd_cols]
+        return [code for code in map(canonical_icd10, codes) if code]
+
+    def _describe(self, mask):
+        described = self._described.get(mask)
+        if described is None:
+            flags = self.lookup.flags(mask)
+            described = [key for key, flag in flags.items() if flag]
+            self._described[mask] = described
+        return described
+
+    def score_batch(self, records):
+        code_lists = [self.extract_codes(record) for record in records]
+        masks = np.array([self.lookup.codes_mask(codes) for codes in code_lists], dtype=np.uint64)
+        scores = self.lookup.score_masks(masks).tolist()
+
+        results = []
+        for record, codes, mask, score in zip(records, code_lists, masks.tolist(), scores):
+            result = {field: record[field] for field in ID_FIELDS if field in record}
+            result['CCI_Score'] = score if codes else None
+            result['Has_ICD_Codes'] = 'Yes' if codes else 'No'
+            result['conditions'] = self._describe(mask)
+            results.append(result)
+        return results
+
+
+class PatientStreamScorer:
+    """Scores {'id', 'age', 'conditions': [...]} records like CharlsonComorbidityIndex."""
+
+    def score_batch(self, records):
+        results = score_patients(
+            [record['age'] for record in records],
+            [record.get('conditions', []) for record in records],
+        )
+        scored = []
+        for i, record in enumerate(records):
+            result = {field: record[field] for field in ID_FIELDS if field in record}
+            result['cci_score'] = int(results['cci_score'][i])
+            result['age_score'] = int(results['age_score'][i])
+            result['10_year_survival_percentage'] = float(results['10_year_survival_percentage'][i])
+            scored.append(result)
+        return scored
+
+
+def score_batch_safely(scorer, records):
+    """Score a batch; if it fails, rescore record by record so errors stay local."""
+    try:
+        return scorer.score_batch(records)
+    except Exception:
+        results = []
+        for record in records:
+            try:
+                results.extend(scorer.score_batch([record]))
+            except Exception as e:
+                results.append({'error': f'{type(e).__name__}: {e}'})
+        return results
+
+
+def stream_jsonl(scorer, infile, outfile, batch_size=4096):
+    """Read JSON lines, score them in batches of batch_size, write JSON lines.
+
+    At most batch_size input lines are held in memory at a time, and
+    every non-blank input line produces exactly one output line (an
+    {"error": ...} object for lines that cannot be parsed or scored).
+    Returns the number of records written.
+    """
+    written = 0
+    while True:
+        lines = list(islice(infile, batch_size))
+        if not lines:
+            break
+
+        slots = []
+        records = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('expected a JSON object')
+            except ValueError as e:
+                slots.append({'error': f'invalid JSON: {e}'})
+                continue
+            slots.append(None)
+            records.append(record)
+
+        scored = iter(score_batch_safely(scorer, records) if records else [])
+        outfile.write(''.join(
+            json.dumps(slot if slot is not None else next(scored)) + '\n' for slot in slots
+        ))
+        written += len(slots)
+    outfile.flush()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream JSON lines from stdin to scored JSON lines on stdout",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  cat claims.jsonl | python cci_stream.py > scored.jsonl
+  cat claims.jsonl | python cci_stream.py --mapping charlson
+  cat patients.jsonl | python cci_stream.py --mapping patient
+        """
+    )
+    parser.add_argument('--mapping', choices=['exact', 'charlson', 'patient'], default='exact',
+                        help='exact: EXACT_ICD_CODES, charlson: CHARLSON_ICD10_MAPPING prefixes, '
+                             'patient: age plus condition keys (default: exact)')
+    parser.add_argument('--icd-prefix', type=str, default='ICD_DGNS_CD',
+                        help='Prefix for ICD code fields (default: ICD_DGNS_CD)')
+    parser.add_argument('--max-icd-cols', type=int, default=12,
+                        help='Maximum number of ICD code fields to check (default: 12)')
+    parser.add_argument('--batch-size', type=int, default=4096,
+                        help='Records read ahead and scored together (default: 4096)')
+    args = parser.parse_args()
+
+    if args.mapping == 'patient':
+        scorer = PatientStreamScorer()
+    else:
+        scorer = ClaimStreamScorer(exact=args.mapping == 'exact', icd_prefix=args.icd_prefix,
+                                   max_icd_cols=args.max_icd_cols)
+
+    try:
+        stream_jsonl(scorer, sys.stdin, sys.stdout, args.batch_size)
+    except BrokenPipeError:
+        # Downstream consumer (e.g. `head`) closed the pipe
+        sys.stderr.close()
+
+
+if __name__ == '__main__':
+    main()
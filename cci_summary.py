@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+
+class ScoreSummary:
+    """Single-pass summary of a score column and its condition flags.
+
+    CCI scores are small non-negative integers, so an exact histogram is
+    kept instead of the values: count, sum, min/max, mean, standard
+    deviation, median and any quantile all come from it. update() is
+    called once per scored chunk and merge() combines the summaries of
+    separate runs, so nothing needs a second scan over the results.
+    """
+
+    def __init__(self, condition_keys=()):
+        self.condition_keys = list(condition_keys)
+        self.rows = 0
+        self.with_codes = 0
+        self.histogram = np.zeros(0, dtype=np.int64)
+        self.condition_counts = np.zeros(len(self.condition_keys), dtype=np.int64)
+
+    @classmethod
+    def from_results(cls, results, condition_keys=(), score_col='CCI_Score'):
+        summary = cls(condition_keys)
+        summary.update_frame(results, score_col)
+        return summary
+
+    def update(self, scores, flags=None, has_codes=None):
+        """Add one chunk of scores, (rows x conditions) flags and has-codes markers.
+
+        Missing scores count as rows but stay out of the score statistics;
+        without `has_codes` a row has codes when its score is present.
+        """
+        scores = pd.Series(scores, copy=False)
+        present = scores.notna().to_numpy()
+        values = scores[present].to_numpy(dtype=np.float64)
+        if len(values) and ((values < 0).any() or (values != np.floor(values)).any()):
+            raise ValueError("ScoreSummary needs non-negative integer scores")
+
+        counts = np.bincount(values.astype(np.int64))
+        if len(counts) > len(self.histogram):
+            self.histogram = np.pad(self.histogram, (0, len(counts) - len(self.histogram)))
+        self.histogram[:len(counts)] += counts
+
+        self.rows += len(scores)
+        self.with_codes += int(np.count_nonzero(has_codes if has_codes is not None else present))
+        if flags is not None and len(self.condition_keys):
+            flags = np.nan_to_num(np.asarray(flags, dtype=np.float64))
+            self.condition_counts += np.count_nonzero(flags, axis=0)
+        return self
+
+    def update_frame(self, results, score_col='CCI_Score'):
+        """update() from a results frame (score column, Has_ICD_Codes, condition flags)."""
+        has_codes = None
+        if 'Has_ICD_Codes' in results.columns:
+            has_codes = (results['Has_ICD_Codes'] == 'Yes').to_numpy()
+        flags = results[self.condition_keys] if self.condition_keys else None
+        return self.update(results[score_col], flags, has_codes)
+
+    def merge(self, other):
+        """Fold another summary over the same conditions into this one."""
+        if other.condition_keys != self.condition_keys:
+            raise ValueError("Cannot merge summaries over different conditions")
+        size = max(len(self.histogram), len(other.histogram))
+        self.histogram = (np.pad(self.histogram, (0, size - len(self.histogram)))
+                          + np.pad(other.histogram, (0, size - len(other.histogram))))
+        self.rows += other.rows
+        self.with_codes += other.with_codes
+        self.condition_counts += other.condition_counts
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state; from_dict(to_dict()) round-trips exactly."""
+        return {
+            'condition_keys': self.condition_keys,
+            'rows': self.rows,
+            'with_codes': self.with_codes,
+            'histogram': self.histogram.tolist(),
+            'condition_counts': self.condition_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        summary = cls(state['condition_keys'])
+        summary.rows = state['rows']
+        summary.with_codes = state['with_codes']
+        summary.histogram = np.array(state['histogram'], dtype=np.int64)
+        summary.condition_counts = np.array(state['condition_counts'], dtype=np.int64)
+        return summary
+
+    @property
+    def count(self):
+        return int(self.histogram.sum())
+
+    @property
+    def total(self):
+        return int(self.histogram @ np.arange(len(self.histogram)))
+
+    @property
+    def min(self):
+        nonzero = np.flatnonzero(self.histogram)
+        return int(nonzero[0]) if len(nonzero) else np.nan
+
+    @property
+    def max(self):
+        nonzero = np.flatnonzero(self.histogram)
+        return int(nonzero[-1]) if len(nonzero) else np.nan
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1), as pandas reports it."""
+        if self.count < 2:
+            return np.nan
+        deviations = np.arange(len(self.histogram)) - self.mean
+        return float(np.sqrt(self.histogram @ deviations ** 2 / (self.count - 1)))
+
+    def quantile(self, q):
+        """Exact q-quantile with linear interpolation (numpy/pandas default)."""
+        if not self.count:
+            return np.nan
+        position = q * (self.count - 1)
+        cumulative = np.cumsum(self.histogram)
+        low, high = np.searchsorted(cumulative, [np.floor(position), np.ceil(position)], side='right')
+        return float(low + (high - low) * (position - np.floor(position)))
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+    def prevalence(self):
+        """Per-condition counts and percentage of all rows, in condition_keys order."""
+        pct = self.condition_counts / self.rows * 100 if self.rows else np.zeros(len(self.condition_keys))
+        return pd.DataFrame({
+            'Condition': self.condition_keys,
+            'Count': self.condition_counts,
+            'Percentage': pct,
+        })
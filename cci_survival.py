@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+def charlson_survival(scores, years):
+    """Original Charlson (1987) estimate: 10-year survival 0.983^(e^(0.9*score)).
+
+    Other horizons assume a constant baseline hazard, so the baseline
+    survival at t years is 0.983^(t/10).
+    """
+    return 0.983 ** (years / 10 * np.exp(0.9 * scores))
+
+
+def exponential_survival(scores, years):
+    """The exp(-0.9*score) 10-year estimate of estimate_10_year_survival,
+    scaled to other horizons with a constant hazard."""
+    return np.exp(-0.9 * scores * years / 10)
+
+
+MODELS = {
+    'charlson': charlson_survival,
+    'exponential': exponential_survival,
+}
+DEFAULT_HORIZONS = (1, 5, 10)
+
+
+def survival_columns(horizons=DEFAULT_HORIZONS, models=('charlson',)):
+    """Column labels of survival_matrix, model-major: Survival_1yr_charlson, ..."""
+    return [f'Survival_{h:g}yr_{model}' for model in models for h in horizons]
+
+
+def survival_lookup(max_score, horizons=DEFAULT_HORIZONS, models=('charlson',)):
+    """(max_score + 2) x (models * horizons) float32 table of survival proportions.
+
+    Row s holds every curve evaluated at score s; the extra last row is NaN
+    so missing scores can be gathered with index -1.
+    """
+    scores = np.arange(max(int(max_score), 0) + 1, dtype=np.float64)[:, None]
+    columns = []
+    for model in models:
+        if model not in MODELS:
+            raise ValueError(f"Unknown survival model '{model}'. Choose from: {', '.join(MODELS)}")
+        columns.append(MODELS[model](scores, np.asarray(horizons, dtype=np.float64)[None, :]))
+    table = np.hstack(columns) if columns else np.empty((len(scores), 0))
+    return np.vstack([table, np.full((1, table.shape[1]), np.nan)]).astype(np.float32)
+
+
+def survival_matrix(scores, horizons=DEFAULT_HORIZONS, models=('charlson',)):
+    """Patients x (models * horizons) float32 survival proportions.
+
+    Scores are bounded small integers, so every curve is evaluated once per
+    distinct score in a lookup table and each patient costs one row gather.
+    Missing scores give NaN rows.
+    """
+    if isinstance(scores, np.ndarray) and np.issubdtype(scores.dtype, np.integer):
+        # Plain integer arrays have no missing values: gather directly
+        if len(scores) and scores.min() < 0:
+            raise ValueError("Survival curves need non-negative integer scores")
+        return survival_lookup(scores.max() if len(scores) else 0, horizons, models)[scores]
+
+    scores = pd.Series(scores, copy=False)
+    present = scores.notna().to_numpy()
+    values = scores[present].to_numpy(dtype=np.float64)
+    if len(values) and ((values < 0).any() or (values != np.floor(values)).any()):
+        raise ValueError("Survival curves need non-negative integer scores")
+
+    table = survival_lookup(values.max() if len(values) else 0, horizons, models)
+    index = np.full(len(scores), -1, dtype=np.int64)
+    index[present] = values.astype(np.int64)
+    return table[index]
+
+
+def survival_frame(scores, horizons=DEFAULT_HORIZONS, models=('charlson',)):
+    """survival_matrix as a DataFrame with survival_columns labels and the scores' index."""
+    scores = pd.Series(scores, copy=False)
+    return pd.DataFrame(survival_matrix(scores, horizons, models),
+                        index=scores.index, columns=survival_columns(horizons, models))
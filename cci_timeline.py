@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from cci_engine import apply_hierarchy, compact_scores, score_flags
+
+
+def in_window(claim_dates, index_date, lookback_days=365):
+    """Boolean mask of claims inside the inclusive window [D - L, D] that
+    ClaimTimeline.as_of uses for one index date. Undated claims are outside."""
+    days = pd.to_datetime(pd.Series(claim_dates), errors='coerce').to_numpy('datetime64[D]')
+    end = np.datetime64(pd.Timestamp(index_date), 'D')
+    return ~np.isnat(days) & (days >= end - np.timedelta64(int(lookback_days), 'D')) & (days <= end)
+
+
+class ClaimTimeline:
+    """Per-patient, date-sorted index of claim condition flags.
+
+    Built once from claim-level results; answers "CCI as of index date D
+    with a lookback of L days" for every patient with two searchsorted
+    calls and a difference of prefix counts, so no claim is rescanned per
+    query. The lookback window is inclusive: D - L <= claim date <= D.
+
+    Claims whose date is missing or unparseable cannot fall in any window;
+    they are counted in `undated_claims`, and a patient with only such
+    claims is still listed, with a NaN score.
+    """
+
+    def __init__(self, patient_ids, claim_dates, flags, condition_keys, points,
+                 hierarchy=(), has_codes=None):
+        days = pd.to_datetime(pd.Series(claim_dates), errors='coerce').to_numpy('datetime64[D]')
+        valid = ~np.isnat(days)
+        days = days[valid].astype(np.int64)
+        self.undated_claims = int(len(valid) - valid.sum())
+
+        # Factorize before dropping undated claims so their patients keep a row
+        group_codes, self.patient_ids = pd.factorize(pd.Series(patient_ids), use_na_sentinel=False)
+        group_codes = group_codes[valid]
+        flags = np.asarray(flags)[valid]
+        if has_codes is None:
+            has_codes = np.ones(len(flags), dtype=bool)
+        else:
+            has_codes = np.asarray(has_codes, dtype=bool)[valid]
+
+        self.condition_keys = list(condition_keys)
+        self.points = points
+        self.hierarchy = list(hierarchy)
+        self.n_patients = len(self.patient_ids)
+
+        # Sort by (patient, day) and fold both into one int64 key
+        self._day_offset = int(days.min()) if len(days) else 0
+        self._span = int(days.max()) - self._day_offset + 1 if len(days) else 1
+        order = np.lexsort((days, group_codes))
+        self._keys = group_codes[order].astype(np.int64) * self._span + (days[order] - self._day_offset)
+
+        # Prefix counts: column j of row i counts claims before i with flag j
+        columns = np.column_stack([np.asarray(flags[order] != 0), has_codes[order]])
+        self._prefix = np.zeros((len(order) + 1, columns.shape[1]), dtype=np.int32)
+        np.cumsum(columns, axis=0, out=self._prefix[1:])
+
+    @classmethod
+    def from_results(cls, results, claim_dates, condition_keys, points, hierarchy=(),
+                     id_col='DSYSRTKY'):
+        """Build from a claim-level results frame and an aligned claim date column."""
+        has_codes = None
+        if 'Has_ICD_Codes' in results.columns:
+            has_codes = (results['Has_ICD_Codes'] == 'Yes').to_numpy()
+        return cls(
+            results[id_col].to_numpy(),
+            np.asarray(claim_dates),
+            results[condition_keys].fillna(0).to_numpy(),
+            condition_keys,
+            points,
+            hierarchy,
+            has_codes,
+        )
+
+    def _window_bounds(self, index_days, lookback_days):
+        # Clipping keeps each probe inside its own patient's key range
+        base = np.arange(self.n_patients, dtype=np.int64) * self._span
+        start = np.clip(index_days - lookback_days - self._day_offset, 0, self._span)
+        end = np.clip(index_days - self._day_offset, -1, self._span - 1)
+        lo = np.searchsorted(self._keys, base + start, side='left')
+        hi = np.searchsorted(self._keys, base + end, side='right')
+        return lo, np.maximum(hi, lo)
+
+    def as_of(self, index_date, lookback_days=365, score_col='CCI_Score', id_col='DSYSRTKY'):
+        """Patient-level scores for the window ending at `index_date`.
+
+        `index_date` is either one date for every patient or an array of
+        dates aligned with `self.patient_ids`. Patients without a coded
+        claim inside the window get a NaN score.
+        """
+        index_days = np.broadcast_to(
+            np.asarray(index_date, dtype='datetime64[D]'), (self.n_patients,)
+        ).astype(np.int64)
+
+        lo, hi = self._window_bounds(index_days, int(lookback_days))
+        counts = self._prefix[hi] - self._prefix[lo]
+
+        flags = (counts[:, :-1] > 0).astype(np.uint8)
+        apply_hierarchy(flags, self.condition_keys, self.hierarchy)
+        has_codes = counts[:, -1] > 0
+        scores = compact_scores(score_flags(flags, self.points), has_codes)
+
+        result = pd.DataFrame({
+            id_col: self.patient_ids,
+            'Index_Date': index_days.astype('datetime64[D]'),
+            'N_Claims': hi - lo,
+            score_col: scores,
+            'Has_ICD_Codes': np.where(has_codes, 'Yes', 'No'),
+        })
+        for j, key in enumerate(self.condition_keys):
+            result[key] = flags[:, j]
+        return result
+
+    def sweep(self, index_dates, lookback_days=365, score_col='CCI_Score', id_col='DSYSRTKY'):
+        """Long-format scores for a series of index dates (e.g. month starts)."""
+        frames = [
+            self.as_of(index_date, lookback_days, score_col=score_col, id_col=id_col)
+            for index_date in pd.to_datetime(list(index_dates)).to_numpy('datetime64[D]')
+        ]
+        return pd.concat(frames, ignore_index=True)
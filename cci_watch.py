@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from datetime import datetime
+
+LEDGER_NAME = '.cci_processed.jsonl'
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_ledger(ledger_path):
+    """Map file name -> fingerprint of every file already handled."""
+    ledger = {}
+    if os.path.exists(ledger_path):
+        with open(ledger_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves a partial last line
+                    continue
+                ledger[entry['file']] = {'size': entry['size'], 'mtime_ns': entry['mtime_ns']}
+    return ledger
+
+
+def append_ledger(ledger_path, name, fingerprint, status, output_path, error=None):
+    entry = {
+        'file': name,
+        'size': fingerprint['size'],
+        'mtime_ns': fingerprint['mtime_ns'],
+        'status': status,
+        'output': output_path,
+        'processed_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    if error:
+        entry['error'] = error
+    with open(ledger_path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def output_path_for(name, output_dir):
+    stem = os.path.splitext(name)[0]
+    return os.path.join(output_dir, f'{stem}_CCI.xlsx')
+
+
+def scan_once(watch_dir, process_file, output_dir, ledger, ledger_path, pending=None):
+    """Score every new CSV in watch_dir; returns the number of files handled.
+
+    A file is picked up when its (size, mtime) is not in the ledger. When
+    `pending` is given, a file must also look the same on two consecutive
+    scans, so files still being copied in are left for the next scan.
+    """
+    handled = 0
+    for name in sorted(os.listdir(watch_dir)):
+        path = os.path.join(watch_dir, name)
+        if not name.lower().endswith('.csv') or not os.path.isfile(path):
+            continue
+
+        fingerprint = file_fingerprint(path)
+        if ledger.get(name) == fingerprint:
+            continue
+        if pending is not None:
+            if pending.get(name) != fingerprint:
+                pending[name] = fingerprint
+                continue
+            del pending[name]
+
+        output_path = output_path_for(name, output_dir)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Scoring '{name}'...")
+        try:
+            process_file(path, output_path)
+            append_ledger(ledger_path, name, fingerprint, 'ok', output_path)
+        except Exception as e:
+            # Failed files are recorded too; they are retried only if they change
+            print(f"Error processing '{name}': {e}")
+            append_ledger(ledger_path, name, fingerprint, 'error', output_path, error=str(e))
+        ledger[name] = fingerprint
+        handled += 1
+    return handled
+
+
+def watch_directory(watch_dir, process_file, output_dir, poll_interval=5.0, once=False,
+                    ledger_path=None):
+    """Poll watch_dir and call process_file(input_path, output_path) on new CSVs.
+
+    Runs in one long-lived process so imports and mappings stay warm. The
+    ledger of processed files lives next to the outputs, so a restart
+    skips everything that was already scored.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if ledger_path is None:
+        ledger_path = os.path.join(output_dir, LEDGER_NAME)
+    ledger = load_ledger(ledger_path)
+
+    print(f"Watching '{watch_dir}' for CSV files (outputs in '{output_dir}')")
+    if once:
+        return scan_once(watch_dir, process_file, output_dir, ledger, ledger_path)
+
+    pending = {}
+    try:
+        while True:
+            scan_once(watch_dir, process_file, output_dir, ledger, ledger_path, pending)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
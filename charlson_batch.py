@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+from charlson_index import CharlsonComorbidityIndex
+
+AGE_BINS = np.array([50, 60, 70, 80])
+
+CONDITION_KEYS = list(CharlsonComorbidityIndex.CONDITION_SCORES.keys())
+CONDITION_INDEX = {key: j for j, key in enumerate(CONDITION_KEYS)}
+# Age bands are scored from the age itself, never from the condition list
+CONDITION_POINTS = np.array([
+    0 if key.startswith('age_') else points
+    for key, points in CharlsonComorbidityIndex.CONDITION_SCORES.items()
+], dtype=np.int64)
+
+
+def age_scores(ages):
+    ages = np.asarray(ages, dtype=float)
+    if not np.isfinite(ages).all():
+        # None becomes NaN, which would otherwise bucket as 80+
+        raise ValueError("Age must be set before calculating score")
+    if ((ages < 0) | (ages > 150)).any():
+        raise ValueError("Age must be between 0 and 150")
+    return np.searchsorted(AGE_BINS, ages, side='right')
+
+
+def condition_matrix(condition_lists):
+    """Dense patients x CONDITION_KEYS 0/1 matrix from lists of condition keys."""
+    matrix = np.zeros((len(condition_lists), len(CONDITION_KEYS)), dtype=np.int8)
+    for i, conditions in enumerate(condition_lists):
+        for condition in conditions:
+            j = CONDITION_INDEX.get(condition)
+            if j is None:
+                raise ValueError(f"Unknown condition: {condition}")
+            matrix[i, j] = 1
+    return matrix
+
+
+def survival_table(max_score):
+    """10-year survival % for every score 0..max_score.
+
+    Same values as CharlsonComorbidityIndex.estimate_10_year_survival;
+    index it with an integer score array to evaluate the formula once per
+    distinct score instead of once per patient.
+    """
+    return np.array([round(math.exp(-0.9 * score) * 100, 1) for score in range(max(int(max_score), 0) + 1)])
+
+
+def score_patients(ages, condition_lists):
+    """Vectorized CharlsonComorbidityIndex.get_results for many patients.
+
+    Returns arrays keyed like get_results(): 'cci_score', 'age_score' and
+    '10_year_survival_percentage'.
+    """
+    age_score = age_scores(ages)
+    total = age_score + condition_matrix(condition_lists) @ CONDITION_POINTS
+    survival = survival_table(total.max() if len(total) else 0)[total]
+    return {
+        'cci_score': total,
+        '10_year_survival_percentage': survival,
+        'age_score': age_score,
+    }
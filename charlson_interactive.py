@@ -1,5 +1,58 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from itertools import islice
+
 from charlson_index import CharlsonComorbidityIndex
 
+try:
+    import numpy as np
+
+    from charlson_batch import score_patients
+except ImportError:  # only --batch needs numpy; the prompts run on the standard library
+    np = None
+
+
+CONDITIONS_MENU = {
+    '1': ('myocardial_infarction', 'Myocardial Infarction (MI) - 1 point'),
+    '2': ('chf', 'Congestive Heart Failure (CHF) - 1 point'),
+    '3': ('peripheral_vascular_disease', 'Peripheral Vascular Disease - 1 point'),
+    '4': ('cva_tia', 'Cerebrovascular Accident/TIA - 1 point'),
+    '5': ('dementia', 'Dementia - 1 point'),
+    '6': ('chronic_pulmonary_disease', 'Chronic Pulmonary Disease - 1 point'),
+    '7': ('connective_tissue_disease', 'Connective Tissue Disease - 1 point'),
+    '8': ('peptic_ulcer_disease', 'Peptic Ulcer Disease - 1 point'),
+    '9': ('liver_disease_mild', 'Liver Disease (Mild) - 1 point'),
+    '10': ('liver_disease_moderate_severe', 'Liver Disease (Moderate/Severe) - 3 points'),
+    '11': ('diabetes_uncomplicated', 'Diabetes (Uncomplicated) - 1 point'),
+    '12': ('diabetes_end_organ_damage', 'Diabetes (End-Organ Damage) - 2 points'),
+    '13': ('hemiplegia', 'Hemiplegia - 2 points'),
+    '14': ('moderate_severe_ckd', 'Moderate/Severe CKD - 2 points'),
+    '15': ('solid_tumor_localized', 'Solid Tumor (Localized) - 2 points'),
+    '16': ('solid_tumor_metastatic', 'Solid Tumor (Metastatic) - 6 points'),
+    '17': ('leukemia', 'Leukemia - 2 points'),
+    '18': ('lymphoma', 'Lymphoma - 2 points'),
+    '19': ('aids', 'AIDS - 6 points'),
+}
+
+# (highest score in band, text) pairs; the last band is open-ended
+INTERPRETATION_BANDS = [
+    (0, "Score 0: Minimal comorbidity burden"),
+    (2, "Score 1-2: Low comorbidity burden"),
+    (4, "Score 3-4: Moderate comorbidity burden"),
+    (6, "Score 5-6: High comorbidity burden"),
+    (None, "Score ≥7: Very high comorbidity burden"),
+]
+
+
+def interpret_score(score: int) -> str:
+    for upper, text in INTERPRETATION_BANDS:
+        if upper is None or score <= upper:
+            return text
+
 
 def display_menu():
     print("\n" + "=" * 70)
@@ -28,33 +81,11 @@ def get_age_input() -> int:
 def select_conditions(cci: CharlsonComorbidityIndex) -> None:
     """Interactive condition selection."""
     
-    conditions_menu = {
-        '1': ('myocardial_infarction', 'Myocardial Infarction (MI) - 1 point'),
-        '2': ('chf', 'Congestive Heart Failure (CHF) - 1 point'),
-        '3': ('peripheral_vascular_disease', 'Peripheral Vascular Disease - 1 point'),
-        '4': ('cva_tia', 'Cerebrovascular Accident/TIA - 1 point'),
-        '5': ('dementia', 'Dementia - 1 point'),
-        '6': ('chronic_pulmonary_disease', 'Chronic Pulmonary Disease - 1 point'),
-        '7': ('connective_tissue_disease', 'Connective Tissue Disease - 1 point'),
-        '8': ('peptic_ulcer_disease', 'Peptic Ulcer Disease - 1 point'),
-        '9': ('liver_disease_mild', 'Liver Disease (Mild) - 1 point'),
-        '10': ('liver_disease_moderate_severe', 'Liver Disease (Moderate/Severe) - 3 points'),
-        '11': ('diabetes_uncomplicated', 'Diabetes (Uncomplicated) - 1 point'),
-        '12': ('diabetes_end_organ_damage', 'Diabetes (End-Organ Damage) - 2 points'),
-        '13': ('hemiplegia', 'Hemiplegia - 2 points'),
-        '14': ('moderate_severe_ckd', 'Moderate/Severe CKD - 2 points'),
-        '15': ('solid_tumor_localized', 'Solid Tumor (Localized) - 2 points'),
-        '16': ('solid_tumor_metastatic', 'Solid Tumor (Metastatic) - 6 points'),
-        '17': ('leukemia', 'Leukemia - 2 points'),
-        '18': ('lymphoma', 'Lymphoma - 2 points'),
-        '19': ('aids', 'AIDS - 6 points'),
-    }
-    
     print("\n" + "-" * 70)
     print("SELECT COMORBID CONDITIONS (enter condition numbers, separated by commas)")
     print("-" * 70)
     
-    for key, (_, description) in conditions_menu.items():
+    for key, (_, description) in CONDITIONS_MENU.items():
         print(f"{key:>2}. {description}")
     
     print("\nEnter condition numbers (e.g., '1,2,5' for MI, CHF, and Dementia):")
@@ -67,8 +98,8 @@ def select_conditions(cci: CharlsonComorbidityIndex) -> None:
         try:
             selected = [s.strip() for s in selection.split(',')]
             for choice in selected:
-                if choice in conditions_menu:
-                    condition_key, _ = conditions_menu[choice]
+                if choice in CONDITIONS_MENU:
+                    condition_key, _ = CONDITIONS_MENU[choice]
                     cci.add_condition(condition_key, True)
                 else:
                     print(f"Warning: Invalid selection '{choice}' ignored.")
@@ -115,16 +146,7 @@ def calculate_patient_cci():
     score = results['cci_score']
     survival = results['10_year_survival_percentage']
     
-    if score == 0:
-        print("  • Score 0: Minimal comorbidity burden")
-    elif score <= 2:
-        print("  • Score 1-2: Low comorbidity burden")
-    elif score <= 4:
-        print("  • Score 3-4: Moderate comorbidity burden")
-    elif score <= 6:
-        print("  • Score 5-6: High comorbidity burden")
-    else:
-        print("  • Score ≥7: Very high comorbidity burden")
+    print(f"  • {interpret_score(score)}")
     
     print(f"  • Predicted 10-year all-cause mortality: {100 - survival:.1f}%")
     print("  • Higher scores indicate worse prognosis and higher mortality risk")
@@ -215,7 +237,167 @@ def view_examples():
         print(f"   10-Year Survival: {results['10_year_survival_percentage']}%")
 
 
+def parse_age(value) -> int:
+    """Whole-number age from text or a JSON number (65 or 65.0)."""
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid age '{value}'")
+    if isinstance(value, bool) or not math.isfinite(number) or not number.is_integer():
+        raise ValueError(f"Invalid age '{value}'")
+    age = int(number)
+    if not 0 <= age <= 150:
+        raise ValueError("Age must be between 0 and 150")
+    return age
+
+
+def parse_conditions(value) -> list:
+    """Menu numbers ('1,2,5') and/or condition keys ('chf;dementia') to condition keys."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        tokens = value.replace(';', ',').replace('|', ',').split(',')
+    else:
+        tokens = value
+    
+    keys = []
+    for token in tokens:
+        token = str(token).strip()
+        if not token:
+            continue
+        if token in CONDITIONS_MENU:
+            key = CONDITIONS_MENU[token][0]
+        elif token.lower() in CharlsonComorbidityIndex.CONDITION_SCORES and not token.lower().startswith('age_'):
+            key = token.lower()
+        else:
+            raise ValueError(f"Invalid selection '{token}'")
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def read_assessments(path):
+    """Yield assessment dicts from a .csv, .json (array) or .jsonl file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            yield from csv.DictReader(f)
+        elif ext == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == '.json':
+            yield from json.load(f)
+        else:
+            raise ValueError(f"Unsupported input format '{ext}' (use .csv, .json or .jsonl)")
+
+
+BULK_FIELDS = ['id', 'age', 'conditions', 'age_score', 'cci_score',
+               '10_year_survival_percentage', 'predicted_10_year_mortality', 'interpretation', 'error']
+
+
+def score_assessment_chunk(rows, first_row_number):
+    """Score a list of raw assessment dicts in one vectorized call."""
+    band_uppers = np.array([upper for upper, _ in INTERPRETATION_BANDS if upper is not None])
+    band_texts = [text for _, text in INTERPRETATION_BANDS]
+    
+    out = []
+    valid = []
+    for offset, row in enumerate(rows):
+        if not isinstance(row, dict):
+            out.append({'id': first_row_number + offset, 'age': '', 'conditions': '',
+                        'error': f"Expected an object with age and conditions, got {type(row).__name__}"})
+            continue
+        patient_id = next((row[k] for k in ('id', 'patient_id', 'DSYSRTKY') if row.get(k) not in (None, '')),
+                          first_row_number + offset)
+        record = {'id': patient_id, 'age': row.get('age'), 'conditions': '', 'error': ''}
+        try:
+            age = parse_age(row.get('age'))
+            conditions = parse_conditions(row.get('conditions'))
+            record['age'] = age
+            record['conditions'] = ';'.join(conditions)
+            valid.append((len(out), age, conditions))
+        except ValueError as e:
+            record['error'] = str(e)
+        out.append(record)
+    
+    if valid:
+        positions = [pos for pos, _, _ in valid]
+        results = score_patients([age for _, age, _ in valid], [conds for _, _, conds in valid])
+        bands = np.searchsorted(band_uppers, results['cci_score'], side='left')
+        for i, pos in enumerate(positions):
+            survival = float(results['10_year_survival_percentage'][i])
+            out[pos].update({
+                'age_score': int(results['age_score'][i]),
+                'cci_score': int(results['cci_score'][i]),
+                '10_year_survival_percentage': survival,
+                'predicted_10_year_mortality': round(100 - survival, 1),
+                'interpretation': band_texts[bands[i]],
+            })
+    return out
+
+
+def run_bulk(input_path, output_path, chunk_size=50000):
+    """Score a file of bedside assessments without prompts.
+    
+    Each row needs an age and may list conditions as menu numbers or
+    condition keys. Rows are scored chunk by chunk through one vectorized
+    path; rows with invalid input are written with an error message.
+    """
+    if np is None:
+        raise ImportError("Bulk scoring requires numpy (pip install numpy)")
+    
+    as_jsonl = output_path.lower().endswith('.jsonl')
+    scored = errors = 0
+    rows = read_assessments(input_path)
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = None if as_jsonl else csv.DictWriter(f, fieldnames=BULK_FIELDS)
+        if writer:
+            writer.writeheader()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            for record in score_assessment_chunk(chunk, scored + errors + 1):
+                if record['error']:
+                    errors += 1
+                else:
+                    scored += 1
+                if writer:
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record) + '\n')
+    return scored, errors
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description="Charlson Comorbidity Index calculator (interactive, or bulk with --batch)"
+    )
+    parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='Score a .csv/.json/.jsonl file of assessments (age, conditions) instead of prompting'
+    )
+    parser.add_argument(
+        '--output', '-o',
+        help='Output file for --batch, .csv or .jsonl (default: <input>_cci.csv)'
+    )
+    args = parser.parse_args()
+    
+    if args.batch:
+        if not os.path.exists(args.batch):
+            print(f"Error: Input file '{args.batch}' not found!")
+            sys.exit(1)
+        output_path = args.output or f"{os.path.splitext(args.batch)[0]}_cci.csv"
+        try:
+            scored, errors = run_bulk(args.batch, output_path)
+        except (ImportError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Scored {scored} patients ({errors} rows with errors) -> {output_path}")
+        return
+    
     while True:
         display_menu()
         choice = input("Enter your choice (1-4): ").strip()
@@ -15,6 +15,22 @@ if not hasattr(pd.errors, 'SettingWithCopyWarning'):
 
 from comorbidipy import comorbidity
 
+from cci_arrow import encode_frame, format_code_column
+from cci_cache import ResultCache
+from cci_engine import (
+    CodePrefilter,
+    ConditionMaskLookup,
+    apply_hierarchy_dict,
+    canonical_icd10,
+    compact_scores,
+    condition_points,
+    hierarchy_from_mapping,
+    missing_as_none,
+    rollup_patients,
+    score_flags,
+)
+from cci_summary import ScoreSummary
+
 # ============================================================================
 # CUSTOM CCI CALCULATOR (17 CONDITIONS)
 # ============================================================================
@@ -27,71 +43,93 @@ CHARLSON_CONDITIONS = {
     'COPD': {'name': 'COPD', 'codes': ['J41', 'J42', 'J43', 'J44', 'J45', 'J46', 'J47', 'J60', 'J61', 'J62', 'J63', 'J64', 'J65', 'J66', 'J67'], 'points': 1},
     'RHEUMD': {'name': 'Rheumatologic', 'codes': ['M05', 'M06', 'M31', 'M32', 'M33', 'M34', 'M35', 'M36'], 'points': 1},
     'PUD': {'name': 'Peptic Ulcer', 'codes': ['K25', 'K26', 'K27', 'K28'], 'points': 1},
-    'MLD': {'name': 'Mild Liver Dis', 'codes': ['B18', 'C80', 'K70', 'K71', 'K73', 'K74', 'K76', 'Z94'], 'points': 1},
+    'MLD': {'name': 'Mild Liver Dis', 'codes': ['B18', 'C80', 'K70', 'K71', 'K73', 'K74', 'K76', 'Z94'], 'points': 1, 'superseded_by': 'MSLD'},
     'DIAB': {'name': 'Diabetes', 'codes': ['E10', 'E11', 'E12', 'E13', 'E14'], 'points': 1},
     'REND': {'name': 'Renal Disease', 'codes': ['I12', 'I13', 'N03', 'N05', 'N18', 'N19', 'N25', 'Z49'], 'points': 2},
-    'CANC': {'name': 'Cancer (non-met)', 'codes': ['C00', 'C01', 'C02', 'C03', 'C04', 'C05', 'C06', 'C07', 'C08', 'C09', 'C10', 'C11', 'C12', 'C13', 'C14', 'C15', 'C16', 'C17', 'C18', 'C19', 'C20', 'C21', 'C22', 'C23', 'C24', 'C25', 'C26', 'C30', 'C31', 'C32', 'C33', 'C34', 'C37', 'C38', 'C39', 'C40', 'C41', 'C43', 'C45', 'C47', 'C48', 'C49', 'C50', 'C51', 'C52', 'C53', 'C54', 'C55', 'C56', 'C57', 'C58', 'C60', 'C61', 'C62', 'C63', 'C64', 'C65', 'C66', 'C67', 'C68', 'C69', 'C70', 'C71', 'C72', 'C73', 'C74', 'C75', 'C76', 'C77', 'C78', 'C80', 'C81', 'C82', 'C83', 'C84', 'C85', 'C86', 'C87', 'C88', 'C89', 'C90', 'C91', 'C92', 'C93', 'C94', 'C95', 'C96', 'C97'], 'points': 2},
+    'CANC': {'name': 'Cancer (non-met)', 'codes': ['C00', 'C01', 'C02', 'C03', 'C04', 'C05', 'C06', 'C07', 'C08', 'C09', 'C10', 'C11', 'C12', 'C13', 'C14', 'C15', 'C16', 'C17', 'C18', 'C19', 'C20', 'C21', 'C22', 'C23', 'C24', 'C25', 'C26', 'C30', 'C31', 'C32', 'C33', 'C34', 'C37', 'C38', 'C39', 'C40', 'C41', 'C43', 'C45', 'C47', 'C48', 'C49', 'C50', 'C51', 'C52', 'C53', 'C54', 'C55', 'C56', 'C57', 'C58', 'C60', 'C61', 'C62', 'C63', 'C64', 'C65', 'C66', 'C67', 'C68', 'C69', 'C70', 'C71', 'C72', 'C73', 'C74', 'C75', 'C76', 'C77', 'C78', 'C80', 'C81', 'C82', 'C83', 'C84', 'C85', 'C86', 'C87', 'C88', 'C89', 'C90', 'C91', 'C92', 'C93', 'C94', 'C95', 'C96', 'C97'], 'points': 2, 'superseded_by': 'METACANC'},
     'METACANC': {'name': 'Metastatic CA', 'codes': ['C77', 'C78', 'C79', 'C80'], 'points': 6},
     'MSLD': {'name': 'Severe Liver', 'codes': ['I85', 'I86', 'I87', 'K70', 'K71', 'K72', 'K73', 'K74'], 'points': 3},
     'AIDS': {'name': 'AIDS', 'codes': ['B20', 'B21', 'B22', 'B23', 'B24'], 'points': 6}
 }
 
 class CustomCharlsonCalculator:
-    def __init__(self):
-        self.conditions = CHARLSON_CONDITIONS
-    
+    def __init__(self, conditions=None, use_hierarchy=True):
+        self.conditions = conditions if conditions is not None else CHARLSON_CONDITIONS
+        self.condition_keys = list(self.conditions.keys())
+        self.points = condition_points(self.conditions, self.condition_keys)
+        self.hierarchy = hierarchy_from_mapping(self.conditions) if use_hierarchy else []
+        self.icd_cols = [f'ICD_DGNS_CD{i}' for i in range(1, 13)]
+        self.prefilter = CodePrefilter(self.conditions)
+        self.patterns = {
+            key: [canonical_icd10(code) for code in self.conditions[key]['codes']]
+            for key in self.condition_keys
+        }
+
     def extract_codes(self, row):
         codes = []
-        for i in range(1, 13):
-            col = f'ICD_DGNS_CD{i}'
-            if col in row.index and pd.notna(row[col]):
-                codes.append(str(row[col]).strip().upper())
+        for col in self.icd_cols:
+            if col in row.index:
+                code = canonical_icd10(row[col])
+                if code:
+                    codes.append(code)
         return codes
     
-    def check_condition(self, codes, condition_codes):
+    def check_condition(self, codes, patterns):
+        """Whether any canonical code starts with one of the canonical `patterns`."""
         for code in codes:
-            for cond_code in condition_codes:
-                if code.startswith(cond_code.rstrip('.')):
+            for prefix in patterns:
+                if code.startswith(prefix):
                     return True
         return False
     
+    def detect_conditions(self, codes):
+        codes = self.prefilter.filter(codes)
+        if not codes:
+            return [0] * len(self.condition_keys)
+        return [
+            1 if self.check_condition(codes, self.patterns[key]) else 0
+            for key in self.condition_keys
+        ]
+
     def calculate(self, row):
         codes = self.extract_codes(row)
         has_codes = len(codes) > 0
-        
+
         if not has_codes:
             return 0, {}, codes, False
-        
-        conditions = {}
-        score = 0
-        for cond_key, cond_info in self.conditions.items():
-            if self.check_condition(codes, cond_info['codes']):
-                conditions[cond_key] = 1
-                score += cond_info['points']
-            else:
-                conditions[cond_key] = 0
-        
+
+        conditions = dict(zip(self.condition_keys, self.detect_conditions(codes)))
+        apply_hierarchy_dict(conditions, self.hierarchy)
+        score = sum(self.conditions[key]['points'] for key, flag in conditions.items() if flag)
+
         return score, conditions, codes, True
 
 def process_custom_calculator(df):
     """Process all 839 patients with custom calculator"""
     calc = CustomCharlsonCalculator()
-    results = []
-    
-    for idx, row in df.iterrows():
-        score, conditions, codes, has_codes = calc.calculate(row)
-        
-        result = {
-            'DSYSRTKY': row['DSYSRTKY'],
-            'CLAIMNO': row['CLAIMNO'],
-            'Custom_CCI_Score': score if has_codes else np.nan,
-            'Has_ICD_Codes': 'Yes' if has_codes else 'No',
-            'ICD_Codes': '|'.join(codes) if codes else 'None',
-        }
-        result.update(conditions)
-        results.append(result)
-    
-    return pd.DataFrame(results)
+    # Distinct codes per column are matched once; hierarchy is one pass over the masks
+    lookup = ConditionMaskLookup(calc.conditions, exact=False, hierarchy=calc.hierarchy)
+    masks, has_codes, icd_codes = encode_frame(df, lookup, calc.icd_cols)
+    flags = lookup.flag_matrix(masks)
+    scores = compact_scores(score_flags(flags, calc.points), has_codes)
+
+    results = pd.DataFrame({
+        'DSYSRTKY': df['DSYSRTKY'].to_numpy(),
+        'CLAIMNO': df['CLAIMNO'].to_numpy(),
+        'Custom_CCI_Score': scores,
+        'Has_ICD_Codes': np.where(has_codes, 'Yes', 'No'),
+        'ICD_Codes': icd_codes,
+    })
+    for j, key in enumerate(calc.condition_keys):
+        results[key] = flags[:, j]
+
+    return results
+
+def rollup_custom_to_patients(custom_df):
+    """One row per DSYSRTKY with condition flags ORed across all claims"""
+    calc = CustomCharlsonCalculator()
+    return rollup_patients(custom_df, calc.condition_keys, calc.points, calc.hierarchy,
+                           score_col='Custom_CCI_Score')
 
 def process_comorbidipy(df):
     """Process patients with comorbidipy"""
@@ -130,32 +168,52 @@ def main():
     
     # Load data
     print("1️⃣  Loading dataset...")
-    df = pd.read_csv('synthetic_dmerc_base 1.csv')
+    input_path = 'synthetic_dmerc_base 1.csv'
+    df = pd.read_csv(input_path)
     print(f"   ✅ Loaded {len(df)} patient records\n")
     
+    # Scores are cached by input content, mapping and options; reruns skip scoring
+    cache = ResultCache()
+    columns = ['DSYSRTKY', 'CLAIMNO'] + [f'ICD_DGNS_CD{i}' for i in range(1, 13)]
+    
     # Custom calculator
     print("2️⃣  Calculating with Custom Calculator (17 conditions)...")
-    custom_df = process_custom_calculator(df)
-    has_codes = (custom_df['Has_ICD_Codes'] == 'Yes').sum()
-    print(f"   ✅ {has_codes}/839 patients have ICD codes\n")
+    calc = CustomCharlsonCalculator()
+    key = cache.key(input_path, columns, calc.conditions, 'comprehensive_custom', {'hierarchy': calc.hierarchy})
+    custom_df, hit = cache.load_or_score(key, lambda: process_custom_calculator(df), calc.condition_keys,
+                                         ('DSYSRTKY', 'CLAIMNO'), 'Custom_CCI_Score', label='comprehensive_custom')
+    custom_summary = ScoreSummary.from_results(custom_df, calc.condition_keys, score_col='Custom_CCI_Score')
+    has_codes = custom_summary.with_codes
+    print(f"   ✅ {has_codes}/839 patients have ICD codes{' (cached)' if hit else ''}\n")
     
     # Comorbidipy
     print("3️⃣  Calculating with Comorbidipy...")
-    combo_df = process_comorbidipy(df)
+    # Ages are taken as of today and the mapping lives in the package, so
+    # the date and the installed comorbidipy version are part of the key
+    key = cache.key(input_path, columns + ['DOB_DT'], {}, 'comprehensive_comorbidipy',
+                    {'as_of': datetime.now().date()}, packages=('comorbidipy',))
+    combo_df = cache.get(key)
+    if combo_df is None:
+        combo_df = process_comorbidipy(df)
+        if combo_df is not None:
+            cache.put(key, combo_df, score_col='Comorbidipy_CCI_Score', label='comprehensive_comorbidipy')
+    combo_summary = None
     if combo_df is not None:
-        print(f"   ✅ {len(combo_df)} patients scored\n")
+        combo_summary = ScoreSummary.from_results(combo_df, score_col='Comorbidipy_CCI_Score')
+        print(f"   ✅ {combo_summary.rows} patients scored\n")
     
-    # Merge all
-    print("4️⃣  Merging results...")
-    all_results = custom_df.copy()
+    # Comorbidipy scores patients, so compare against the patient-level rollup
+    print("4️⃣  Rolling claims up to patients and merging results...")
+    all_results = rollup_custom_to_patients(custom_df)
     if combo_df is not None:
-        all_results = all_results.merge(combo_df, on='DSYSRTKY', how='left')
+        all_results = all_results.merge(combo_df, on='DSYSRTKY', how='left', validate='one_to_one')
     
-    all_results['Match'] = (all_results['Custom_CCI_Score'] == all_results['Comorbidipy_CCI_Score'])
+    all_results['Match'] = (all_results['Custom_CCI_Score'] == all_results['Comorbidipy_CCI_Score']).fillna(False)
     
     # Create Excel workbook
     print("5️⃣  Creating professional Excel workbook...")
-    create_comprehensive_excel('CCI_Complete_Analysis_839_Patients.xlsx', df, all_results, custom_df, combo_df)
+    create_comprehensive_excel('CCI_Complete_Analysis_839_Patients.xlsx', df, all_results, custom_df, combo_df,
+                               custom_summary, combo_summary)
     
     print("\n" + "="*80)
     print("✅ ANALYSIS COMPLETE!")
@@ -163,11 +221,15 @@ def main():
     print(f"\nFile: CCI_Complete_Analysis_839_Patients.xlsx")
     print(f"Total Patients: {len(df)}")
     print(f"Patients with ICD codes: {has_codes}")
-    print(f"Patients scored by Comorbidipy: {len(combo_df) if combo_df is not None else 0}")
+    print(f"Patients scored by Comorbidipy: {combo_summary.rows if combo_summary is not None else 0}")
     print("\n")
 
-def create_comprehensive_excel(filename, raw_df, all_results, custom_df, combo_df):
-    """Create comprehensive multi-sheet Excel workbook"""
+def create_comprehensive_excel(filename, raw_df, all_results, custom_df, combo_df, custom_summary, combo_summary):
+    """Create comprehensive multi-sheet Excel workbook
+
+    Every statistic comes from the ScoreSummary of each calculator, so no
+    sheet rescans the score columns.
+    """
     wb = Workbook()
     wb.remove(wb.active)  # Remove default sheet
     
@@ -177,12 +239,12 @@ def create_comprehensive_excel(filename, raw_df, all_results, custom_df, combo_d
     
     # Sheet 2: Custom Calculator Details
     ws2 = wb.create_sheet("Custom Calculator")
-    add_custom_details_sheet(ws2, custom_df)
+    add_custom_details_sheet(ws2, custom_df, custom_summary)
     
     # Sheet 3: Comorbidipy Results
     if combo_df is not None:
         ws3 = wb.create_sheet("Comorbidipy Results")
-        add_comorbidipy_sheet(ws3, combo_df)
+        add_comorbidipy_sheet(ws3, combo_df, combo_summary)
     
     # Sheet 4: Comparison
     ws4 = wb.create_sheet("Comparison")
@@ -190,11 +252,11 @@ def create_comprehensive_excel(filename, raw_df, all_results, custom_df, combo_d
     
     # Sheet 5: Demographics & Summary
     ws5 = wb.create_sheet("Summary Statistics")
-    add_summary_sheet(ws5, raw_df, all_results, custom_df, combo_df)
+    add_summary_sheet(ws5, raw_df, custom_summary, combo_summary)
     
     # Sheet 6: Condition Prevalence
     ws6 = wb.create_sheet("Condition Prevalence")
-    add_prevalence_sheet(ws6, custom_df)
+    add_prevalence_sheet(ws6, custom_summary)
     
     wb.save(filename)
 
@@ -213,7 +275,7 @@ def add_cci_results_sheet(ws, df):
     ws['A3'].font = Font(size=10, italic=True, color="666666")
     
     # Headers
-    headers = ['DSYSRTKY', 'CLAIMNO', 'Custom_CCI', 'Comorbidipy_CCI', 'Match', 'Has_ICD', 'ICD_Codes']
+    headers = ['DSYSRTKY', 'N_Claims', 'Custom_CCI', 'Comorbidipy_CCI', 'Match', 'Has_ICD']
     start_row = 5
     for col_idx, header in enumerate(headers, 1):
         cell = ws.cell(row=start_row, column=col_idx)
@@ -224,7 +286,7 @@ def add_cci_results_sheet(ws, df):
     ws.row_dimensions[start_row].height = 25
     
     # Data
-    for row_idx, row_data in enumerate(dataframe_to_rows(df[['DSYSRTKY', 'CLAIMNO', 'Custom_CCI_Score', 'Comorbidipy_CCI_Score', 'Match', 'Has_ICD_Codes', 'ICD_Codes']], index=False, header=False), start_row + 1):
+    for row_idx, row_data in enumerate(dataframe_to_rows(missing_as_none(df[['DSYSRTKY', 'N_Claims', 'Custom_CCI_Score', 'Comorbidipy_CCI_Score', 'Match', 'Has_ICD_Codes']]), index=False, header=False), start_row + 1):
         for col_idx, value in enumerate(row_data, 1):
             cell = ws.cell(row=row_idx, column=col_idx)
             cell.value = value
@@ -263,11 +325,10 @@ def add_cci_results_sheet(ws, df):
     ws.column_dimensions['D'].width = 14
     ws.column_dimensions['E'].width = 10
     ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 40
     
     ws.freeze_panes = f'A{start_row + 1}'
 
-def add_custom_details_sheet(ws, df):
+def add_custom_details_sheet(ws, df, summary):
     """Sheet 2: Custom calculator details"""
     ws['A1'] = "Custom CCI Calculator - Detailed Results"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
@@ -277,10 +338,10 @@ def add_custom_details_sheet(ws, df):
     
     # Summary stats
     ws['A3'] = "Summary:"
-    ws['A4'] = f"Total Patients: {len(df)}"
-    ws['A5'] = f"Patients with ICD Codes: {(df['Has_ICD_Codes'] == 'Yes').sum()}"
-    ws['A6'] = f"Mean CCI Score: {df['Custom_CCI_Score'].mean():.2f}"
-    ws['A7'] = f"Median CCI Score: {df['Custom_CCI_Score'].median():.0f}"
+    ws['A4'] = f"Total Patients: {summary.rows}"
+    ws['A5'] = f"Patients with ICD Codes: {summary.with_codes}"
+    ws['A6'] = f"Mean CCI Score: {summary.mean:.2f}"
+    ws['A7'] = f"Median CCI Score: {summary.median:.0f}"
     
     # Headers
     headers = list(df.columns)
@@ -293,7 +354,7 @@ def add_custom_details_sheet(ws, df):
         cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
     
     # Data
-    for row_idx, row_data in enumerate(dataframe_to_rows(df, index=False, header=False), start_row + 1):
+    for row_idx, row_data in enumerate(dataframe_to_rows(missing_as_none(format_code_column(df)), index=False, header=False), start_row + 1):
         for col_idx, value in enumerate(row_data, 1):
             cell = ws.cell(row=row_idx, column=col_idx)
             cell.value = value
@@ -306,7 +367,7 @@ def add_custom_details_sheet(ws, df):
         from openpyxl.utils import get_column_letter
         ws.column_dimensions[get_column_letter(col_idx)].width = 12
 
-def add_comorbidipy_sheet(ws, df):
+def add_comorbidipy_sheet(ws, df, summary):
     """Sheet 3: Comorbidipy results"""
     ws['A1'] = "Comorbidipy CCI Results"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
@@ -314,8 +375,8 @@ def add_comorbidipy_sheet(ws, df):
     ws.merge_cells('A1:C1')
     ws.row_dimensions[1].height = 25
     
-    ws['A3'] = f"Patients Scored: {len(df)}"
-    ws['A4'] = f"Mean Score: {df['Comorbidipy_CCI_Score'].mean():.2f}"
+    ws['A3'] = f"Patients Scored: {summary.rows}"
+    ws['A4'] = f"Mean Score: {summary.mean:.2f}"
     
     headers = ['DSYSRTKY', 'Comorbidipy_CCI_Score']
     start_row = 6
@@ -359,7 +420,7 @@ def add_comparison_sheet(ws, df):
         cell.fill = PatternFill(start_color="92D050", end_color="92D050", fill_type="solid")
         cell.alignment = Alignment(horizontal='center', vertical='center')
     
-    for row_idx, row_data in enumerate(dataframe_to_rows(df[['DSYSRTKY', 'Custom_CCI_Score', 'Comorbidipy_CCI_Score', 'Match']], index=False, header=False), start_row + 1):
+    for row_idx, row_data in enumerate(dataframe_to_rows(missing_as_none(df[['DSYSRTKY', 'Custom_CCI_Score', 'Comorbidipy_CCI_Score', 'Match']]), index=False, header=False), start_row + 1):
         for col_idx, value in enumerate(row_data, 1):
             cell = ws.cell(row=row_idx, column=col_idx)
             cell.value = value
@@ -379,7 +440,7 @@ def add_comparison_sheet(ws, df):
         ws.column_dimensions[col].width = 15
     ws.freeze_panes = f'A{start_row + 1}'
 
-def add_summary_sheet(ws, raw_df, all_results, custom_df, combo_df):
+def add_summary_sheet(ws, raw_df, custom_summary, combo_summary):
     """Sheet 5: Summary statistics"""
     ws['A1'] = "Summary Statistics & Demographics"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
@@ -390,21 +451,21 @@ def add_summary_sheet(ws, raw_df, all_results, custom_df, combo_df):
     row = 3
     metrics = [
         ('Total Patients in Dataset', len(raw_df)),
-        ('Patients with ICD Codes', (custom_df['Has_ICD_Codes'] == 'Yes').sum()),
-        ('Patients without ICD Codes', (custom_df['Has_ICD_Codes'] == 'No').sum()),
-        ('Patients Scored by Comorbidipy', len(combo_df) if combo_df is not None else 0),
+        ('Patients with ICD Codes', custom_summary.with_codes),
+        ('Patients without ICD Codes', custom_summary.rows - custom_summary.with_codes),
+        ('Patients Scored by Comorbidipy', combo_summary.rows if combo_summary is not None else 0),
         ('', ''),
         ('CUSTOM CALCULATOR STATISTICS', ''),
-        ('Mean CCI Score', f"{custom_df['Custom_CCI_Score'].mean():.2f}"),
-        ('Median CCI Score', f"{custom_df['Custom_CCI_Score'].median():.0f}"),
-        ('Min Score', f"{custom_df['Custom_CCI_Score'].min():.0f}"),
-        ('Max Score', f"{custom_df['Custom_CCI_Score'].max():.0f}"),
+        ('Mean CCI Score', f"{custom_summary.mean:.2f}"),
+        ('Median CCI Score', f"{custom_summary.median:.0f}"),
+        ('Min Score', f"{custom_summary.min:.0f}"),
+        ('Max Score', f"{custom_summary.max:.0f}"),
         ('', ''),
         ('COMORBIDIPY STATISTICS', ''),
-        ('Mean CCI Score', f"{combo_df['Comorbidipy_CCI_Score'].mean():.2f}" if combo_df is not None else "N/A"),
-        ('Median CCI Score', f"{combo_df['Comorbidipy_CCI_Score'].median():.0f}" if combo_df is not None else "N/A"),
-        ('Min Score', f"{combo_df['Comorbidipy_CCI_Score'].min():.0f}" if combo_df is not None else "N/A"),
-        ('Max Score', f"{combo_df['Comorbidipy_CCI_Score'].max():.0f}" if combo_df is not None else "N/A"),
+        ('Mean CCI Score', f"{combo_summary.mean:.2f}" if combo_summary is not None else "N/A"),
+        ('Median CCI Score', f"{combo_summary.median:.0f}" if combo_summary is not None else "N/A"),
+        ('Min Score', f"{combo_summary.min:.0f}" if combo_summary is not None else "N/A"),
+        ('Max Score', f"{combo_summary.max:.0f}" if combo_summary is not None else "N/A"),
     ]
     
     for label, value in metrics:
@@ -420,7 +481,7 @@ def add_summary_sheet(ws, raw_df, all_results, custom_df, combo_df):
     ws.column_dimensions['A'].width = 35
     ws.column_dimensions['B'].width = 20
 
-def add_prevalence_sheet(ws, df):
+def add_prevalence_sheet(ws, summary):
     """Sheet 6: Condition prevalence"""
     ws['A1'] = "Condition Prevalence Analysis"
     ws['A1'].font = Font(size=14, bold=True, color="FFFFFF")
@@ -428,8 +489,6 @@ def add_prevalence_sheet(ws, df):
     ws.merge_cells('A1:D1')
     ws.row_dimensions[1].height = 25
     
-    condition_cols = [c for c in df.columns if c not in ['DSYSRTKY', 'CLAIMNO', 'Custom_CCI_Score', 'Has_ICD_Codes', 'ICD_Codes']]
-    
     headers = ['Condition', 'Count', 'Percentage', 'CCI Points']
     start_row = 3
     for col_idx, header in enumerate(headers, 1):
@@ -440,9 +499,7 @@ def add_prevalence_sheet(ws, df):
         cell.alignment = Alignment(horizontal='center', vertical='center')
     
     row = start_row + 1
-    for cond in sorted(condition_cols):
-        count = df[cond].sum()
-        pct = (count / len(df) * 100) if len(df) > 0 else 0
+    for cond, count, pct in summary.prevalence().sort_values('Condition').itertuples(index=False):
         
         ws[f'A{row}'] = cond
         ws[f'B{row}'] = int(count)
@@ -0,0 +1,131 @@
+import unittest
+
+import pandas as pd
+
+from accurate_cci_calculator import EXACT_ICD_CODES, condition_evidence, process_calculator
+from aligned_cci_calculator import CHARLSON_ICD10_MAPPING, AlignedCharlsonCalculator
+from cci_arrow import (
+    CodeListBuilder,
+    code_list_buffers,
+    code_list_column,
+    encode_frame,
+    format_code_column,
+    format_code_lists,
+    is_arrow_compatible,
+    pa,
+)
+from cci_engine import ConditionMaskLookup
+
+
+CLAIMS = {
+    'DSYSRTKY': [1, 1, 2, 3],
+    'CLAIMNO': [10, 11, 12, 13],
+    'ICD_DGNS_CD1': ['I50.22', None, 'k70.3 ', 'C78.0'],
+    'ICD_DGNS_CD2': [None, '', 'K74.60', 'C50.9'],
+    'ICD_DGNS_CD3': ['I10', None, 'E11.9', None],
+}
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestArrowInput(unittest.TestCase):
+    """Arrow-compatible frames are scored without pandas and return pyarrow Tables."""
+
+    def test_accurate_matches_pandas_path(self):
+        expected = process_calculator(pd.DataFrame(CLAIMS), max_icd_cols=3)
+        results = process_calculator(pa.table(CLAIMS), max_icd_cols=3)
+        self.assertIsInstance(results, pa.Table)
+        self.assertEqual(results.column_names, list(expected.columns))
+        self.assertEqual(results['ICD_Codes'].to_pylist(), expected['ICD_Codes'].tolist())
+        self.assertEqual(results['CCI_Score'].to_pylist(), [2, None, 1, 0])
+        self.assertEqual(results['CHF'].to_pylist(), [1, 0, 0, 0])
+
+    def test_aligned_matches_pandas_path(self):
+        calc = AlignedCharlsonCalculator()
+        expected = calc.process_dataframe(pd.DataFrame(CLAIMS))
+        results = calc.process_dataframe(pa.table(CLAIMS))
+        self.assertEqual(results.column_names, list(expected.columns))
+        self.assertEqual(results['Aligned_CCI_Score'].to_pylist(), expected['Aligned_CCI_Score'].tolist())
+        self.assertEqual(results['ICD_Codes'].to_pylist(), expected['ICD_Codes'].tolist())
+
+    def test_punctuation_only_cells_are_dropped(self):
+        claims = dict(CLAIMS, ICD_DGNS_CD2=[' ', '.', 'K74.60', '-'])
+        calc = AlignedCharlsonCalculator()
+        expected = calc.process_dataframe(pd.DataFrame(claims))
+        results = calc.process_dataframe(pa.table(claims))
+        self.assertEqual(expected['ICD_Codes'].tolist()[1], [])
+        self.assertEqual(results['ICD_Codes'].to_pylist(), expected['ICD_Codes'].tolist())
+
+    def test_dotless_mapping_prefixes(self):
+        mapping = {'RHD': {'name': 'Rheumatic heart disease', 'codes': ['I099'], 'points': 1}}
+        calc = AlignedCharlsonCalculator(mapping)
+        claims = {'DSYSRTKY': [1, 2], 'CLAIMNO': [10, 11], 'ICD_DGNS_CD1': ['I09.9', 'I09.8']}
+        expected = calc.process_dataframe(pd.DataFrame(claims))
+        self.assertEqual(expected['RHD'].tolist(), [1, 0])
+        self.assertEqual(calc.process_dataframe(pa.table(claims))['RHD'].to_pylist(), [1, 0])
+
+    def test_dotless_codes_score_like_dotted(self):
+        dotless = dict(CLAIMS, ICD_DGNS_CD1=['I5022', None, 'K703', 'C780'], ICD_DGNS_CD3=['I10', None, 'E119', None])
+        expected = process_calculator(pd.DataFrame(CLAIMS), max_icd_cols=3)
+        pandas_results = process_calculator(pd.DataFrame(dotless), max_icd_cols=3)
+        pd.testing.assert_frame_equal(pandas_results, expected)
+        arrow_results = process_calculator(pa.table(dotless), max_icd_cols=3)
+        self.assertEqual(arrow_results['CCI_Score'].to_pylist(), [2, None, 1, 0])
+        self.assertEqual(arrow_results['ICD_Codes'].to_pylist(), expected['ICD_Codes'].tolist())
+
+    def test_interchange_protocol_input(self):
+        results = process_calculator(pa.table(CLAIMS).__dataframe__(), max_icd_cols=3)
+        self.assertEqual(results['CCI_Score'].to_pylist(), [2, None, 1, 0])
+
+    def test_pandas_is_not_routed_to_arrow(self):
+        self.assertFalse(is_arrow_compatible(pd.DataFrame(CLAIMS)))
+        self.assertTrue(is_arrow_compatible(pa.table(CLAIMS)))
+
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestCodeLists(unittest.TestCase):
+    """ICD codes are a shared, dictionary-encoded list column; joining is formatting only."""
+
+    def test_builder_shares_one_dictionary(self):
+        builder = CodeListBuilder()
+        for codes in (['I10', 'E11.9'], [], ['I10']):
+            builder.append(codes)
+        lists = builder.to_arrow()
+        self.assertEqual(lists.to_pylist(), [['I10', 'E11.9'], [], ['I10']])
+        self.assertEqual(lists.values.dictionary.to_pylist(), ['I10', 'E11.9'])
+        self.assertEqual(lists.values.indices.to_pylist(), [0, 1, 0])
+
+    def test_format_for_output(self):
+        results = process_calculator(pd.DataFrame(CLAIMS), max_icd_cols=3)
+        self.assertEqual(format_code_lists(results['ICD_Codes']).tolist(),
+                         ['I50.22|I10', 'None', 'K70.3|K74.60|E11.9', 'C78.0|C50.9'])
+        self.assertEqual(format_code_column(results, empty='')['ICD_Codes'].tolist()[1], '')
+
+    def test_buffers_round_trip(self):
+        results = process_calculator(pd.DataFrame(CLAIMS), max_icd_cols=3)
+        sliced = results['ICD_Codes'].iloc[1:]
+        offsets, indices, dictionary = code_list_buffers(sliced)
+        self.assertEqual(offsets.tolist()[0], 0)
+        self.assertEqual(pd.Series(code_list_column(offsets, indices, dictionary)).tolist(), sliced.tolist())
+        plain = pd.Series([['I10'], [], ['E11.9', 'I10']], dtype=object)
+        offsets, indices, dictionary = code_list_buffers(plain)
+        self.assertEqual((offsets.tolist(), indices.tolist(), dictionary), ([0, 1, 1, 3], [0, 1, 0], ['I10', 'E11.9']))
+
+    def test_encode_frame(self):
+        lookup = ConditionMaskLookup(CHARLSON_ICD10_MAPPING, exact=False)
+        df = pd.DataFrame(CLAIMS).drop(columns='ICD_DGNS_CD2')
+        masks, has_codes, codes = encode_frame(df, lookup, ['ICD_DGNS_CD1', 'ICD_DGNS_CD2', 'ICD_DGNS_CD3'])
+        self.assertEqual(pd.Series(codes).tolist(), [['I50.22', 'I10'], [], ['K70.3', 'E11.9'], ['C78.0']])
+        self.assertEqual(has_codes.tolist(), [True, False, True, True])
+        self.assertEqual(masks.tolist(), [lookup.codes_mask(row) for row in (['I50.22'], [], ['K70.3', 'E11.9'], ['C78.0'])])
+
+    def test_condition_evidence(self):
+        results = process_calculator(pd.DataFrame(CLAIMS), max_icd_cols=3)
+        evidence, codes = condition_evidence(results)
+        keys = list(EXACT_ICD_CODES.keys())
+        hits = sorted((int(r.row), keys[r.condition], codes[r.code]) for r in evidence.itertuples())
+        self.assertEqual(hits, [(0, 'CHF', 'I50.22'), (0, 'HYPERTENSION', 'I10'), (2, 'DIABETES', 'E11.9')])
+
+
+if __name__ == '__main__':
+    unittest.main()
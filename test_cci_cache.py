@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from cci_cache import ResultCache
+
+
+RESULTS = pd.DataFrame({
+    'DSYSRTKY': np.array([1, 1, 2], dtype=np.int64),
+    'CLAIMNO': np.array([10, 11, 12], dtype=np.int64),
+    'CCI_Score': np.array([2, 0, 1], dtype=np.uint8),
+    'CHF': np.array([1, 0, 0], dtype=np.uint8),
+    'MI': np.array([0, 0, 1], dtype=np.uint8),
+})
+KEYS = ['CHF', 'MI']
+MAPPING = {'CHF': {'codes': ['I50'], 'points': 1}, 'MI': {'codes': ['I21'], 'points': 1}}
+
+
+class TestResultCache(unittest.TestCase):
+    """Cached results must come back unchanged and never outlive their inputs."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmp.name, 'claims.csv')
+        with open(self.input, 'w') as f:
+            f.write('DSYSRTKY,CLAIMNO,ICD_DGNS_CD1\n1,10,I50\n')
+        self.cache = ResultCache(os.path.join(self.tmp.name, 'cache'))
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def score(self):
+        self.calls += 1
+        return RESULTS
+
+    def key(self, mapping=MAPPING, options=None):
+        return self.cache.key(self.input, ['DSYSRTKY', 'ICD_DGNS_CD1'], mapping, 'aligned', options)
+
+    def test_miss_then_hit(self):
+        key = self.key()
+        results, hit = self.cache.load_or_score(key, self.score, KEYS, ('DSYSRTKY', 'CLAIMNO'))
+        self.assertFalse(hit)
+        results, hit = self.cache.load_or_score(key, self.score, KEYS, ('DSYSRTKY', 'CLAIMNO'))
+        self.assertTrue(hit)
+        self.assertEqual(self.calls, 1)
+        pd.testing.assert_frame_equal(results, RESULTS)
+
+        # A fresh instance sees the same entry through index.json
+        self.assertIsNotNone(ResultCache(self.cache.directory).get(key))
+
+    def test_key_tracks_inputs(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+        self.assertNotEqual(self.key(mapping={**MAPPING, 'MI': {'codes': ['I22'], 'points': 1}}), key)
+        self.assertNotEqual(self.key(options={'hierarchy': []}), key)
+        with open(self.input, 'a') as f:
+            f.write('2,12,I21\n')
+        self.assertNotEqual(self.key(), key)
+
+    def test_key_tracks_package_versions(self):
+        with mock.patch('cci_cache.version', return_value='0.5.0'):
+            key = self.cache.key(self.input, ['DOB_DT'], {}, 'comorbidipy', packages=('comorbidipy',))
+            self.cache.put(key, RESULTS, KEYS)
+        with mock.patch('cci_cache.version', return_value='0.6.0'):
+            upgraded = self.cache.key(self.input, ['DOB_DT'], {}, 'comorbidipy', packages=('comorbidipy',))
+        self.assertNotEqual(upgraded, key)
+        self.assertIsNone(self.cache.get(upgraded))
+
+    def test_lru_eviction(self):
+        first, second = self.key(options={'n': 1}), self.key(options={'n': 2})
+        self.cache.put(first, RESULTS, KEYS)
+        self.cache.put(second, RESULTS, KEYS)
+        self.cache.index['entries'][second]['last_used'] = 0  # second is now the oldest
+        self.assertEqual(self.cache.evict(self.cache.size() - 1), [second])
+        self.assertIsNotNone(self.cache.get(first))
+        self.assertIsNone(self.cache.get(second))
+        self.assertFalse(os.path.exists(self.cache.path(second)))
+
+    def test_unreadable_entry_is_a_miss(self):
+        missing, corrupt = self.key(options={'n': 1}), self.key(options={'n': 2})
+        self.cache.put(missing, RESULTS, KEYS)
+        self.cache.put(corrupt, RESULTS, KEYS)
+        os.remove(self.cache.path(missing))
+        with open(self.cache.path(corrupt), 'r+b') as f:
+            f.truncate(8)
+        for key in (missing, corrupt):
+            self.assertIsNone(self.cache.get(key))
+            self.assertNotIn(key, ResultCache(self.cache.directory).index['entries'])
+        results, hit = self.cache.load_or_score(corrupt, self.score, KEYS, ('DSYSRTKY', 'CLAIMNO'))
+        self.assertFalse(hit)
+        pd.testing.assert_frame_equal(results, RESULTS)
+
+    def test_invalidate_and_clear(self):
+        key = self.key()
+        self.cache.put(key, RESULTS, KEYS)
+        self.assertTrue(self.cache.invalidate(key))
+        self.assertFalse(self.cache.invalidate(key))
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, RESULTS, KEYS)
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+        self.assertEqual([name for name in os.listdir(self.cache.directory) if name.endswith('.cci')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_checkpoint import ShardCheckpoint, content_fingerprint
+
+
+KEYS = ['CHF', 'MI']
+
+
+def score(shard):
+    """Stand-in scorer: deterministic flags and scores from the claim number."""
+    claims = shard['CLAIMNO'].to_numpy()
+    return pd.DataFrame({
+        'DSYSRTKY': shard['DSYSRTKY'].to_numpy(),
+        'CLAIMNO': claims,
+        'CCI_Score': (claims % 4).astype(np.uint8),
+        'CHF': (claims % 2).astype(np.uint8),
+        'MI': (claims % 3 == 0).astype(np.uint8),
+    })
+
+
+class TestShardCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'ck')
+        self.claims = pd.DataFrame({'DSYSRTKY': np.arange(25) // 3, 'CLAIMNO': np.arange(25)})
+        self.identity = {'input': {'size': 1, 'sha256': 'abc'}, 'mapping_version': 'v1'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def checkpoint(self, **kwargs):
+        options = dict(shard_size=10, resume=True)
+        options.update(kwargs)
+        identity = options.pop('identity', self.identity)
+        return ShardCheckpoint(self.directory, identity, KEYS, **options)
+
+    def test_matches_unsharded_run(self):
+        results = self.checkpoint(resume=False).run(self.claims, score, progress=lambda message: None)
+        pd.testing.assert_frame_equal(results, score(self.claims))
+
+    def test_resume_skips_finished_shards(self):
+        calls = []
+
+        def failing(shard):
+            if calls:
+                raise RuntimeError("node died")
+            calls.append(len(shard))
+            return score(shard)
+
+        with self.assertRaises(RuntimeError):
+            self.checkpoint(resume=False).run(self.claims, failing, progress=lambda message: None)
+
+        resumed = []
+        results = self.checkpoint().run(self.claims, lambda shard: resumed.append(len(shard)) or score(shard),
+                                        progress=lambda message: None)
+        self.assertEqual(resumed, [10, 5])  # shard 0-10 came from disk
+        pd.testing.assert_frame_equal(results, score(self.claims))
+
+    def test_changed_identity_refuses_to_resume(self):
+        self.checkpoint(resume=False).run(self.claims, score, progress=lambda message: None)
+        with self.assertRaisesRegex(ValueError, 'mapping_version changed'):
+            self.checkpoint(identity={**self.identity, 'mapping_version': 'v2'})
+        # A fresh run clears the old shards instead
+        fresh = self.checkpoint(identity={**self.identity, 'mapping_version': 'v2'}, resume=False)
+        self.assertEqual(fresh.pending(len(self.claims)), [(0, 10), (10, 20), (20, 25)])
+
+    def test_fingerprint(self):
+        path = os.path.join(self.tmp.name, 'input.csv')
+        with open(path, 'w') as f:
+            f.write('DSYSRTKY,CLAIMNO\n1,2\n')
+        first = content_fingerprint(path)
+        self.assertEqual(first['size'], os.path.getsize(path))
+        with open(path, 'a') as f:
+            f.write('3,4\n')
+        self.assertNotEqual(content_fingerprint(path)['sha256'], first['sha256'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_cohort import Bitset, CohortIndex
+
+
+KEYS = ['CHF', 'REND', 'DIAB', 'COPD']
+
+
+def random_results(n=1003, seed=7):
+    rng = np.random.default_rng(seed)
+    results = pd.DataFrame({'DSYSRTKY': np.arange(n) + 5000})
+    for key in KEYS:
+        results[key] = (rng.random(n) < 0.3).astype(np.uint8)
+    scores = pd.array(rng.integers(0, 9, n), dtype='UInt8')
+    scores[rng.random(n) < 0.05] = pd.NA
+    results['CCI_Score'] = scores
+    return results
+
+
+class TestBitset(unittest.TestCase):
+    """Bit operations must agree with boolean masks, including the tail word."""
+
+    def test_roundtrip_and_invert(self):
+        mask = np.random.default_rng(1).random(131) < 0.5
+        bits = Bitset.from_bool(mask)
+        np.testing.assert_array_equal(bits.positions(), np.flatnonzero(mask))
+        np.testing.assert_array_equal((~bits).positions(), np.flatnonzero(~mask))
+        self.assertEqual((~bits).count(), int((~mask).sum()))
+        self.assertEqual(Bitset.full(131).count(), 131)
+
+
+class TestCohortIndex(unittest.TestCase):
+    """Cohort queries must return exactly what the pandas boolean chain does."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = random_results()
+        cls.index = CohortIndex(cls.results, KEYS)
+
+    def expected(self, mask):
+        return self.results.loc[mask.fillna(False).to_numpy(dtype=bool), 'DSYSRTKY'].to_numpy()
+
+    def test_and_not_with_score(self):
+        r = self.results
+        mask = (r['CHF'] == 1) & (r['REND'] == 1) & (r['DIAB'] == 0) & (r['CCI_Score'] >= 5)
+        index = self.index
+        bits = (index['CHF'] & index['REND']) - index['DIAB'] & index.score(min=5)
+        np.testing.assert_array_equal(index.ids(bits), self.expected(mask))
+        np.testing.assert_array_equal(index.query('CHF and REND and not DIAB and score >= 5'), self.expected(mask))
+        self.assertEqual(index.count(bits), int(mask.fillna(False).sum()))
+
+    def test_or_and_ranges(self):
+        r = self.results
+        mask = ((r['CHF'] == 1) | (r['COPD'] == 1)) & (r['CCI_Score'] > 2) & (r['CCI_Score'] < 6)
+        np.testing.assert_array_equal(self.index.query('(CHF | COPD) and 2 < score < 6'), self.expected(mask))
+        mask = r['CCI_Score'] != 3
+        np.testing.assert_array_equal(self.index.query('score != 3'), self.expected(mask))
+
+    def test_unscored_rows_excluded_from_score_filters(self):
+        r = self.results
+        unscored = set(r.loc[r['CCI_Score'].isna(), 'DSYSRTKY'])
+        self.assertTrue(unscored)
+        self.assertFalse(unscored & set(self.index.query('score >= 0')))
+        self.assertEqual(self.index.count(self.index.score(min=9)), 0)
+
+    def test_nbytes_counts_every_bitset(self):
+        words = -(-len(self.results) // 64)
+        n_bitsets = len(KEYS) + self.index.max_score + 3
+        self.assertEqual(self.index.nbytes, n_bitsets * words * 8)
+
+    def test_bad_queries(self):
+        with self.assertRaises(ValueError):
+            self.index.query('CHF and MISSING')
+        with self.assertRaises(ValueError):
+            self.index.query('CHF > 1')
+        with self.assertRaises(ValueError):
+            self.index.query('CHF + REND')
+        for constant in ("'5'", 'None', 'True', '1e999'):
+            with self.assertRaises(ValueError):
+                self.index.query(f'score >= {constant}')
+
+
+if __name__ == '__main__':
+    unittest.main()
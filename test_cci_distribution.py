@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_distribution import band_distribution, expected_survival, score_distribution, score_histogram
+from charlson_batch import survival_table
+from charlson_index import CharlsonComorbidityIndex
+from charlson_interactive import INTERPRETATION_BANDS, interpret_score
+
+
+class TestScoreDistribution(unittest.TestCase):
+    """bincount aggregates must agree with the per-patient helpers."""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.scores = rng.integers(0, 11, 500)
+        self.histogram = score_histogram(pd.Series(np.append(self.scores, [np.nan]).tolist()))
+
+    def test_survival_table_matches_estimate(self):
+        table = survival_table(14)
+        for age in (40, 55, 65, 75, 85):
+            for conditions in ([], ['chf'], ['chf', 'moderate_severe_ckd'], ['aids', 'liver_disease_moderate_severe']):
+                cci = CharlsonComorbidityIndex()
+                cci.set_age(age)
+                for condition in conditions:
+                    cci.add_condition(condition)
+                self.assertEqual(table[cci.calculate_score()], cci.estimate_10_year_survival())
+
+    def test_histogram_skips_missing(self):
+        self.assertEqual(self.histogram.sum(), 500)
+        np.testing.assert_array_equal(self.histogram, np.bincount(self.scores))
+
+    def test_score_rows(self):
+        table = score_distribution(self.histogram)
+        self.assertEqual(table['Patients'].sum(), 500)
+        self.assertAlmostEqual(table['Percentage'].sum(), 100)
+        self.assertEqual(table.loc[7, 'Band'], 'Score ≥7')
+
+    def test_bands_match_interpret_score(self):
+        bands = band_distribution(self.histogram)
+        texts = pd.Series([interpret_score(int(s)) for s in self.scores]).value_counts()
+        expected = [texts.get(text, 0) for _, text in INTERPRETATION_BANDS]
+        self.assertEqual(bands['Patients'].tolist(), expected)
+        self.assertEqual(bands['Band'].tolist(), ['Score 0', 'Score 1-2', 'Score 3-4', 'Score 5-6', 'Score ≥7'])
+
+    def test_expected_survival(self):
+        survival = survival_table(10)[self.scores]
+        self.assertAlmostEqual(expected_survival(self.histogram), survival.mean())
+        bands = band_distribution(self.histogram)
+        self.assertAlmostEqual(bands['Expected_Survivors_10yr'].sum(), survival.sum() / 100)
+        self.assertTrue(np.isnan(expected_survival(np.zeros(0, dtype=np.int64))))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from accurate_cci_calculator import process_calculator
+from cci_duckdb import DuckDBCCIEngine, duckdb
+
+
+CLAIMS = pd.DataFrame({
+    'DSYSRTKY': [1, 1, 2, 3],
+    'CLAIMNO': [10, 11, 12, 13],
+    'ICD_DGNS_CD1': ['I50.22', None, 'k70.3 ', 'C78.0'],
+    'ICD_DGNS_CD2': ['I10', None, 'K74.60', 'C50.9'],
+    'ICD_DGNS_CD3': [None, None, 'E11.9', None],
+})
+
+DOTLESS = CLAIMS.assign(
+    ICD_DGNS_CD1=['I5022', None, 'k703 ', 'C780'],
+    ICD_DGNS_CD2=['I10', None, 'K7460', 'C509'],
+    ICD_DGNS_CD3=[None, None, 'E119', None],
+)
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestDuckDBCCIEngine(unittest.TestCase):
+    """The SQL engine must reproduce the pandas results table."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, 'claims.csv')
+        CLAIMS.to_csv(self.csv, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_exact_matches_process_calculator(self):
+        expected = process_calculator(CLAIMS, max_icd_cols=3)
+        results = DuckDBCCIEngine(max_icd_cols=3).score(self.csv)
+        self.assertEqual(list(results.columns), list(expected.columns))
+        self.assertEqual([list(codes) for codes in results['ICD_Codes']], expected['ICD_Codes'].tolist())
+        pd.testing.assert_series_equal(results['CCI_Score'], expected['CCI_Score'])
+        keys = list(expected.columns[5:])
+        pd.testing.assert_frame_equal(results[keys], expected[keys])
+
+    def test_parquet_input_keeps_row_order(self):
+        parquet = os.path.join(self.tmp.name, 'claims.parquet')
+        CLAIMS.to_parquet(parquet, index=False)
+        expected = process_calculator(CLAIMS, max_icd_cols=3)
+        results = DuckDBCCIEngine(max_icd_cols=3, threads=2).score(parquet)
+        self.assertEqual(results['CLAIMNO'].tolist(), CLAIMS['CLAIMNO'].tolist())
+        pd.testing.assert_series_equal(results['CCI_Score'], expected['CCI_Score'])
+
+    def test_dotless_codes_match(self):
+        DOTLESS.to_csv(self.csv, index=False)
+        expected = process_calculator(CLAIMS, max_icd_cols=3)
+        results = DuckDBCCIEngine(max_icd_cols=3).score(self.csv)
+        self.assertEqual([list(codes) for codes in results['ICD_Codes']], expected['ICD_Codes'].tolist())
+        pd.testing.assert_series_equal(results['CCI_Score'], expected['CCI_Score'])
+
+    def test_prefix_mapping_applies_hierarchy(self):
+        results = DuckDBCCIEngine(exact=False, max_icd_cols=3).score(self.csv)
+        self.assertEqual(results['CCI_Score'].tolist()[2:], [5, 6])
+        self.assertEqual(results.loc[2, ['MLD', 'MSLD', 'DIAB', 'DIABWC']].tolist(), [0, 1, 0, 1])
+        self.assertEqual(results.loc[3, ['CANC', 'METACANC']].tolist(), [0, 1])
+
+    def test_parquet_output(self):
+        output = os.path.join(self.tmp.name, 'scored.parquet')
+        engine = DuckDBCCIEngine(max_icd_cols=3, threads=2, temp_directory=self.tmp.name)
+        engine.score_to_file(self.csv, output)
+        self.assertEqual(len(pd.read_parquet(output)), len(CLAIMS))
+
+    def test_csv_output_joins_codes(self):
+        output = os.path.join(self.tmp.name, 'scored.csv')
+        DuckDBCCIEngine(max_icd_cols=3).score_to_file(self.csv, output)
+        codes = pd.read_csv(output, keep_default_na=False)['ICD_Codes'].tolist()
+        self.assertEqual(codes, ['I50.22|I10', 'None', 'K70.3|K74.60|E11.9', 'C78.0|C50.9'])
+
+    def test_missing_id_column(self):
+        with self.assertRaises(ValueError):
+            DuckDBCCIEngine(id_col='PATIENT_ID').score(self.csv)
+
+
+if __name__ == '__main__':
+    unittest.main()
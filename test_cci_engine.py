@@ -0,0 +1,212 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import cci_engine
+from cci_engine import (
+    CODE_CACHE_SIZE,
+    CodePrefilter,
+    ConditionMaskLookup,
+    apply_hierarchy,
+    apply_hierarchy_dict,
+    blank_icd_rows,
+    canonical_icd10,
+    canonicalize_codes,
+    compact_scores,
+    condition_points,
+    hierarchy_from_mapping,
+    mapping_version,
+    pack_condition_columns,
+    pack_flags,
+    rollup_patients,
+    score_flags,
+    unpack_condition_columns,
+)
+
+
+MAPPING = {
+    'MLD': {'name': 'Mild Liver', 'codes': ['K70'], 'points': 1, 'superseded_by': 'MSLD'},
+    'MSLD': {'name': 'Severe Liver', 'codes': ['K70', 'K72'], 'points': 3},
+    'CANC': {'name': 'Cancer', 'codes': ['C50', 'C78'], 'points': 2, 'superseded_by': 'METACANC'},
+    'METACANC': {'name': 'Metastatic', 'codes': ['C78'], 'points': 6},
+    'CHF': {'name': 'CHF', 'codes': ['I50'], 'points': 1},
+}
+KEYS = list(MAPPING.keys())
+
+
+class TestHierarchy(unittest.TestCase):
+    """Mild forms should not score when the severe form is present."""
+
+    def test_hierarchy_from_mapping(self):
+        self.assertEqual(hierarchy_from_mapping(MAPPING), [('MLD', 'MSLD'), ('CANC', 'METACANC')])
+
+    def test_unknown_severe_key_is_ignored(self):
+        mapping = {'DIAB': {'codes': ['E11'], 'points': 1, 'superseded_by': 'DIABWC'}}
+        self.assertEqual(hierarchy_from_mapping(mapping), [])
+
+    def test_apply_hierarchy_matrix(self):
+        flags = np.array([
+            [1, 1, 1, 1, 1],
+            [1, 0, 1, 0, 0],
+            [0, 1, 0, 1, 1],
+        ])
+        apply_hierarchy(flags, KEYS, hierarchy_from_mapping(MAPPING))
+        np.testing.assert_array_equal(flags, [
+            [0, 1, 0, 1, 1],
+            [1, 0, 1, 0, 0],
+            [0, 1, 0, 1, 1],
+        ])
+        np.testing.assert_array_equal(score_flags(flags, condition_points(MAPPING)), [10, 3, 10])
+
+    def test_apply_hierarchy_dict_matches_matrix(self):
+        conditions = dict(zip(KEYS, [1, 1, 1, 0, 0]))
+        apply_hierarchy_dict(conditions, hierarchy_from_mapping(MAPPING))
+        self.assertEqual(conditions, {'MLD': 0, 'MSLD': 1, 'CANC': 1, 'METACANC': 0, 'CHF': 0})
+
+
+class TestPatientRollup(unittest.TestCase):
+    """Claim-level flags should be ORed into one row per patient."""
+
+    def setUp(self):
+        self.claims = pd.DataFrame({
+            'DSYSRTKY': [7, 3, 7, 7, 3, 9],
+            'CLAIMNO': [1, 2, 3, 4, 5, 6],
+            'CCI_Score': [1, 2, np.nan, 3, 1, np.nan],
+            'Has_ICD_Codes': ['Yes', 'Yes', 'No', 'Yes', 'Yes', 'No'],
+            'MLD': [1, 0, np.nan, 0, 0, np.nan],
+            'MSLD': [0, 0, np.nan, 1, 0, np.nan],
+            'CANC': [0, 1, np.nan, 0, 0, np.nan],
+            'METACANC': [0, 0, np.nan, 0, 0, np.nan],
+            'CHF': [0, 0, np.nan, 0, 1, np.nan],
+        })
+
+    def test_one_row_per_patient_in_first_seen_order(self):
+        rollup = rollup_patients(self.claims, KEYS, condition_points(MAPPING), hierarchy_from_mapping(MAPPING))
+        self.assertEqual(list(rollup['DSYSRTKY']), [7, 3, 9])
+        self.assertEqual(list(rollup['N_Claims']), [3, 2, 1])
+
+    def test_flags_unioned_then_hierarchy_applied(self):
+        rollup = rollup_patients(self.claims, KEYS, condition_points(MAPPING), hierarchy_from_mapping(MAPPING))
+        first = rollup.iloc[0]
+        self.assertEqual((first['MLD'], first['MSLD']), (0, 1))
+        self.assertEqual(first['CCI_Score'], 3)
+        self.assertEqual(rollup.iloc[1]['CCI_Score'], 3)
+
+    def test_patient_without_codes_has_nan_score(self):
+        rollup = rollup_patients(self.claims, KEYS, condition_points(MAPPING))
+        self.assertTrue(pd.isna(rollup.iloc[2]['CCI_Score']))
+        self.assertEqual(rollup.iloc[2]['Has_ICD_Codes'], 'No')
+
+    def test_compact_dtypes(self):
+        rollup = rollup_patients(self.claims, KEYS, condition_points(MAPPING))
+        self.assertEqual(rollup['CCI_Score'].dtype, 'UInt8')
+        self.assertTrue(all(rollup[key].dtype == np.uint8 for key in KEYS))
+
+
+class TestCompactResults(unittest.TestCase):
+
+    def test_smallest_score_dtype(self):
+        self.assertEqual(compact_scores(np.array([0, 5, 29])).dtype, np.uint8)
+        self.assertEqual(compact_scores(np.array([0, 300])).dtype, np.uint16)
+        scores = compact_scores(np.array([2, 0]), has_codes=np.array([True, False]))
+        self.assertEqual(scores.dtype, 'UInt8')
+        self.assertTrue(pd.isna(scores[1]))
+
+    def test_pack_round_trip(self):
+        flags = np.array([[1, 0, 1], [0, 0, 0], [1, 1, 1]], dtype=np.uint8)
+        packed = pack_flags(flags)
+        self.assertEqual(packed.dtype, np.uint8)
+        self.assertEqual(packed.tolist(), [0b101, 0, 0b111])
+
+        frame = pd.DataFrame({'DSYSRTKY': [1, 2, 3], 'A': flags[:, 0], 'B': flags[:, 1], 'C': flags[:, 2]})
+        stored = pack_condition_columns(frame, ['A', 'B', 'C'])
+        self.assertEqual(list(stored.columns), ['DSYSRTKY', 'Condition_Bits'])
+        pd.testing.assert_frame_equal(unpack_condition_columns(stored, ['A', 'B', 'C']), frame)
+
+
+class TestMappingVersion(unittest.TestCase):
+
+    def test_changes_with_content_only(self):
+        reordered = dict(reversed(list(MAPPING.items())))
+        self.assertEqual(mapping_version(reordered), mapping_version(MAPPING))
+        changed = {**MAPPING, 'CHF': {**MAPPING['CHF'], 'points': 2}}
+        self.assertNotEqual(mapping_version(changed), mapping_version(MAPPING))
+
+
+class TestConditionMaskLookup(unittest.TestCase):
+
+    def test_prefix_match_sets_every_matching_bit(self):
+        lookup = ConditionMaskLookup(MAPPING)
+        self.assertEqual(lookup.mask(' k70.3 '), 0b00011)
+        self.assertEqual(lookup.mask('Z00'), 0)
+        self.assertEqual(lookup.score(lookup.codes_mask(['K70.3', 'C78.0', 'I50.9'])), 10)
+
+    def test_exact_match(self):
+        lookup = ConditionMaskLookup(MAPPING, exact=True)
+        self.assertEqual(lookup.mask('K70'), 0b00011)
+        self.assertEqual(lookup.mask('K70.3'), 0)
+
+
+
+class TestCanonicalCodes(unittest.TestCase):
+    """Dotted and dotless spellings of a code must compare equal."""
+
+    def test_canonical_form(self):
+        for raw in ('I50.22', 'I5022', ' i50.22 ', 'I5022-', 'I 50.22'):
+            self.assertEqual(canonical_icd10(raw), 'I50.22')
+        self.assertEqual(canonical_icd10('I10.'), 'I10')
+        self.assertEqual(canonical_icd10(None), '')
+        self.assertEqual(canonical_icd10(np.nan), '')
+
+    def test_canonicalize_series_once_per_value(self):
+        values = pd.Series(['K703', None, 'K70.3', 'K703'], index=[5, 6, 7, 8])
+        self.assertEqual(canonicalize_codes(values).tolist(), ['K70.3', '', 'K70.3', 'K70.3'])
+        self.assertEqual(list(canonicalize_codes(values).index), [5, 6, 7, 8])
+
+    def test_lookup_matches_dotless(self):
+        exact = ConditionMaskLookup({'CHF': {'codes': ['I50.22'], 'points': 1}}, exact=True)
+        self.assertEqual(exact.mask('I5022'), 1)
+        prefix = ConditionMaskLookup({'MLD': {'codes': ['K70.3'], 'points': 1}})
+        self.assertEqual(prefix.mask('K7030'), 1)
+        self.assertEqual(prefix.mask('K7040'), 0)
+
+    def test_memos_are_bounded(self):
+        lookup = ConditionMaskLookup({'CHF': {'codes': ['I50'], 'points': 1}})
+        for i in range(100):
+            lookup.mask(f'junk{i}')
+        self.assertEqual(lookup.mask.cache_info().maxsize, CODE_CACHE_SIZE)
+        self.assertLessEqual(lookup.mask.cache_info().currsize, CODE_CACHE_SIZE)
+        self.assertEqual(cci_engine._canonical_text.cache_info().maxsize, CODE_CACHE_SIZE)
+
+
+class TestPrefilter(unittest.TestCase):
+    """Rows and codes that cannot match are dropped before any matching."""
+
+    def test_blank_rows(self):
+        df = pd.DataFrame({
+            'ICD_DGNS_CD1': ['I50.9', None, '  ', np.nan],
+            'ICD_DGNS_CD2': [None, 'Z00.0', '', np.nan],
+        })
+        np.testing.assert_array_equal(blank_icd_rows(df, ['ICD_DGNS_CD1', 'ICD_DGNS_CD2', 'ICD_DGNS_CD3']),
+                                      [False, False, True, True])
+        self.assertTrue(blank_icd_rows(df, ['OTHER']).all())
+
+    def test_prefix_mapping_categories(self):
+        prefilter = CodePrefilter(MAPPING)
+        self.assertEqual(prefilter.filter(['Z00.0', 'R51', 'K70.3', 'K71.0', 'C78.0', 'I10']), ['K70.3', 'C78.0'])
+
+    def test_short_prefixes(self):
+        prefilter = CodePrefilter({'X': {'codes': ['B2', 'I50.22'], 'points': 1}})
+        self.assertTrue(prefilter.relevant('B20'))
+        self.assertTrue(prefilter.relevant('I50.9'))
+        self.assertFalse(prefilter.relevant('I51.0'))
+        self.assertFalse(prefilter.relevant(''))
+
+    def test_exact_codes_are_set_membership(self):
+        prefilter = CodePrefilter({'X': {'codes': ['B20', 'I50.22'], 'points': 1}}, exact=True)
+        self.assertEqual(prefilter.filter(['I50.22', 'I50.9', 'B20', 'B20.1', '']), ['I50.22', 'B20'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
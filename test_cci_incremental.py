@@ -0,0 +1,66 @@
+import unittest
+
+from cci_incremental import IncrementalCCIScorer
+
+
+class TestIncrementalCCIScorer(unittest.TestCase):
+    """Streaming updates should match batch scoring and honour the window."""
+
+    def setUp(self):
+        self.scorer = IncrementalCCIScorer(window_days=365)
+
+    def test_claims_accumulate_per_patient(self):
+        self.assertEqual(self.scorer.add_claim('P1', ['I50.9'], '2023-01-01'), 1)
+        self.assertEqual(self.scorer.add_claim('P1', ['N18.6'], '2023-02-01'), 3)
+        self.assertEqual(self.scorer.add_claim('P2', ['B20'], '2023-02-01'), 6)
+        self.assertEqual(self.scorer.score('P1'), 3)
+        self.assertEqual(len(self.scorer), 2)
+
+    def test_hierarchy_applies_to_stream(self):
+        self.scorer.add_claim('P1', ['B18.2'], '2023-01-01')
+        self.assertEqual(self.scorer.add_claim('P1', ['K72.10'], '2023-01-05'), 3)
+        flags = self.scorer.conditions('P1')
+        self.assertEqual((flags['MLD'], flags['MSLD']), (0, 1))
+
+    def test_conditions_age_out_of_window(self):
+        self.scorer.add_claim('P1', ['I50.9'], '2022-01-01')
+        self.assertEqual(self.scorer.add_claim('P1', ['J44.1'], '2023-06-01'), 1)
+        self.assertEqual(self.scorer.conditions('P1')['CHF'], 0)
+
+    def test_evict_releases_empty_patients(self):
+        self.scorer.add_claim('P1', ['I50.9'], '2022-01-01')
+        self.scorer.add_claim('P2', ['J44.1'], '2023-06-01')
+        self.assertEqual(self.scorer.evict_expired(), 1)
+        self.assertEqual(self.scorer.score('P1'), 0)
+        self.assertEqual(len(self.scorer), 1)
+        self.assertEqual(self.scorer.add_claim('P3', ['I10'], '2023-06-02'), 0)
+
+    def test_freed_slots_are_released_once_and_reused(self):
+        scorer = IncrementalCCIScorer(initial_capacity=2)
+        for i in range(4):
+            scorer.add_claim(i, ['I50.9'], '2022-01-01')
+        scorer.add_claim('late', ['J44.1'], '2023-06-01')
+        self.assertEqual(scorer.evict_expired(), 4)
+        self.assertEqual(scorer.evict_expired(), 0)
+        scorer.add_claim('new', ['B20'], '2023-06-02')
+        self.assertEqual(len(scorer), 2)
+        self.assertEqual(sorted(scorer.snapshot()['DSYSRTKY']), ['late', 'new'])
+
+    def test_unlimited_window_keeps_everything(self):
+        scorer = IncrementalCCIScorer(window_days=None)
+        scorer.add_claim('P1', ['I50.9'], '2010-01-01')
+        scorer.add_claim('P1', ['J44.1'], '2023-06-01')
+        self.assertEqual(scorer.evict_expired(), 0)
+        self.assertEqual(scorer.score('P1'), 2)
+
+    def test_capacity_grows(self):
+        scorer = IncrementalCCIScorer(initial_capacity=2)
+        for i in range(10):
+            scorer.add_claim(i, ['I50.9'], '2023-01-01')
+        snapshot = scorer.snapshot()
+        self.assertEqual(len(snapshot), 10)
+        self.assertEqual(snapshot['CCI_Score'].sum(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
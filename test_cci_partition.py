@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_partition import id_partitions, parse_partition, partial_prefix, partition_rows, read_partials, write_partial
+from cci_summary import ScoreSummary
+
+
+KEYS = ['CHF', 'MI']
+
+
+def scored_claims(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    scores = pd.array(rng.integers(0, 6, n), dtype='UInt8')
+    scores[rng.random(n) < 0.1] = pd.NA
+    return pd.DataFrame({
+        'DSYSRTKY': rng.integers(1000, 1080, n),
+        'CLAIMNO': np.arange(n),
+        'CCI_Score': scores,
+        'Has_ICD_Codes': np.where(pd.notna(scores), 'Yes', 'No'),
+        'CHF': rng.integers(0, 2, n).astype(np.uint8),
+        'MI': rng.integers(0, 2, n).astype(np.uint8),
+    })
+
+
+class TestPartitioning(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_partition('2/8'), (2, 8))
+        for bad in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(ValueError):
+                parse_partition(bad)
+
+    def test_stable_and_representation_independent(self):
+        # Fixed by CRC-32, so these values must never change between machines or releases
+        self.assertEqual(id_partitions(pd.Series([1001, 1002, 1003, 1004]), 4).tolist(), [1, 3, 1, 2])
+        as_text = id_partitions(pd.Series(['1001', ' 1002', '1003', '1004']), 4)
+        as_float = id_partitions(pd.Series([1001.0, 1002.0, 1003.0, 1004.0]), 4)
+        self.assertEqual(as_text.tolist(), as_float.tolist())
+        self.assertEqual(as_text.tolist(), [1, 3, 1, 2])
+
+    def test_partitions_cover_rows_once_and_keep_patients_together(self):
+        claims = scored_claims()
+        parts = [partition_rows(claims, (i, 3)) for i in (1, 2, 3)]
+        self.assertEqual(sum(len(part) for part in parts), len(claims))
+        patients = [set(part['DSYSRTKY']) for part in parts]
+        self.assertFalse(patients[0] & patients[1] or patients[0] & patients[2] or patients[1] & patients[2])
+
+    def test_partial_prefix(self):
+        self.assertEqual(partial_prefix(os.path.join('out', 'run.xlsx'), (2, 8)), os.path.join('out', 'run.part2of8'))
+
+
+class TestReduce(unittest.TestCase):
+    """Reducing partials must give the same rows and summary as one unpartitioned run."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.claims = scored_claims()
+        self.paths = []
+        for i in (1, 2, 3):
+            part = partition_rows(self.claims, (i, 3))
+            prefix = os.path.join(self.tmp.name, f'run.part{i}of3')
+            written = write_partial(prefix, part, ScoreSummary.from_results(part, KEYS), (i, 3),
+                                    KEYS, ('DSYSRTKY', 'CLAIMNO'))
+            self.paths.append(written[0])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reduce_equals_single_run(self):
+        results, summary = read_partials(list(reversed(self.paths)))
+        merged = results.sort_values('CLAIMNO').reset_index(drop=True)
+        pd.testing.assert_frame_equal(merged, self.claims, check_dtype=False)
+        whole = ScoreSummary.from_results(self.claims, KEYS)
+        np.testing.assert_array_equal(summary.histogram, whole.histogram)
+        np.testing.assert_array_equal(summary.condition_counts, whole.condition_counts)
+        self.assertEqual((summary.rows, summary.with_codes), (whole.rows, whole.with_codes))
+
+    def test_missing_or_duplicated_partitions(self):
+        with self.assertRaisesRegex(ValueError, 'missing partitions 2/3'):
+            read_partials([self.paths[0], self.paths[2]])
+        with self.assertRaisesRegex(ValueError, 'duplicated partitions 1/3'):
+            read_partials(self.paths + [self.paths[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
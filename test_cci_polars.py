@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import polars as pl
+
+from accurate_cci_calculator import process_calculator
+from cci_polars import PolarsCCIEngine
+
+
+CLAIMS = pd.DataFrame({
+    'DSYSRTKY': [1, 1, 2, 3],
+    'CLAIMNO': [10, 11, 12, 13],
+    'ICD_DGNS_CD1': ['I50.22', None, 'k70.3 ', 'C78.0'],
+    'ICD_DGNS_CD2': ['I10', None, 'K74.60', 'C50.9'],
+    'ICD_DGNS_CD3': [None, None, 'E11.9', None],
+})
+
+DOTLESS = CLAIMS.assign(
+    ICD_DGNS_CD1=['I5022', None, 'k703 ', 'C780'],
+    ICD_DGNS_CD2=['I10', None, 'K7460', 'C509'],
+    ICD_DGNS_CD3=[None, None, 'E119', None],
+)
+
+
+class TestPolarsCCIEngine(unittest.TestCase):
+    """The lazy query must reproduce the pandas results table."""
+
+    def test_exact_matches_process_calculator(self):
+        expected = process_calculator(CLAIMS, max_icd_cols=3)
+        results = PolarsCCIEngine(max_icd_cols=3).score(pl.from_pandas(CLAIMS)).to_pandas()
+        self.assertEqual(list(results.columns), list(expected.columns))
+        self.assertEqual([list(codes) for codes in results['ICD_Codes']], expected['ICD_Codes'].tolist())
+        pd.testing.assert_series_equal(results['CCI_Score'], expected['CCI_Score'], check_dtype=False)
+
+    def test_dotless_codes_match(self):
+        expected = process_calculator(CLAIMS, max_icd_cols=3)
+        results = PolarsCCIEngine(max_icd_cols=3).score(pl.from_pandas(DOTLESS)).to_pandas()
+        self.assertEqual([list(codes) for codes in results['ICD_Codes']], expected['ICD_Codes'].tolist())
+        pd.testing.assert_series_equal(results['CCI_Score'], expected['CCI_Score'], check_dtype=False)
+
+    def test_prefix_mapping_applies_hierarchy(self):
+        results = PolarsCCIEngine(exact=False, max_icd_cols=3).score(pl.from_pandas(CLAIMS))
+        self.assertEqual(results['CCI_Score'].to_list(), [1, None, 5, 6])
+        self.assertEqual(results.row(2, named=True)['MLD'], 0)
+        self.assertEqual(results.row(2, named=True)['DIABWC'], 1)
+        self.assertEqual(results.row(3, named=True)['CANC'], 0)
+
+    def test_scan_csv_and_sink_parquet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'claims.csv')
+            output = os.path.join(tmp, 'scored.parquet')
+            CLAIMS.to_csv(source, index=False)
+            PolarsCCIEngine(max_icd_cols=3).score_to_file(source, output)
+            self.assertEqual(pl.read_parquet(output).height, len(CLAIMS))
+
+    def test_missing_claim_column(self):
+        with self.assertRaises(ValueError):
+            PolarsCCIEngine(claim_col='CLAIM_ID').results_lazy(pl.from_pandas(CLAIMS))
+
+
+if __name__ == '__main__':
+    unittest.main()
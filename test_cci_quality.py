@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_quality import invalid_icd_cells, quarantine_rows, validate_icd_columns
+
+
+CLAIMS = pd.DataFrame({
+    'DSYSRTKY': [1, 2, 3, 4],
+    'ICD_DGNS_CD1': ['I50.22', '250.0', ' i5022 ', None],
+    'ICD_DGNS_CD2': ['S72.001A', 'I10', 'I50.22-', ''],
+    'ICD_DGNS_CD3': [np.nan, 250.0, np.nan, np.nan],
+})
+ICD_COLS = ['ICD_DGNS_CD1', 'ICD_DGNS_CD2', 'ICD_DGNS_CD3', 'ICD_DGNS_CD4']
+
+
+class TestIcdValidation(unittest.TestCase):
+    """Malformed codes are reported instead of silently never matching."""
+
+    def test_invalid_cells(self):
+        invalid = invalid_icd_cells(CLAIMS, ICD_COLS)
+        self.assertEqual(list(invalid.columns), ICD_COLS[:3])
+        np.testing.assert_array_equal(invalid.to_numpy(), [
+            [False, False, False],
+            [True, False, True],
+            [False, False, False],
+            [False, False, False],
+        ])
+
+    def test_report_counts_and_examples(self):
+        invalid_rows, report = validate_icd_columns(CLAIMS, ICD_COLS)
+        np.testing.assert_array_equal(invalid_rows, [False, True, False, False])
+        self.assertEqual(report['Codes'].tolist(), [3, 3, 1])
+        self.assertEqual(report['Invalid'].tolist(), [1, 0, 1])
+        self.assertEqual(report['Examples'].tolist(), ['250.0 (1)', '', '250.0 (1)'])
+
+    def test_accepts_what_the_matcher_accepts(self):
+        claims = pd.DataFrame({'ICD_DGNS_CD1': ['I50.22-', 'I5022-', 'i50.22', '.', 'E1', 'I50.22-', 'E1', 'E1']})
+        invalid_rows, report = validate_icd_columns(claims, ['ICD_DGNS_CD1'])
+        np.testing.assert_array_equal(invalid_rows, [False, False, False, False, True, False, True, True])
+        self.assertEqual(report['Codes'].tolist(), [7])
+        self.assertEqual(report['Examples'].tolist(), ['E1 (3)'])
+
+    def test_quarantine_writes_side_file(self):
+        invalid_rows, _ = validate_icd_columns(CLAIMS, ICD_COLS)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'quarantine.csv')
+            clean = quarantine_rows(CLAIMS, invalid_rows, path)
+            self.assertEqual(clean['DSYSRTKY'].tolist(), [1, 3, 4])
+            self.assertEqual(pd.read_csv(path)['DSYSRTKY'].tolist(), [2])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
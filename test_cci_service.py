@@ -0,0 +1,99 @@
+import asyncio
+import json
+import unittest
+
+from cci_service import CCIService
+
+
+async def http_request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(data)
+
+
+class TestCCIService(unittest.IsolatedAsyncioTestCase):
+    """End-to-end requests against the service on an ephemeral localhost port."""
+
+    async def asyncSetUp(self):
+        self.service = await CCIService(port=0, max_wait_ms=20).start()
+
+    async def asyncTearDown(self):
+        await self.service.stop()
+
+    async def test_score_patients_matches_core_calculator(self):
+        status, body = await http_request(self.service.port, 'POST', '/score/patients', {
+            'patients': [{'id': 'P1', 'age': 65, 'conditions': ['chf', 'diabetes_uncomplicated']}],
+        })
+        self.assertEqual(status, 200)
+        self.assertEqual(body['results'][0]['cci_score'], 4)
+        self.assertEqual(body['results'][0]['age_score'], 2)
+
+    async def test_score_codes_with_both_mappings(self):
+        payload = {'records': [{'id': 1, 'codes': ['I50.9', 'K70.3', 'K72.1']}]}
+        status, body = await http_request(self.service.port, 'POST', '/score/codes', payload)
+        self.assertEqual(body['results'][0]['cci_score'], 4)
+        self.assertEqual(body['results'][0]['conditions'], ['CHF', 'MSLD'])
+
+        payload['mapping'] = 'exact'
+        status, body = await http_request(self.service.port, 'POST', '/score/codes', payload)
+        self.assertEqual(body['results'][0]['cci_score'], 1)
+
+    async def test_concurrent_requests_share_batches(self):
+        requests = [
+            http_request(self.service.port, 'POST', '/score/patients', {'id': i, 'age': 45, 'conditions': ['aids']})
+            for i in range(20)
+        ]
+        responses = await asyncio.gather(*requests)
+        self.assertTrue(all(body['results'][0]['cci_score'] == 6 for _, body in responses))
+        self.assertLess(self.service.batchers['patients'].batches, 20)
+
+        status, stats = await http_request(self.service.port, 'GET', '/stats')
+        self.assertEqual(stats['requests'], 20)
+        self.assertIn('latency_ms_p99', stats)
+
+    async def test_bad_record_does_not_fail_batch_mates(self):
+        good = http_request(self.service.port, 'POST', '/score/patients', {'age': 55, 'conditions': []})
+        bad = http_request(self.service.port, 'POST', '/score/patients', {'age': 55, 'conditions': ['nope']})
+        (good_status, good_body), (bad_status, bad_body) = await asyncio.gather(good, bad)
+        self.assertEqual(good_status, 200)
+        self.assertEqual(good_body['results'][0]['cci_score'], 1)
+        self.assertEqual(bad_status, 400)
+        self.assertIn('Unknown condition', bad_body['error'])
+
+    async def test_missing_age_is_rejected(self):
+        status, body = await http_request(self.service.port, 'POST', '/score/patients',
+                                          {'age': None, 'conditions': ['chf']})
+        self.assertEqual(status, 400)
+        self.assertIn('Age must be set', body['error'])
+
+    async def test_codes_must_be_a_list(self):
+        status, body = await http_request(self.service.port, 'POST', '/score/codes', {'codes': 'I50.9'})
+        self.assertEqual(status, 400)
+        self.assertIn('must be a list', body['error'])
+
+    async def test_bad_content_length(self):
+        for length in ('abc', '-5', str(self.service.max_body_bytes + 1)):
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.service.port)
+            writer.write(f"POST /score/codes HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, data = response.partition(b'\r\n\r\n')
+            self.assertIn(int(head.split()[1]), (400, 413))
+            self.assertIn('error', json.loads(data))
+
+    async def test_unknown_path(self):
+        status, _ = await http_request(self.service.port, 'GET', '/nope')
+        self.assertEqual(status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_sparse import code_incidence_csr, condition_csr, export_sparse, load_sparse, row_positions, sp
+
+
+CLAIMS = pd.DataFrame({
+    'DSYSRTKY': [1, 1, 2, 3],
+    'CLAIMNO': [10, 11, 12, 13],
+    'ICD_DGNS_CD1': ['I50.9', 'i10 ', None, 'E11.9'],
+    'ICD_DGNS_CD2': ['I10', None, '', None],
+})
+PATIENTS = pd.DataFrame({
+    'DSYSRTKY': [3, 1, 2],
+    'N_Claims': [1, 2, 1],
+    'CHF': [0, 1, 0],
+    'DIABETES': [1.0, 0.0, np.nan],
+})
+
+
+@unittest.skipIf(sp is None, "scipy is not installed")
+class TestSparseExport(unittest.TestCase):
+
+    def test_condition_matrix(self):
+        matrix = condition_csr(PATIENTS, ['CHF', 'DIABETES'])
+        self.assertEqual(matrix.format, 'csr')
+        self.assertEqual(matrix.dtype, np.uint8)
+        self.assertEqual(matrix.toarray().tolist(), [[0, 1], [1, 0], [0, 0]])
+
+    def test_codes_follow_patient_rows(self):
+        positions = row_positions(PATIENTS, CLAIMS)
+        matrix, codes = code_incidence_csr(CLAIMS, ['ICD_DGNS_CD1', 'ICD_DGNS_CD2'], positions, len(PATIENTS))
+        self.assertEqual(codes, ['E11.9', 'I10', 'I50.9'])
+        # Patient 1's I10 appears on both claims but is counted once
+        self.assertEqual(matrix.toarray().tolist(), [[1, 0, 0], [0, 1, 1], [0, 0, 0]])
+
+    def test_claim_level_rows(self):
+        self.assertEqual(row_positions(CLAIMS, CLAIMS).tolist(), [0, 1, 2, 3])
+
+    def test_export_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'out')
+            written = export_sparse(prefix, PATIENTS, ['CHF', 'DIABETES'], CLAIMS,
+                                    ['ICD_DGNS_CD1', 'ICD_DGNS_CD2'], ('DSYSRTKY', 'N_Claims'))
+            self.assertEqual(len(written), 5)
+            matrix, columns = load_sparse(prefix + '_conditions')
+            self.assertEqual(columns, ['CHF', 'DIABETES'])
+            self.assertEqual(matrix.shape, (3, 2))
+            rows = pd.read_csv(prefix + '_rows.csv')
+            self.assertEqual(rows['DSYSRTKY'].tolist(), [3, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
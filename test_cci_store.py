@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_engine import pack_flags
+from cci_store import ResultStore, write_store
+
+
+CLAIMS = pd.DataFrame({
+    'DSYSRTKY': ['P1', 'P1', 'P2', None, 'P3'],
+    'CLAIMNO': [10, 11, 12, 13, 14],
+    'CCI_Score': pd.array([2, None, 0, 5, 1], dtype='UInt8'),
+    'Has_ICD_Codes': ['Yes', 'No', 'Yes', 'Yes', 'Yes'],
+    'ICD_Codes': [['I50.9'], [], ['Z00'], ['I21.0', 'E11.9'], ['I10']],
+    'CHF': np.array([1, 0, 0, 1, 0], dtype=np.uint8),
+    'MI': np.array([0, 0, 0, 1, 0], dtype=np.uint8),
+    'DIABETES': np.array([1, 0, 0, 1, 1], dtype=np.uint8),
+})
+KEYS = ['CHF', 'MI', 'DIABETES']
+
+
+class TestResultStore(unittest.TestCase):
+    """A store must read back exactly the numeric/ID columns it was written from."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'results.cci')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        write_store(self.path, CLAIMS, KEYS, ('DSYSRTKY', 'CLAIMNO'))
+        store = ResultStore(self.path)
+        self.assertEqual(len(store), 5)
+        self.assertIsInstance(store.scores, np.memmap)
+        frame = store.to_frame()
+        self.assertEqual(frame['ICD_Codes'].tolist(), CLAIMS['ICD_Codes'].tolist())
+        pd.testing.assert_frame_equal(frame.drop(columns=['ICD_Codes']), CLAIMS.drop(columns=['ICD_Codes']),
+                                      check_dtype=False)
+        self.assertEqual(store.to_frame()['CCI_Score'].dtype, 'UInt8')
+        np.testing.assert_array_equal(store.masks, pack_flags(CLAIMS[KEYS].to_numpy()))
+
+    def test_row_selection_and_conditions(self):
+        write_store(self.path, CLAIMS, KEYS, ('DSYSRTKY', 'CLAIMNO'))
+        store = ResultStore(self.path)
+        self.assertEqual(store.condition('DIABETES').tolist(), [True, False, False, True, True])
+        frame = store.to_frame(rows=slice(2, 4), columns=['CLAIMNO', 'MI'])
+        self.assertEqual(frame['CLAIMNO'].tolist(), [12, 13])
+        self.assertEqual(frame['MI'].tolist(), [0, 1])
+        self.assertEqual(store.ids(rows=[0, 3, 4]).tolist(), ['P1', None, 'P3'])
+        self.assertEqual(store.to_frame(rows=[3, 0, 1])['ICD_Codes'].tolist(), [['I21.0', 'E11.9'], ['I50.9'], []])
+
+    def test_patient_rollup_and_empty(self):
+        patients = pd.DataFrame({
+            'DSYSRTKY': np.array([7, 3], dtype=np.int64),
+            'N_Claims': [4, 1],
+            'CCI_Score': np.array([3, 0], dtype=np.uint8),
+            'CHF': [1, 0], 'MI': [0, 0], 'DIABETES': [1.0, np.nan],
+        })
+        write_store(self.path, patients, KEYS)
+        frame = ResultStore(self.path).to_frame()
+        self.assertEqual(frame['CCI_Score'].dtype, np.uint8)
+        self.assertEqual(frame['DIABETES'].tolist(), [1, 0])
+        self.assertEqual(frame['N_Claims'].tolist(), [4, 1])
+
+        write_store(self.path, patients.iloc[:0], KEYS)
+        self.assertEqual(len(ResultStore(self.path).to_frame()), 0)
+
+    def test_float_scores(self):
+        # comorbidipy returns float64 scores
+        results = pd.DataFrame({'DSYSRTKY': [1, 2, 3], 'CCI_Score': [2.0, np.nan, 0.0], 'CHF': [1, 0, 0],
+                                'MI': [0, 0, 0], 'DIABETES': [0, 0, 0]})
+        write_store(self.path, results, KEYS)
+        frame = ResultStore(self.path).to_frame()
+        self.assertEqual(frame['CCI_Score'].dtype, np.float64)
+        np.testing.assert_array_equal(frame['CCI_Score'], [2.0, np.nan, 0.0])
+
+        results['CCI_Score'] = [1.5, 0.0, 0.0]
+        with self.assertRaises(ValueError):
+            write_store(self.path, results, KEYS)
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'PK\x03\x04 not a store')
+        with self.assertRaises(ValueError):
+            ResultStore(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
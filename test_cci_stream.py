@@ -0,0 +1,56 @@
+import io
+import json
+import unittest
+
+from cci_stream import ClaimStreamScorer, PatientStreamScorer, stream_jsonl
+
+
+def run(scorer, lines, batch_size=2):
+    out = io.StringIO()
+    stream_jsonl(scorer, io.StringIO(''.join(line + '\n' for line in lines)), out, batch_size)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+class TestStreamJsonl(unittest.TestCase):
+    """One scored output line per input record, in input order."""
+
+    def test_exact_claim_records(self):
+        results = run(ClaimStreamScorer(exact=True), [
+            json.dumps({'DSYSRTKY': 1, 'CLAIMNO': 10, 'ICD_DGNS_CD1': ' i50.9 ', 'ICD_DGNS_CD3': 'I10'}),
+            json.dumps({'DSYSRTKY': 2, 'CLAIMNO': 11, 'ICD_DGNS_CD1': ''}),
+            json.dumps({'DSYSRTKY': 3, 'codes': ['I50.22', 'I50.9']}),
+        ])
+        self.assertEqual([r['CCI_Score'] for r in results], [2, None, 1])
+        self.assertEqual(results[0]['conditions'], ['CHF', 'HYPERTENSION'])
+        self.assertEqual(results[1]['Has_ICD_Codes'], 'No')
+
+    def test_punctuation_only_values_are_not_codes(self):
+        results = run(ClaimStreamScorer(exact=True), [
+            json.dumps({'DSYSRTKY': 1, 'ICD_DGNS_CD1': '-', 'ICD_DGNS_CD2': '.'}),
+            json.dumps({'DSYSRTKY': 2, 'codes': [' ', 'I5022-']}),
+        ])
+        self.assertEqual([r['CCI_Score'] for r in results], [None, 1])
+        self.assertEqual(results[0]['Has_ICD_Codes'], 'No')
+
+    def test_prefix_mapping_applies_hierarchy(self):
+        results = run(ClaimStreamScorer(exact=False), [json.dumps({'id': 'a', 'codes': ['K70.3', 'C78.0']})])
+        self.assertEqual(results[0]['CCI_Score'], 9)
+        self.assertEqual(results[0]['conditions'], ['METACANC', 'MSLD'])
+
+    def test_bad_lines_produce_error_lines(self):
+        results = run(PatientStreamScorer(), [
+            '{"id": 1, "age": 65, "conditions": ["chf"]}',
+            'not json',
+            '',
+            '{"id": 2, "age": 65, "conditions": ["bogus"]}',
+            '{"id": 3, "age": 85}',
+        ])
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['cci_score'], 3)
+        self.assertIn('invalid JSON', results[1]['error'])
+        self.assertIn('Unknown condition', results[2]['error'])
+        self.assertEqual(results[3]['cci_score'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
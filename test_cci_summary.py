@@ -0,0 +1,66 @@
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_summary import ScoreSummary
+
+
+class TestScoreSummary(unittest.TestCase):
+    """Histogram statistics must equal the pandas full-column ones."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        scores = pd.array(rng.integers(0, 12, 1001), dtype='UInt8')
+        scores[rng.random(1001) < 0.2] = pd.NA
+        self.results = pd.DataFrame({
+            'CCI_Score': scores,
+            'Has_ICD_Codes': np.where(pd.notna(scores), 'Yes', 'No'),
+            'CHF': rng.integers(0, 2, 1001).astype(np.uint8),
+            'MI': rng.integers(0, 2, 1001).astype(np.uint8),
+        })
+
+    def test_matches_pandas(self):
+        summary = ScoreSummary.from_results(self.results, ['CHF', 'MI'])
+        scores = self.results['CCI_Score'].astype(float)
+        self.assertEqual(summary.rows, 1001)
+        self.assertEqual(summary.count, scores.count())
+        self.assertEqual(summary.with_codes, (self.results['Has_ICD_Codes'] == 'Yes').sum())
+        self.assertEqual((summary.min, summary.max, summary.total), (scores.min(), scores.max(), scores.sum()))
+        self.assertAlmostEqual(summary.mean, scores.mean())
+        self.assertAlmostEqual(summary.std, scores.std())
+        for q in (0.1, 0.25, 0.5, 0.9):
+            self.assertAlmostEqual(summary.quantile(q), scores.quantile(q))
+        self.assertEqual(summary.median, scores.median())
+        self.assertEqual(summary.prevalence()['Count'].tolist(), self.results[['CHF', 'MI']].sum().tolist())
+
+    def test_chunks_and_merge_equal_one_pass(self):
+        whole = ScoreSummary.from_results(self.results, ['CHF', 'MI'])
+        first, second = ScoreSummary(['CHF', 'MI']), ScoreSummary(['CHF', 'MI'])
+        for start in range(0, 500, 100):
+            first.update_frame(self.results.iloc[start:start + 100])
+        second.update_frame(self.results.iloc[500:])
+        merged = first.merge(second)
+        np.testing.assert_array_equal(merged.histogram, whole.histogram)
+        np.testing.assert_array_equal(merged.condition_counts, whole.condition_counts)
+        self.assertEqual((merged.rows, merged.with_codes), (whole.rows, whole.with_codes))
+
+    def test_dict_round_trip(self):
+        summary = ScoreSummary.from_results(self.results, ['CHF', 'MI'])
+        restored = ScoreSummary.from_dict(json.loads(json.dumps(summary.to_dict())))
+        np.testing.assert_array_equal(restored.histogram, summary.histogram)
+        np.testing.assert_array_equal(restored.condition_counts, summary.condition_counts)
+        self.assertEqual((restored.rows, restored.with_codes, restored.condition_keys),
+                         (summary.rows, summary.with_codes, summary.condition_keys))
+
+    def test_empty_and_invalid(self):
+        summary = ScoreSummary().update(pd.Series([np.nan, np.nan]))
+        self.assertEqual(summary.rows, 2)
+        self.assertTrue(np.isnan(summary.mean) and np.isnan(summary.median))
+        with self.assertRaises(ValueError):
+            ScoreSummary().update([1.5, 2])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from charlson_index import CharlsonComorbidityIndex
+from cci_survival import survival_columns, survival_frame, survival_matrix
+
+
+class TestSurvivalCurves(unittest.TestCase):
+    """Lookup-table gathers must equal the closed-form curves."""
+
+    def test_charlson_formula(self):
+        scores = np.array([0, 2, 5, 9])
+        matrix = survival_matrix(scores, horizons=[10])
+        np.testing.assert_allclose(matrix[:, 0], 0.983 ** np.exp(0.9 * scores), rtol=1e-6)
+        self.assertEqual(matrix.dtype, np.float32)
+
+    def test_exponential_matches_single_patient_estimate(self):
+        cci = CharlsonComorbidityIndex()
+        cci.set_age(72)
+        cci.add_condition('chf')
+        survival = survival_matrix([cci.calculate_score()], horizons=[10], models=['exponential'])
+        self.assertEqual(round(float(survival[0, 0]) * 100, 1), cci.estimate_10_year_survival())
+
+    def test_shape_order_and_monotonic(self):
+        scores = pd.Series([3, 0, 7, 3])
+        matrix = survival_matrix(scores, horizons=(1, 5, 10), models=('charlson', 'exponential'))
+        self.assertEqual(matrix.shape, (4, 6))
+        np.testing.assert_array_equal(matrix[0], matrix[3])
+        self.assertTrue((np.diff(matrix[:, :3], axis=1) <= 0).all())
+        self.assertTrue((matrix[1] >= matrix[0]).all())
+        self.assertEqual(survival_columns((1, 5), ('charlson',)), ['Survival_1yr_charlson', 'Survival_5yr_charlson'])
+
+    def test_missing_scores_and_frame(self):
+        scores = pd.Series(pd.array([1, None, 4], dtype='UInt8'), index=[10, 11, 12])
+        frame = survival_frame(scores)
+        self.assertEqual(list(frame.index), [10, 11, 12])
+        self.assertTrue(frame.loc[11].isna().all())
+        self.assertFalse(frame.loc[[10, 12]].isna().any().any())
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            survival_matrix([1, -1])
+        with self.assertRaises(ValueError):
+            survival_matrix([1], models=['weibull'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cci_timeline import ClaimTimeline, in_window
+
+
+KEYS = ['MLD', 'MSLD', 'CHF']
+POINTS = np.array([1, 3, 1])
+HIERARCHY = [('MLD', 'MSLD')]
+
+
+class TestClaimTimeline(unittest.TestCase):
+    """Lookback windows should only see claims in [D - L, D]."""
+
+    def setUp(self):
+        self.timeline = ClaimTimeline(
+            patient_ids=['A', 'B', 'A', 'A', 'B'],
+            claim_dates=['2023-01-10', '2023-03-01', '2023-06-15', '2023-12-01', '2022-01-01'],
+            flags=np.array([
+                [1, 0, 0],
+                [0, 0, 1],
+                [0, 1, 0],
+                [0, 0, 1],
+                [1, 0, 0],
+            ]),
+            condition_keys=KEYS,
+            points=POINTS,
+            hierarchy=HIERARCHY,
+        )
+
+    def score(self, index_date, lookback_days, patient):
+        result = self.timeline.as_of(index_date, lookback_days).set_index('DSYSRTKY')
+        return result.loc[patient]
+
+    def test_window_excludes_later_claims(self):
+        row = self.score('2023-02-01', 365, 'A')
+        self.assertEqual(row['N_Claims'], 1)
+        self.assertEqual(row['CCI_Score'], 1)
+
+    def test_hierarchy_within_window(self):
+        row = self.score('2023-06-15', 365, 'A')
+        self.assertEqual((row['MLD'], row['MSLD']), (0, 1))
+        self.assertEqual(row['CCI_Score'], 3)
+
+    def test_window_boundaries_are_inclusive(self):
+        self.assertEqual(self.score('2023-12-01', 169, 'A')['N_Claims'], 2)
+        self.assertEqual(self.score('2023-12-01', 168, 'A')['N_Claims'], 1)
+
+    def test_no_claims_in_window_gives_nan(self):
+        row = self.score('2022-06-01', 30, 'B')
+        self.assertEqual(row['N_Claims'], 0)
+        self.assertTrue(pd.isna(row['CCI_Score']))
+
+    def test_per_patient_index_dates(self):
+        result = self.timeline.as_of(np.array(['2023-01-31', '2023-03-01'], dtype='datetime64[D]'), 365)
+        self.assertEqual(list(result['N_Claims']), [1, 1])
+
+    def test_undated_claims_keep_their_patient(self):
+        timeline = ClaimTimeline(['A', 'C', 'C'], ['2023-01-10', None, 'not a date'],
+                                 np.array([[1, 0, 0], [0, 0, 1], [0, 0, 1]]), KEYS, POINTS, HIERARCHY)
+        self.assertEqual(timeline.undated_claims, 2)
+        result = timeline.as_of('2023-06-01', 365).set_index('DSYSRTKY')
+        self.assertEqual(result.loc['A', 'CCI_Score'], 1)
+        self.assertTrue(pd.isna(result.loc['C', 'CCI_Score']))
+        self.assertEqual(result.loc['C', 'N_Claims'], 0)
+
+    def test_in_window_matches_as_of(self):
+        dates = ['2023-01-10', '2023-03-01', '2023-06-15', '2023-12-01', None]
+        self.assertEqual(in_window(dates, '2023-06-15', 156).tolist(), [True, True, True, False, False])
+        result = self.timeline.as_of('2023-06-15', 156).set_index('DSYSRTKY')
+        self.assertEqual(result['N_Claims'].sum(), 3)
+
+    def test_sweep_over_index_dates(self):
+        sweep = self.timeline.sweep(['2023-01-01', '2023-07-01', '2024-01-01'], 365)
+        self.assertEqual(len(sweep), 6)
+        a_scores = sweep[sweep['DSYSRTKY'] == 'A']['CCI_Score'].tolist()
+        self.assertTrue(pd.isna(a_scores[0]))
+        self.assertEqual(a_scores[1:], [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from cci_watch import LEDGER_NAME, load_ledger, scan_once, watch_directory
+
+
+class TestWatchDirectory(unittest.TestCase):
+    """New files are scored once; the ledger makes restarts skip them."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.watch_dir = self.tmp.name
+        self.output_dir = os.path.join(self.watch_dir, 'out')
+        self.seen = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text='a,b\n1,2\n'):
+        with open(os.path.join(self.watch_dir, name), 'w') as f:
+            f.write(text)
+
+    def process(self, input_path, output_path):
+        self.seen.append(os.path.basename(input_path))
+        if 'bad' in input_path:
+            raise ValueError('broken file')
+
+    def test_restart_skips_processed_files(self):
+        self.write('one.csv')
+        self.write('notes.txt')
+        self.assertEqual(watch_directory(self.watch_dir, self.process, self.output_dir, once=True), 1)
+        self.assertEqual(watch_directory(self.watch_dir, self.process, self.output_dir, once=True), 0)
+        self.assertEqual(self.seen, ['one.csv'])
+
+    def test_changed_file_is_rescored_and_errors_recorded(self):
+        self.write('bad.csv')
+        watch_directory(self.watch_dir, self.process, self.output_dir, once=True)
+        self.write('bad.csv', 'a,b\n1,2\n3,4\n')
+        watch_directory(self.watch_dir, self.process, self.output_dir, once=True)
+        self.assertEqual(self.seen, ['bad.csv', 'bad.csv'])
+        self.assertIn('bad.csv', load_ledger(os.path.join(self.output_dir, LEDGER_NAME)))
+
+    def test_pending_files_wait_for_a_stable_scan(self):
+        os.makedirs(self.output_dir)
+        ledger_path = os.path.join(self.output_dir, LEDGER_NAME)
+        ledger, pending = {}, {}
+        self.write('one.csv')
+        self.assertEqual(scan_once(self.watch_dir, self.process, self.output_dir, ledger, ledger_path, pending), 0)
+        self.assertEqual(scan_once(self.watch_dir, self.process, self.output_dir, ledger, ledger_path, pending), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,91 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from charlson_index import CharlsonComorbidityIndex
+from charlson_interactive import interpret_score, parse_age, parse_conditions, run_bulk
+
+
+class TestConditionParsing(unittest.TestCase):
+
+    def test_menu_numbers_and_keys(self):
+        self.assertEqual(parse_conditions('1, 2;dementia|CHF'), ['myocardial_infarction', 'chf', 'dementia'])
+        self.assertEqual(parse_conditions(['19']), ['aids'])
+        self.assertEqual(parse_conditions(''), [])
+
+    def test_invalid_selection_raises(self):
+        with self.assertRaises(ValueError):
+            parse_conditions('1,42')
+        with self.assertRaises(ValueError):
+            parse_conditions('age_80_plus')
+
+    def test_parse_age_accepts_whole_json_numbers(self):
+        self.assertEqual(parse_age(65.0), 65)
+        self.assertEqual(parse_age(' 65 '), 65)
+        for bad in (65.5, float('nan'), True, None, 'old'):
+            with self.assertRaises(ValueError):
+                parse_age(bad)
+
+    def test_interpretation_bands(self):
+        self.assertEqual(interpret_score(0), "Score 0: Minimal comorbidity burden")
+        self.assertEqual(interpret_score(2), "Score 1-2: Low comorbidity burden")
+        self.assertEqual(interpret_score(6), "Score 5-6: High comorbidity burden")
+        self.assertEqual(interpret_score(12), "Score ≥7: Very high comorbidity burden")
+
+
+class TestBulkMode(unittest.TestCase):
+    """Bulk scores must match the one-patient-at-a-time calculator."""
+
+    def test_bulk_matches_single_patient_scoring(self):
+        rows = [
+            ('P1', '65', '2,11'),
+            ('P2', '75', 'myocardial_infarction;chf;6;14;12'),
+            ('P3', '45', ''),
+            ('P4', 'old', '1'),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'in.csv')
+            output_path = os.path.join(tmp, 'out.csv')
+            with open(input_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['id', 'age', 'conditions'])
+                writer.writerows(rows)
+
+            self.assertEqual(run_bulk(input_path, output_path, chunk_size=2), (3, 1))
+            with open(output_path, newline='', encoding='utf-8') as f:
+                results = list(csv.DictReader(f))
+
+        for row, (_, age, conditions) in zip(results[:3], rows):
+            cci = CharlsonComorbidityIndex()
+            cci.set_age(int(age))
+            for key in parse_conditions(conditions):
+                cci.add_condition(key)
+            expected = cci.get_results()
+            self.assertEqual(int(row['cci_score']), expected['cci_score'])
+            self.assertEqual(float(row['10_year_survival_percentage']), expected['10_year_survival_percentage'])
+            self.assertEqual(row['interpretation'], interpret_score(expected['cci_score']))
+        self.assertIn("Invalid age", results[3]['error'])
+
+
+    def test_jsonl_numbers_and_non_object_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'in.jsonl')
+            output_path = os.path.join(tmp, 'out.jsonl')
+            with open(input_path, 'w') as f:
+                for row in ({'id': 'P1', 'age': 65.0, 'conditions': ['chf']}, [65, 'chf'], 7,
+                            {'id': 'P4', 'age': 65.5}):
+                    f.write(json.dumps(row) + '\n')
+
+            self.assertEqual(run_bulk(input_path, output_path), (1, 3))
+            with open(output_path) as f:
+                results = [json.loads(line) for line in f]
+
+        self.assertEqual(results[0]['cci_score'], 3)
+        self.assertIn('Expected an object', results[1]['error'])
+        self.assertEqual(results[2]['id'], 3)
+        self.assertIn('Invalid age', results[3]['error'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)